@@ -12,6 +12,9 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.conf.broker_url = settings.CELERY_BROKER_URL
 app.autodiscover_tasks()
 
+# Подключение сигналов сбора метрик задач (см. company.metrics)
+import company.metrics  # noqa: E402,F401
+
 
 @app.task()
 def debug_task():
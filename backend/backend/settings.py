@@ -34,12 +34,12 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "rest_framework",
     "djoser",
     "drf_spectacular",
     "django_filters",
-    "cachalot",
 
     "users.apps.UsersConfig",
     "company.apps.CompanyConfig",
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "company.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -163,10 +164,17 @@ REST_FRAMEWORK = {
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # JSON по умолчанию, MessagePack – по заголовку
+    # Accept: application/msgpack (см. company.renderers)
+    "DEFAULT_RENDERER_CLASSES": [
+        "company.renderers.ORJSONRenderer",
+        "company.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DATE_FORMAT": "%d-%m-%Y",
     "DATE_INPUT_FORMATS": ["%d-%m-%Y"],
     "DEFAULT_PAGINATION_CLASS":
-        "rest_framework.pagination.LimitOffsetPagination",
+        "company.pagination.LimitOffsetCursorPagination",
     "PAGE_SIZE": int(os.getenv("PAGE_SIZE", 5)),
 }
 
@@ -195,6 +203,27 @@ EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "False") == "True"
 EMAIL_SERVER = EMAIL_HOST_USER
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 EMAIL_ADMIN = EMAIL_HOST_USER
+# Уведомления (см. users.notifications): число писем на одно
+# SMTP-соединение, число повторов отправки письма и пауза перед первым
+# повтором в секундах (удваивается с каждым повтором)
+NOTIFICATION_EMAIL_BATCH_SIZE = int(
+    os.getenv("NOTIFICATION_EMAIL_BATCH_SIZE", 100)
+)
+NOTIFICATION_EMAIL_RETRIES = int(os.getenv("NOTIFICATION_EMAIL_RETRIES", 3))
+NOTIFICATION_EMAIL_RETRY_DELAY = float(
+    os.getenv("NOTIFICATION_EMAIL_RETRY_DELAY", 1)
+)
+# Режим сводки: уведомления накапливаются в Redis и отправляются одним
+# письмом сотруднику раз в NOTIFICATION_DIGEST_INTERVAL секунд
+NOTIFICATION_DIGEST_ENABLED = (
+    os.getenv("NOTIFICATION_DIGEST_ENABLED", "False") == "True"
+)
+NOTIFICATION_DIGEST_INTERVAL = float(
+    os.getenv("NOTIFICATION_DIGEST_INTERVAL", 60 * 60)
+)
+NOTIFICATION_DIGEST_REDIS_URL = os.getenv(
+    "NOTIFICATION_DIGEST_REDIS_URL", os.getenv("CELERY_BROKER_URL")
+)
 
 # Настройки Celery
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
@@ -204,7 +233,36 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 
-# Включаем логирование SQL-запросов
+# Публикация задач из outbox (см. company.outbox): период запуска
+# публикации в секундах и число сообщений в пачке
+OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", 1))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+CELERY_BEAT_SCHEDULE = {
+    "relay-outbox": {
+        "task": "company.tasks.relay_outbox",
+        "schedule": OUTBOX_RELAY_INTERVAL,
+        # Запуски, не выполненные за период, не копятся в очереди
+        "options": {"expires": OUTBOX_RELAY_INTERVAL},
+    },
+    # Сводка отправляется и после отключения режима, пока в ней есть
+    # накопленные события
+    "flush-notification-digest": {
+        "task": "users.tasks.flush_notification_digest",
+        "schedule": NOTIFICATION_DIGEST_INTERVAL,
+        "options": {"expires": NOTIFICATION_DIGEST_INTERVAL},
+    },
+}
+
+# Метрики Celery (см. company.metrics): порт HTTP-сервера метрик воркера
+# (0 – не запускать) и очереди, длина которых отдается в метриках
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", 9808))
+CELERY_MONITORED_QUEUES = os.getenv("CELERY_MONITORED_QUEUES", "celery").split(
+    ","
+)
+
+# Логирование. Все SQL-запросы выводятся только при DB_LOG_LEVEL=DEBUG,
+# в остальных случаях пишутся выборочно медленные запросы
+# (см. company.instrumentation)
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -216,16 +274,29 @@ LOGGING = {
     },
     "loggers": {
         "django.db.backends": {
-            "level": "DEBUG",
+            "level": os.getenv("DB_LOG_LEVEL", "WARNING"),
+            "handlers": ["console"],
+        },
+        "company.instrumentation": {
+            "level": "INFO",
             "handlers": ["console"],
         },
     },
 }
 
+# Инструментирование запросов (см. company.instrumentation). Заголовок
+# Server-Timing раскрывает время выполнения запросов, поэтому по умолчанию
+# отдается только в режиме отладки
+SERVER_TIMING_ENABLED = (
+    os.getenv("SERVER_TIMING_ENABLED", str(DEBUG)) == "True"
+)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", 1.0))
+
 # Настройки кэширования
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "BACKEND": "company.cache_backends.InstrumentedRedisCache",
         "LOCATION": os.getenv("CACHES_REDIS_URL"),
         "OPTIONS": {
             "db": os.getenv("CACHES_REDIS_DB"),
@@ -233,6 +304,9 @@ CACHES = {
     }
 }
 
+# Время жизни кэшированных ответов API в секундах (см. company.cache)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 60 * 5))
+
 # Настройка интеграции с Sentry
 sentry_sdk.init(
     dsn=os.getenv("SENTRY_DNS"),
@@ -10,6 +10,7 @@ urlpatterns = [
     path("api/department/", include("departments.urls")),
     path("api/product/", include("products.urls")),
     path("api/component/", include("components.urls")),
+    path("metrics/", include("company.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/schema/swagger-ui/",
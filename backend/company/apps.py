@@ -5,3 +5,6 @@ class CompanyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "company"
     verbose_name = "Компания"
+
+    def ready(self):
+        import company.signals  # noqa: F401
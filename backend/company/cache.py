@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from company.metrics import RESPONSE_CACHE_REQUESTS
+from company.models import VersionedModel
+
+RESPONSE_KEY_PREFIX = "response"
+TAG_KEY_PREFIX = "tag"
+
+_pending = threading.local()
+
+
+def model_tag(model):
+    """Тег всех ответов со списками объектов модели."""
+    return f"{TAG_KEY_PREFIX}:{model._meta.label_lower}"
+
+
+def object_tag(model, pk):
+    """Тег ответов, относящихся к объекту модели."""
+    return f"{model_tag(model)}:{pk}"
+
+
+def invalidate(model, ids=(), collection=True):
+    """
+    Инвалидация кэша ответов для объектов модели.
+
+    По умолчанию вместе с объектами инвалидируются и списки объектов
+    модели (collection=False – только ответы detail-действий объектов).
+    Для моделей с версией (VersionedModel) увеличиваются версии объектов.
+    """
+    ids = {pk for pk in ids if pk is not None}
+    if ids and issubclass(model, VersionedModel):
+        model.bump_versions(ids)
+    tags = {object_tag(model, pk) for pk in ids}
+    if tags and collection:
+        tags.add(model_tag(model))
+    schedule_invalidation(tags)
+
+
+def schedule_invalidation(tags):
+    """
+    Планирование инвалидации тегов после фиксации транзакции.
+
+    Теги накапливаются, поэтому все изменения внутри одной транзакции
+    приводят к одной записи в кэш.
+    """
+    if not tags:
+        return
+    pending = _pending.__dict__.setdefault("tags", set())
+    pending.update(tags)
+    transaction.on_commit(flush_invalidation)
+
+
+def flush_invalidation():
+    """Смена версий накопленных тегов."""
+    tags = _pending.__dict__.pop("tags", None)
+    if tags:
+        cache.set_many({tag: uuid.uuid4().hex for tag in tags}, None)
+
+
+def get_tag_versions(tags, cached):
+    """
+    Текущие версии тегов.
+
+    Версия тега – случайное значение, поэтому после вытеснения тега из
+    кэша старые ответы не могут совпасть с новой версией.
+    """
+    versions = {tag: cached[tag] for tag in tags if tag in cached}
+    missing = [tag for tag in tags if tag not in versions]
+    if missing:
+        for tag in missing:
+            cache.add(tag, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def get_response_key(request, version=None):
+    """
+    Ключ кэша ответа (ссылки в ответе содержат адрес хоста); version –
+    версия объекта ответа.
+    """
+    signature = request.build_absolute_uri()
+    if version is not None:
+        signature = f"{signature}|{version}"
+    digest = hashlib.md5(signature.encode()).hexdigest()
+    return f"{RESPONSE_KEY_PREFIX}:{digest}"
+
+
+def get_etag(request, version):
+    """
+    ETag ответа: версия объекта и параметры запроса, от которых зависит
+    тело ответа (адрес, формат ответа).
+    """
+    signature = "|".join(
+        (request.build_absolute_uri(), request.accepted_media_type or "")
+    )
+    digest = hashlib.md5(signature.encode()).hexdigest()[:12]
+    return f'W/"{version}-{digest}"'
+
+
+def cache_response(method):
+    """
+    Декоратор кэширования ответов GET-действий представления.
+
+    Кэшируются данные ответа вместе с версиями тегов представления
+    (get_cache_tags), поэтому ответ устаревает сразу после инвалидации
+    любого из тегов. Кэширование включается атрибутом представления
+    cache_responses.
+
+    Если представление задает версию объекта ответа (response_version),
+    ключ кэша содержит версию. Версия объекта увеличивается в транзакции
+    изменения, а теги инвалидируются после ее фиксации, поэтому без
+    версии в ключе между фиксацией и инвалидацией тегов ответ с новым
+    ETag мог бы содержать устаревшие данные из кэша.
+    """
+
+    @wraps(method)
+    def inner(self, request, *args, **kwargs):
+        if not self.cache_responses or request.method != "GET":
+            return method(self, request, *args, **kwargs)
+
+        view = f"{type(self).__name__}.{self.action}"
+        key = get_response_key(request, self.response_version)
+        tags = self.get_cache_tags()
+        cached = cache.get_many([key, *tags])
+        versions = get_tag_versions(tags, cached)
+        entry = cached.get(key)
+        if entry is not None and entry["versions"] == versions:
+            RESPONSE_CACHE_REQUESTS.labels(view, "hit").inc()
+            response = Response(entry["data"])
+            response["X-Cache"] = "HIT"
+            return response
+
+        RESPONSE_CACHE_REQUESTS.labels(view, "miss").inc()
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key,
+                {"versions": versions, "data": response.data},
+                settings.RESPONSE_CACHE_TIMEOUT,
+            )
+            response["X-Cache"] = "MISS"
+        return response
+
+    return inner
@@ -0,0 +1,26 @@
+from django.core.cache.backends.redis import RedisCache
+
+from company.metrics import CACHE_REQUESTS
+
+_missing = object()
+
+
+class InstrumentedRedisCache(RedisCache):
+    """Кэш Redis с учетом попаданий и промахов в метриках Prometheus."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            CACHE_REQUESTS.labels("miss").inc()
+            return default
+        CACHE_REQUESTS.labels("hit").inc()
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        if values:
+            CACHE_REQUESTS.labels("hit").inc(len(values))
+        if len(keys) > len(values):
+            CACHE_REQUESTS.labels("miss").inc(len(keys) - len(values))
+        return values
@@ -0,0 +1,24 @@
+# Периоды агрегации значений метрик
+METRIC_PERIODS = [
+    ("day", "день"),
+    ("week", "неделя"),
+    ("month", "месяц"),
+]
+
+# Агрегатные функции значений метрик
+METRIC_FUNCTIONS = [
+    ("sum", "сумма"),
+    ("avg", "среднее"),
+    ("min", "минимум"),
+    ("max", "максимум"),
+]
+
+# Максимальное число значений метрики в одном запросе на загрузку
+METRIC_VALUES_MAX_COUNT = 10000
+
+# Максимальное число переносов в одном запросе на перенос поддеревьев
+MOVE_SUBTREES_MAX_COUNT = 5000
+
+# Минимальный возраст (с) файла без ссылок, удаляемого сборкой мусора
+# хранилища: файл мог быть сохранен, но еще не назначен объекту
+MEDIA_GARBAGE_MIN_AGE = 24 * 60 * 60
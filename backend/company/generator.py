@@ -0,0 +1,365 @@
+"""
+Генератор синтетической структуры компании для нагрузочного
+тестирования и проверки производительности API.
+
+Объекты создаются массовыми вставками (bulk_create) без сигналов,
+поэтому денормализованные данные (таблицы замыкания, численность
+департаментов, счетчики команд, поисковые документы) после генерации
+перестраиваются целиком.
+"""
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from company.cache import invalidate
+from company.models import Metric, MetricValue
+from components.models import Component
+from departments.models import (Department, DepartmentClosure,
+                                DepartmentHeadcount)
+from products.models import Product, ProductClosure, ProductComponent
+from teams.models import GazpromUserTeam, Team
+from users.constants import EMPLOYEE_STATUS, GRADES, JOB_TYPES
+from users.models import EmployeeSearchDocument, EmployeeSkill, Skill
+
+User = get_user_model()
+
+LAST_NAMES = (
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров",
+    "Соколов", "Михайлов", "Новиков", "Федоров", "Морозов", "Волков",
+    "Алексеев", "Лебедев", "Семенов", "Егоров", "Павлов", "Козлов",
+)
+FIRST_NAMES = (
+    "Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей",
+    "Артем", "Илья", "Кирилл", "Михаил", "Никита", "Роман",
+)
+MIDDLE_NAMES = (
+    "Александрович", "Дмитриевич", "Сергеевич", "Андреевич",
+    "Алексеевич", "Игоревич", "Николаевич", "Викторович",
+)
+POSITIONS = (
+    "Разработчик", "Аналитик", "Тестировщик", "Дизайнер",
+    "Руководитель проекта", "Системный администратор", "DevOps-инженер",
+    "Архитектор", "Технический писатель", "Специалист поддержки",
+)
+LOCATIONS = (
+    "Москва", "Санкт-Петербург", "Екатеринбург", "Казань",
+    "Новосибирск", "Нижний Новгород", "Томск", "Удаленно",
+)
+SKILL_AREAS = (
+    "Python", "Django", "PostgreSQL", "Redis", "Kubernetes", "React",
+    "Java", "Go", "Аналитика", "UX", "SQL", "Linux", "Git", "Docker",
+)
+COMPONENT_TYPES = ("Сервис", "Библиотека", "База данных", "Очередь")
+TEAM_ROLES = ("Разработчик", "Аналитик", "Тестировщик", "Дизайнер")
+METRIC_NAMES = ("Выручка", "Число пользователей", "Доступность")
+
+
+class CompanyGenerator:
+    """
+    Генератор компании: дерево департаментов и сотрудники в нем, дерево
+    продуктов с компонентами, команды продуктов, навыки сотрудников и
+    метрики департаментов, продуктов и команд.
+
+    Деревья строятся полными: children узлов на каждом из depth уровней.
+    Названия и контакты содержат метку запуска, поэтому генерацию можно
+    повторять на той же базе данных.
+    """
+
+    batch_size = 1000
+
+    def __init__(
+        self,
+        employees=1000,
+        department_depth=3,
+        department_children=4,
+        product_depth=3,
+        product_children=3,
+        teams=50,
+        team_size=10,
+        skills=100,
+        employee_skills=3,
+        components=200,
+        metric_points=30,
+        seed=None,
+    ):
+        self.employees = employees
+        self.department_depth = department_depth
+        self.department_children = department_children
+        self.product_depth = product_depth
+        self.product_children = product_children
+        self.teams = teams
+        self.team_size = team_size
+        self.skills = skills
+        self.employee_skills = employee_skills
+        self.components = components
+        self.metric_points = metric_points
+        self.random = random.Random(seed)
+        self.run = uuid.uuid4().hex[:6]
+
+    def generate(self):
+        """Генерация компании. Возвращает число созданных объектов."""
+        with transaction.atomic():
+            department_ids = self.create_tree(
+                Department,
+                DepartmentClosure,
+                "parent_department_id",
+                self.department_depth,
+                self.department_children,
+                lambda number: {
+                    "departament_name": f"Департамент {self.run}-{number}",
+                    "departament_description": (
+                        f"Описание департамента {number}"
+                    ),
+                },
+            )
+            employee_ids = self.create_employees(department_ids)
+            skill_ids = self.create_skills()
+            employee_skill_count = self.create_employee_skills(
+                employee_ids, skill_ids
+            )
+            component_ids = self.create_components(employee_ids)
+            product_ids = self.create_tree(
+                Product,
+                ProductClosure,
+                "parent_product_id",
+                self.product_depth,
+                self.product_children,
+                lambda number: {
+                    "product_name": f"Продукт {self.run}-{number}",
+                    "product_description": f"Описание продукта {number}",
+                    "product_manager_id": self.random.choice(employee_ids),
+                },
+            )
+            self.create_product_components(product_ids, component_ids)
+            teams = self.create_teams(product_ids, employee_ids)
+            team_ids = [team.pk for team in teams]
+            member_count = self.create_team_members(teams, employee_ids)
+            metric_count = self.create_metrics(
+                (Department, department_ids),
+                (Product, product_ids),
+                (Team, team_ids),
+            )
+            self.assign_owners(department_ids, employee_ids)
+            self.rebuild_denormalized(
+                employee_ids, product_ids, component_ids, team_ids
+            )
+        return {
+            "departments": len(department_ids),
+            "employees": len(employee_ids),
+            "skills": len(skill_ids),
+            "employee_skills": employee_skill_count,
+            "components": len(component_ids),
+            "products": len(product_ids),
+            "teams": len(team_ids),
+            "team_members": member_count,
+            "metric_values": metric_count,
+        }
+
+    def create_tree(self, model, closure, parent_field, depth, children,
+                    build):
+        """
+        Создание полного дерева по уровням (по одной массовой вставке на
+        уровень) и связей в таблице замыкания.
+        """
+        parents = {}
+        level = [None]
+        for _ in range(depth):
+            nodes = [
+                model(**{parent_field: parent_id}, **build(len(parents) + i))
+                for i, parent_id in enumerate(
+                    parent_id for parent_id in level for _ in range(children)
+                )
+            ]
+            model.objects.bulk_create(nodes, batch_size=self.batch_size)
+            for node in nodes:
+                parents[node.pk] = getattr(node, parent_field)
+            level = [node.pk for node in nodes]
+        closure.relink(parents, list(parents))
+        return list(parents)
+
+    def create_employees(self, department_ids):
+        password = make_password(None)
+        today = date.today()
+        employees = [
+            User(
+                email=f"employee{self.run}-{number}@example.com",
+                password=password,
+                employee_fio=" ".join(
+                    (
+                        self.random.choice(LAST_NAMES),
+                        self.random.choice(FIRST_NAMES),
+                        self.random.choice(MIDDLE_NAMES),
+                    )
+                ),
+                employee_position=self.random.choice(POSITIONS),
+                employee_location=self.random.choice(LOCATIONS),
+                employee_grade=self.random.choice(GRADES)[0],
+                employee_type_job=self.random.choice(JOB_TYPES)[0],
+                employee_status=self.random.choice(EMPLOYEE_STATUS)[0],
+                employee_telegram=f"@employee{self.run}_{number}",
+                employee_date_of_birth=today.replace(
+                    year=today.year - self.random.randint(20, 60), day=1
+                ),
+                employee_date_of_hire=today
+                - timedelta(days=self.random.randint(0, 3650)),
+                is_employee_outsource=self.random.random() < 0.1,
+                employee_departament_id=self.random.choice(department_ids),
+            )
+            for number in range(self.employees)
+        ]
+        User.objects.bulk_create(employees, batch_size=self.batch_size)
+        return [employee.pk for employee in employees]
+
+    def create_skills(self):
+        skills = [
+            Skill(
+                name=f"{SKILL_AREAS[number % len(SKILL_AREAS)]} "
+                f"{self.run}-{number}"
+            )
+            for number in range(self.skills)
+        ]
+        Skill.objects.bulk_create(skills, batch_size=self.batch_size)
+        return [skill.pk for skill in skills]
+
+    def create_employee_skills(self, employee_ids, skill_ids):
+        count = min(self.employee_skills, len(skill_ids))
+        links = [
+            EmployeeSkill(employee_id=employee_id, skill_id=skill_id)
+            for employee_id in employee_ids
+            for skill_id in self.random.sample(skill_ids, count)
+        ]
+        EmployeeSkill.objects.bulk_create(links, batch_size=self.batch_size)
+        return len(links)
+
+    def create_components(self, employee_ids):
+        components = [
+            Component(
+                component_name=f"Компонент {self.run}-{number}",
+                component_type=self.random.choice(COMPONENT_TYPES),
+                component_link=f"https://example.com/{self.run}/{number}",
+                component_owner_id=self.random.choice(employee_ids),
+                component_second_owner_id=self.random.choice(employee_ids),
+                component_description=f"Описание компонента {number}",
+            )
+            for number in range(self.components)
+        ]
+        Component.objects.bulk_create(components, batch_size=self.batch_size)
+        return [component.pk for component in components]
+
+    def create_product_components(self, product_ids, component_ids):
+        """Распределение компонентов по продуктам."""
+        ProductComponent.objects.bulk_create(
+            [
+                ProductComponent(
+                    product_id=self.random.choice(product_ids),
+                    component_id=component_id,
+                )
+                for component_id in component_ids
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_teams(self, product_ids, employee_ids):
+        teams = [
+            Team(
+                team_name=f"Команда {self.run}-{number}",
+                team_manager_id=self.random.choice(employee_ids),
+                product_id=self.random.choice(product_ids),
+            )
+            for number in range(self.teams)
+        ]
+        Team.objects.bulk_create(teams, batch_size=self.batch_size)
+        return teams
+
+    def create_team_members(self, teams, employee_ids):
+        """Состав команд: руководитель и случайные сотрудники."""
+        members = []
+        for team in teams:
+            manager_id = team.team_manager_id
+            members.append(
+                GazpromUserTeam(
+                    team_id=team.pk, employee_id=manager_id,
+                    role="Руководитель",
+                )
+            )
+            members.extend(
+                GazpromUserTeam(
+                    team_id=team.pk,
+                    employee_id=employee_id,
+                    role=self.random.choice(TEAM_ROLES),
+                )
+                for employee_id in set(
+                    self.random.sample(
+                        employee_ids, min(self.team_size, len(employee_ids))
+                    )
+                )
+                - {manager_id}
+            )
+        GazpromUserTeam.objects.bulk_create(
+            members, batch_size=self.batch_size
+        )
+        return len(members)
+
+    def create_metrics(self, *objects):
+        """
+        Метрики объектов (model, ids) с дневными значениями за последние
+        metric_points дней.
+        """
+        if not self.metric_points:
+            return 0
+        metrics = [
+            Metric(
+                content_type=ContentType.objects.get_for_model(model),
+                object_id=object_id,
+                name=name,
+                description=f"{name}: синтетические данные",
+            )
+            for model, ids in objects
+            for object_id in ids
+            for name in METRIC_NAMES
+        ]
+        Metric.objects.bulk_create(metrics, batch_size=self.batch_size)
+        today = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        values = []
+        for metric in metrics:
+            value = self.random.uniform(100, 1000)
+            for day in range(self.metric_points):
+                value *= self.random.uniform(0.95, 1.06)
+                values.append(
+                    MetricValue(
+                        metric=metric,
+                        timestamp=today - timedelta(days=day),
+                        value=round(value, 2),
+                    )
+                )
+        MetricValue.objects.bulk_create(values, batch_size=self.batch_size)
+        return len(values)
+
+    def assign_owners(self, department_ids, employee_ids):
+        departments = list(Department.objects.filter(id__in=department_ids))
+        for department in departments:
+            department.departament_owner_id = self.random.choice(employee_ids)
+        Department.objects.bulk_update(
+            departments, ["departament_owner"], batch_size=self.batch_size
+        )
+
+    def rebuild_denormalized(self, employee_ids, product_ids, component_ids,
+                             team_ids):
+        """
+        Перестроение денормализованных данных и инвалидация кэша
+        (департаменты инвалидируются при пересчете численности).
+        """
+        DepartmentHeadcount.objects.rebuild()
+        Team.reconcile_employee_counts()
+        EmployeeSearchDocument.objects.refresh(employee_ids)
+        invalidate(User, employee_ids)
+        invalidate(Product, product_ids)
+        invalidate(Component, component_ids)
+        invalidate(Team, team_ids)
@@ -0,0 +1,182 @@
+"""
+Инструментирование запросов к API.
+
+Для каждого запроса собираются число и суммарное время SQL-запросов,
+время сериализации и рендеринга ответа и размер ответа. Метрики
+группируются по действию представления (например, UserViewSet.list),
+отдаются в заголовке Server-Timing и накапливаются в гистограммах
+Prometheus. Медленные SQL-запросы пишутся в журнал выборочно, в виде
+JSON-записей.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from prometheus_client import Histogram
+
+logger = logging.getLogger("company.instrumentation")
+
+_current = threading.local()
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса",
+    ["view", "method", "status"],
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов при обработке запроса",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_DURATION = Histogram(
+    "http_request_db_seconds",
+    "Суммарное время SQL-запросов при обработке запроса",
+    ["view"],
+)
+SERIALIZER_DURATION = Histogram(
+    "http_request_serializer_seconds",
+    "Время сериализации данных ответа (без SQL-запросов)",
+    ["view"],
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Размер тела ответа",
+    ["view"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+
+def get_view_name(request, view_func):
+    """
+    Имя действия представления: ViewSet.action для представлений DRF,
+    модуль и имя функции для остальных.
+    """
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method, method)}"
+
+
+def log_slow_query(view, sql, duration, many, alias):
+    """
+    Выборочная запись медленного SQL-запроса в журнал.
+
+    Порог и доля записываемых запросов задаются настройками
+    SLOW_QUERY_THRESHOLD_MS и SLOW_QUERY_SAMPLE_RATE. Параметры запроса
+    не записываются, так как могут содержать персональные данные.
+    """
+    duration_ms = duration * 1000
+    if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+    if random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+        return
+    logger.warning(
+        json.dumps(
+            {
+                "event": "slow_query",
+                "view": view,
+                "database": alias,
+                "duration_ms": round(duration_ms, 2),
+                "many": many,
+                "sql": sql,
+            },
+            ensure_ascii=False,
+        )
+    )
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.view = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Обертка выполнения SQL-запросов (connection.execute_wrapper)."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.db_time += duration
+            log_slow_query(
+                self.view, sql, duration, many, context["connection"].alias
+            )
+
+    @contextmanager
+    def timer(self, name):
+        """Замер времени блока без учета SQL-запросов внутри него."""
+        start, db_time = time.perf_counter(), self.db_time
+        try:
+            yield
+        finally:
+            self.timings[name] += (
+                time.perf_counter() - start - (self.db_time - db_time)
+            )
+
+    def get_server_timing(self, duration):
+        """Значение заголовка Server-Timing."""
+        metrics = [
+            f'db;dur={self.db_time * 1000:.2f};'
+            f'desc="{self.query_count} queries"',
+            *(
+                f"{name};dur={value * 1000:.2f}"
+                for name, value in self.timings.items()
+            ),
+            f"total;dur={duration * 1000:.2f}",
+        ]
+        return ", ".join(metrics)
+
+    def observe(self, request, response, duration):
+        """
+        Учет метрик запроса в гистограммах. Для потоковых ответов
+        учитывается только время до начала передачи тела.
+        """
+        view = self.view or "unresolved"
+        REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(duration)
+        if response.streaming:
+            return
+        DB_QUERIES.labels(view).observe(self.query_count)
+        DB_DURATION.labels(view).observe(self.db_time)
+        if "serializer" in self.timings:
+            SERIALIZER_DURATION.labels(view).observe(
+                self.timings["serializer"]
+            )
+        RESPONSE_SIZE.labels(view).observe(len(response.content))
+
+
+def get_current_metrics():
+    """Метрики текущего запроса или None вне запроса."""
+    return getattr(_current, "metrics", None)
+
+
+def set_current_metrics(metrics):
+    _current.metrics = metrics
+
+
+@contextmanager
+def timer(name):
+    """
+    Замер времени этапа обработки текущего запроса (например,
+    сериализации). Вне запроса ничего не делает.
+    """
+    metrics = get_current_metrics()
+    if metrics is None:
+        yield
+        return
+    with metrics.timer(name):
+        yield
@@ -0,0 +1,246 @@
+import json
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.http import urlencode
+from rest_framework.test import APIClient
+
+from departments.models import Department
+from products.models import Product
+from teams.models import Team
+from users.models import Skill
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """Перцентиль значений (метод ближайшего ранга)."""
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет время ответа (p50, p95) и число SQL-запросов основных "
+        "адресов API на текущих данных (например, сгенерированных командой "
+        "generate_company). Запросы выполняются в процессе, без сети."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=20,
+            help="Число измеряемых запросов к каждому адресу.",
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=2,
+            help="Число предварительных запросов без измерения.",
+        )
+        parser.add_argument(
+            "--email", default=None,
+            help="Сотрудник, от имени которого выполняются запросы "
+            "(по умолчанию – первый суперпользователь).",
+        )
+        parser.add_argument(
+            "--cached", action="store_true",
+            help="Разрешить ответы из кэша (по умолчанию кэш ответов "
+            "обходится).",
+        )
+        parser.add_argument(
+            "--max-p95", type=float, default=None,
+            help="Допустимое значение p95 в мс; при превышении команда "
+            "завершается с ошибкой.",
+        )
+        parser.add_argument(
+            "--max-queries", type=int, default=None,
+            help="Допустимое число SQL-запросов на запрос к API.",
+        )
+        parser.add_argument(
+            "--json", action="store_true",
+            help="Вывод результатов в формате JSON.",
+        )
+
+    def get_user(self, email):
+        users = User.objects.filter(is_active=True)
+        if email:
+            users = users.filter(email=email)
+        else:
+            users = users.filter(is_superuser=True).order_by("id")
+        user = users.first()
+        if user is None:
+            raise CommandError("Не найден сотрудник для выполнения запросов.")
+        return user
+
+    def get_scenarios(self):
+        """
+        Адреса для измерения. Объекты выбираются самые крупные: корневые
+        департамент и продукт с наибольшим поддеревом, команда с наибольшим
+        составом.
+        """
+        scenarios = [
+            ("users:list", "/api/users/"),
+            (
+                "users:search",
+                "/api/users/?" + urlencode({"search": "разработчик"}),
+            ),
+            (
+                "users:filter",
+                "/api/users/?"
+                + urlencode(
+                    {"grade": 3, "job_type": "full_time", "location": "Москва"}
+                ),
+            ),
+            ("departments:list", "/api/department/department/"),
+            (
+                "departments:root",
+                "/api/department/department/root_departments/",
+            ),
+            ("products:list", "/api/product/product/"),
+            ("products:root", "/api/product/product/root_products/"),
+            ("teams:list", "/api/team/team/"),
+        ]
+        skill = Skill.objects.annotate(count=Count("employeeskill")).order_by(
+            "-count"
+        ).first()
+        if skill is not None:
+            scenarios.append(
+                (
+                    "users:skill",
+                    "/api/users/?" + urlencode({"skill": skill.name}),
+                )
+            )
+        user = User.objects.order_by("id").first()
+        if user is not None:
+            scenarios.append(("users:detail", f"/api/users/{user.id}/"))
+        department = (
+            Department.objects.filter(parent_department=None)
+            .order_by("-total_employee_count")
+            .first()
+        )
+        if department is not None:
+            url = f"/api/department/department/{department.id}"
+            scenarios.extend(
+                (
+                    ("departments:detail", f"{url}/"),
+                    ("departments:descendants", f"{url}/descendants/"),
+                    ("departments:subsidiary", f"{url}/subsidiary/"),
+                )
+            )
+        department = Department.objects.order_by("-employee_count").first()
+        if department is not None:
+            scenarios.append(
+                (
+                    "departments:employees_list",
+                    f"/api/department/department/{department.id}"
+                    f"/employees_list/",
+                )
+            )
+        product = (
+            Product.objects.filter(parent_product=None)
+            .annotate(size=Count("descendant_links"))
+            .order_by("-size")
+            .first()
+        )
+        if product is not None:
+            url = f"/api/product/product/{product.id}"
+            scenarios.extend(
+                (
+                    ("products:detail", f"{url}/"),
+                    ("products:tree", f"{url}/tree/"),
+                    ("products:teams", f"{url}/product_teams/"),
+                    ("products:components", f"{url}/product_components/"),
+                )
+            )
+        team = Team.objects.order_by("-employee_count").first()
+        if team is not None:
+            url = f"/api/team/team/{team.id}"
+            scenarios.extend(
+                (
+                    ("teams:detail", f"{url}/"),
+                    ("teams:employees_list", f"{url}/employees_list/"),
+                )
+            )
+        return scenarios
+
+    def measure(self, client, url, options):
+        """Время ответа (мс) и число SQL-запросов каждого запроса."""
+        durations, queries = [], []
+        separator = "&" if "?" in url else "?"
+        for number in range(options["warmup"] + options["repeat"]):
+            request_url = url
+            if not options["cached"]:
+                # Параметр меняет ключ кэша ответа, но не сам ответ
+                request_url = f"{url}{separator}_benchmark={number}"
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(request_url)
+                duration = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise CommandError(
+                    f"{url}: код ответа {response.status_code}."
+                )
+            if number >= options["warmup"]:
+                durations.append(duration)
+                queries.append(len(context.captured_queries))
+        return durations, queries
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("Число запросов должно быть положительным.")
+        client = APIClient()
+        client.force_authenticate(self.get_user(options["email"]))
+        results = []
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            for name, url in self.get_scenarios():
+                durations, queries = self.measure(client, url, options)
+                results.append(
+                    {
+                        "name": name,
+                        "url": url,
+                        "p50_ms": round(percentile(durations, 50), 2),
+                        "p95_ms": round(percentile(durations, 95), 2),
+                        "max_ms": round(max(durations), 2),
+                        "queries": max(queries),
+                    }
+                )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, ensure_ascii=False))
+        else:
+            self.write_table(results)
+
+        errors = [
+            f"{result['name']}: p95 {result['p95_ms']} мс"
+            for result in results
+            if options["max_p95"] is not None
+            and result["p95_ms"] > options["max_p95"]
+        ] + [
+            f"{result['name']}: {result['queries']} SQL-запросов"
+            for result in results
+            if options["max_queries"] is not None
+            and result["queries"] > options["max_queries"]
+        ]
+        if errors:
+            raise CommandError(
+                "Превышены допустимые значения: " + "; ".join(errors)
+            )
+
+    def write_table(self, results):
+        width = max(len(result["name"]) for result in results)
+        self.stdout.write(
+            f"{'адрес':<{width}}  {'p50, мс':>9}  {'p95, мс':>9}  "
+            f"{'max, мс':>9}  {'SQL':>5}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['name']:<{width}}  {result['p50_ms']:>9.2f}  "
+                f"{result['p95_ms']:>9.2f}  {result['max_ms']:>9.2f}  "
+                f"{result['queries']:>5}"
+            )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from company.constants import MEDIA_GARBAGE_MIN_AGE
+from company.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из контентно-адресуемого хранилища файлы, на которые нет "
+        "ссылок."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age", type=int, default=MEDIA_GARBAGE_MIN_AGE,
+            help="Минимальное время (с) с последнего изменения файла.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = ContentAddressedStorage().collect_garbage(
+            options["min_age"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено файлов без ссылок: {deleted}.")
+        )
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+
+from company.generator import CompanyGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетическую компанию (департаменты, сотрудники, "
+        "продукты, компоненты, команды, навыки, метрики) для нагрузочного "
+        "тестирования."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--employees", type=int, default=1000,
+            help="Число сотрудников.",
+        )
+        parser.add_argument(
+            "--department-depth", type=int, default=3,
+            help="Число уровней дерева департаментов.",
+        )
+        parser.add_argument(
+            "--department-children", type=int, default=4,
+            help="Число дочерних департаментов (и корневых департаментов).",
+        )
+        parser.add_argument(
+            "--product-depth", type=int, default=3,
+            help="Число уровней дерева продуктов.",
+        )
+        parser.add_argument(
+            "--product-children", type=int, default=3,
+            help="Число дочерних продуктов (и корневых продуктов).",
+        )
+        parser.add_argument(
+            "--teams", type=int, default=50, help="Число команд.",
+        )
+        parser.add_argument(
+            "--team-size", type=int, default=10,
+            help="Число сотрудников в команде (без руководителя).",
+        )
+        parser.add_argument(
+            "--skills", type=int, default=100, help="Число навыков.",
+        )
+        parser.add_argument(
+            "--employee-skills", type=int, default=3,
+            help="Число навыков у сотрудника.",
+        )
+        parser.add_argument(
+            "--components", type=int, default=200,
+            help="Число компонентов.",
+        )
+        parser.add_argument(
+            "--metric-points", type=int, default=30,
+            help="Число дневных значений каждой метрики (0 – без метрик).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=None,
+            help="Начальное значение генератора случайных чисел.",
+        )
+
+    def handle(self, *args, **options):
+        counts = CompanyGenerator(
+            employees=options["employees"],
+            department_depth=options["department_depth"],
+            department_children=options["department_children"],
+            product_depth=options["product_depth"],
+            product_children=options["product_children"],
+            teams=options["teams"],
+            team_size=options["team_size"],
+            skills=options["skills"],
+            employee_skills=options["employee_skills"],
+            components=options["components"],
+            metric_points=options["metric_points"],
+            seed=options["seed"],
+        ).generate()
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Компания сгенерирована."))
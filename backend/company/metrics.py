@@ -0,0 +1,169 @@
+"""
+Экспорт метрик Prometheus.
+
+Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR, метрики
+процессов (воркеров gunicorn, процессов пула Celery) пишутся в файлы
+этого каталога и объединяются при сборе. Метрики запросов к API описаны
+в company.instrumentation.
+"""
+import logging
+import os
+import shutil
+import time
+
+from celery import signals
+from django.conf import settings
+from kombu.exceptions import ChannelError, OperationalError
+from prometheus_client import (REGISTRY, CollectorRegistry, Counter,
+                               Histogram, multiprocess, start_http_server)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "django_cache_requests_total",
+    "Чтения ключей из кэша",
+    ["result"],
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "api_response_cache_requests_total",
+    "Обращения к кэшу ответов API",
+    ["view", "result"],
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Время выполнения задач Celery",
+    ["task", "state"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+# Время начала выполняемых задач процесса по task_id
+_task_start_times = {}
+
+
+def is_multiprocess():
+    """Включен ли сбор метрик нескольких процессов."""
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+class CeleryQueueCollector:
+    """
+    Длина очередей Celery в брокере на момент сбора метрик.
+
+    Недоступность брокера записывается в журнал с уровнем WARNING не чаще
+    раза в warning_interval секунд, при остальных сборах – с уровнем
+    DEBUG: Prometheus опрашивает адрес метрик каждые несколько секунд.
+    """
+
+    warning_interval = 300
+
+    def __init__(self):
+        self.warned_at = None
+
+    @staticmethod
+    def get_metric():
+        return GaugeMetricFamily(
+            "celery_queue_length",
+            "Число задач в очереди Celery",
+            labels=["queue"],
+        )
+
+    def describe(self):
+        # Без describe реестр вызывает collect (и обращается к брокеру)
+        # уже при регистрации сборщика
+        yield self.get_metric()
+
+    def collect(self):
+        from backend.celery_app import app
+
+        gauge = self.get_metric()
+        try:
+            with app.connection_for_read() as connection:
+                connection.ensure_connection(max_retries=1)
+                channel = connection.default_channel
+                for queue in settings.CELERY_MONITORED_QUEUES:
+                    try:
+                        length = channel.queue_declare(
+                            queue=queue, passive=True
+                        ).message_count
+                    except ChannelError:
+                        # Пустая очередь в Redis не существует
+                        length = 0
+                    gauge.add_metric([queue], length)
+        except (OSError, OperationalError):
+            now = time.monotonic()
+            if (
+                self.warned_at is None
+                or now - self.warned_at >= self.warning_interval
+            ):
+                self.warned_at = now
+                logger.warning("Не удалось получить длину очередей Celery")
+            else:
+                logger.debug("Не удалось получить длину очередей Celery")
+        else:
+            self.warned_at = None
+        yield gauge
+
+
+def reset_multiprocess_dir():
+    """
+    Очистка каталога метрик процессов при запуске. Файлы метрик
+    предыдущего запуска иначе учитывались бы при сборе.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def get_registry():
+    """Реестр метрик для отдачи Prometheus."""
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(CeleryQueueCollector())
+    return registry
+
+
+if not is_multiprocess():
+    REGISTRY.register(CeleryQueueCollector())
+
+
+@signals.task_prerun.connect
+def remember_task_start(task_id, **kwargs):
+    _task_start_times[task_id] = time.perf_counter()
+
+
+@signals.task_postrun.connect
+def observe_task_duration(task_id, task, state=None, **kwargs):
+    """Учет времени выполнения задачи."""
+    start = _task_start_times.pop(task_id, None)
+    if start is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - start
+        )
+
+
+@signals.worker_init.connect
+def prepare_worker_metrics(**kwargs):
+    reset_multiprocess_dir()
+
+
+@signals.worker_ready.connect
+def start_worker_metrics_server(**kwargs):
+    """
+    HTTP-сервер метрик воркера Celery (порт CELERY_METRICS_PORT,
+    0 – не запускать).
+    """
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(
+            settings.CELERY_METRICS_PORT, registry=get_registry()
+        )
+
+
+@signals.worker_process_shutdown.connect
+def mark_worker_process_dead(pid, **kwargs):
+    """Удаление метрик завершенного процесса пула Celery."""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,58 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from company.instrumentation import (RequestMetrics, get_current_metrics,
+                                     get_view_name, set_current_metrics)
+
+
+class InstrumentationMiddleware:
+    """
+    Сбор метрик запроса (см. company.instrumentation).
+
+    Middleware должен стоять первым в MIDDLEWARE, чтобы учитывать
+    SQL-запросы и время всех остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.execute_wrapper)
+                )
+            set_current_metrics(metrics)
+            try:
+                response = self.get_response(request)
+            finally:
+                set_current_metrics(None)
+        duration = time.perf_counter() - start
+        metrics.observe(request, response, duration)
+        # Тело потокового ответа формируется после выхода из middleware,
+        # поэтому его метрики неполны и в заголовок не выводятся
+        if settings.SERVER_TIMING_ENABLED and not response.streaming:
+            response["Server-Timing"] = metrics.get_server_timing(duration)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = get_current_metrics()
+        if metrics is not None:
+            metrics.view = get_view_name(request, view_func)
+
+    def process_template_response(self, request, response):
+        """Замер времени рендеринга ответов DRF."""
+        metrics = get_current_metrics()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def add_render_time(rendered_response):
+                metrics.timings["render"] += time.perf_counter() - start
+
+            response.add_post_render_callback(add_render_time)
+        return response
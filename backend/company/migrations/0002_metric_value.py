@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 20:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MetricValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField(verbose_name="Время")),
+                ("value", models.FloatField(verbose_name="Значение")),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="points",
+                        to="company.metric",
+                        verbose_name="Метрика",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "значение метрики",
+                "verbose_name_plural": "Значения метрик",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="metricvalue",
+            constraint=models.UniqueConstraint(
+                fields=("metric", "timestamp"), name="unique_metric_value"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 21:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0002_metric_value"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "task",
+                    models.CharField(max_length=255, verbose_name="Задача"),
+                ),
+                (
+                    "kwargs",
+                    models.JSONField(default=dict, verbose_name="Аргументы"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Дата создания",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "сообщение outbox",
+                "verbose_name_plural": "Сообщения outbox",
+            },
+        ),
+    ]
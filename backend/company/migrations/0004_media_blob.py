@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-18 21:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0003_outbox_message"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Имя файла"
+                    ),
+                ),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число ссылок"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Дата изменения",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "файл хранилища",
+                "verbose_name_plural": "Файлы хранилища",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="mediablob",
+            index=models.Index(
+                fields=["ref_count", "updated_at"],
+                name="company_med_ref_cou_42e411_idx",
+            ),
+        ),
+    ]
@@ -1,20 +1,220 @@
+from collections import defaultdict
+
 from django.contrib.contenttypes.models import ContentType
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
 
-from company.models import AdditionalField, Metric
+from company.cache import cache_response, get_etag, model_tag, object_tag
+from company.instrumentation import timer
+from company.models import (AdditionalField, Metric, MetricValue,
+                            VersionedModel)
 from company.schemas import (ADD_FIELD_SCHEMA, ADD_METRIC_SCHEMA,
-                             GET_FIELDS_SCHEMA, GET_METRIC_SCHEMA)
-from company.serializers import AdditionalFieldSerializer, MetricSerializer
+                             AGGREGATE_METRIC_SCHEMA, BASE_SCHEMA,
+                             GET_FIELDS_SCHEMA, GET_METRIC_SCHEMA,
+                             INGEST_METRIC_VALUES_SCHEMA)
+from company.serializers import (AdditionalFieldSerializer,
+                                 MetricAggregateQuerySerializer,
+                                 MetricAggregateSerializer, MetricSerializer,
+                                 MetricValuesIngestSerializer,
+                                 compile_serializer)
+from company.sparse import sparse_queryset, sparse_serializer, split_names
+
+
+# Связанные данные, которые можно добавить в ответ параметром ?include=
+INCLUDE_RELATIONS = {
+    "fields": (AdditionalField, AdditionalFieldSerializer),
+    "metrics": (Metric, MetricSerializer),
+}
 
 
+@BASE_SCHEMA
 class BaseViewSet(viewsets.ModelViewSet):
     """Миксин для всех сущностей с базовым набором actions"""
 
+    # Кэширование ответов GET-действий, см. company.cache
+    cache_responses = False
+    # Версия объекта ответа для ключа кэша, задается в retrieve
+    response_version = None
+    # Действия, данные ответов которых формируются скомпилированными
+    # сериализаторами, см. company.serializers.compile_serializer
+    fast_serialization = ()
+
+    def get_cache_tags(self):
+        """
+        Теги кэша ответа: тег объекта для detail-действий и тег модели
+        для списков.
+        """
+        model = self.get_queryset().model
+        if self.detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return [object_tag(model, self.kwargs[lookup_url_kwarg])]
+        return [model_tag(model)]
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = queryset if page is None else page
+        with timer("serializer"):
+            data = self.get_serializer_data(
+                self.get_serializer(objects, many=True)
+            )
+            self.add_included_data(objects, data)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Получение объекта с поддержкой условных запросов.
+
+        Для моделей с версией ответ содержит ETag и Last-Modified, а на
+        запрос с актуальными If-None-Match / If-Modified-Since возвращается
+        304 без выполнения основного запроса и сериализации.
+        """
+        model = self.get_queryset().model
+        if not issubclass(model, VersionedModel):
+            return self.cached_retrieve(request, *args, **kwargs)
+
+        # Версия читается из того же queryset, что и объект в
+        # get_object: ограничения представления действуют и для 304
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .select_related(None)
+            .prefetch_related(None)
+            .values_list("version", "modified_at")
+        )
+        version = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.response_version = version[0]
+        etag = get_etag(request, version[0])
+        last_modified = int(version[1].timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = self.cached_retrieve(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    @cache_response
+    def cached_retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        with timer("serializer"):
+            data = self.get_serializer_data(self.get_serializer(instance))
+            self.add_included_data([instance], [data])
+        return Response(data)
+
+    def get_serializer_data(self, serializer):
+        """
+        Данные ответа сериализатора. Для действий из fast_serialization
+        объекты преобразуются скомпилированным сериализатором (результат
+        совпадает с serializer.data).
+        """
+        if self.action not in self.fast_serialization:
+            return serializer.data
+        if isinstance(serializer, ListSerializer):
+            represent = compile_serializer(serializer.child)
+            return [represent(instance) for instance in serializer.instance]
+        return compile_serializer(serializer)(serializer.instance)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            sparse_serializer(serializer, *fieldset)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ("list", "retrieve"):
+            return self.get_sparse_queryset(queryset)
+        return queryset
+
+    def get_sparse_fieldset(self):
+        """
+        Поля ответа (?fields=) и раскрываемые связи (?expand=) для
+        GET-запросов или None, если параметры не переданы.
+        """
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        if "fields" not in params and "expand" not in params:
+            return None
+        return (
+            split_names(params.get("fields", "")) or None,
+            split_names(params.get("expand", "")),
+        )
+
+    def get_sparse_queryset(self, queryset):
+        """
+        Queryset, сокращенный под поля ответа, см.
+        company.sparse.sparse_queryset.
+        """
+        if self.get_sparse_fieldset() is None:
+            return queryset
+        return sparse_queryset(queryset, self.get_serializer())
+
+    def get_included_relations(self):
+        """Связанные данные, запрошенные параметром ?include=."""
+        names = split_names(self.request.query_params.get("include", ""))
+        unknown = names - INCLUDE_RELATIONS.keys()
+        if unknown:
+            raise ValidationError(
+                {"include": f"Неизвестные значения: {', '.join(unknown)}."}
+            )
+        return [name for name in INCLUDE_RELATIONS if name in names]
+
+    def add_included_data(self, objects, data):
+        """
+        Добавление в ответ дополнительных полей и метрик объектов.
+
+        Данные загружаются одним запросом на модель для всей страницы
+        (по индексу content_type, object_id).
+        """
+        relations = self.get_included_relations()
+        if not relations:
+            return
+        content_type = ContentType.objects.get_for_model(
+            self.get_queryset().model
+        )
+        object_ids = [model_object.pk for model_object in objects]
+        for name in relations:
+            model, serializer_class = INCLUDE_RELATIONS[name]
+            items = list(
+                model.objects.filter(
+                    content_type=content_type, object_id__in=object_ids
+                ).order_by("id")
+            )
+            grouped = defaultdict(list)
+            for item, item_data in zip(
+                items, serializer_class(items, many=True).data
+            ):
+                grouped[item.object_id].append(item_data)
+            for model_object, object_data in zip(objects, data):
+                object_data[name] = grouped[model_object.pk]
+
     def get_serializer_class(self):
         if self.action in ("add_field", "get_fields"):
             return AdditionalFieldSerializer
+        elif self.action == "ingest_metric_values":
+            return MetricValuesIngestSerializer
+        elif self.action == "aggregate_metric":
+            return MetricAggregateSerializer
         else:
             return MetricSerializer
 
@@ -72,6 +272,7 @@ class BaseViewSet(viewsets.ModelViewSet):
 
     @GET_FIELDS_SCHEMA
     @action(methods=["get"], detail=True, url_path="get_fields")
+    @cache_response
     def get_fields(self, request, pk=None):
         """Получение списка дополнительных полей."""
         return self.get_additional_data(
@@ -82,24 +283,106 @@ class BaseViewSet(viewsets.ModelViewSet):
 
     @GET_METRIC_SCHEMA
     @action(methods=["get"], detail=True, url_path="get_metrics")
+    @cache_response
     def get_metrics(self, request, pk=None):
         """Получение списка метрик."""
         return self.get_additional_data(request=request, pk=pk, model=Metric)
 
-    def get_paginated_data(self, request, queryset):
-        """Пагинация и сериализия queryset."""
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(
-                page, many=True, context={"request": request}
+    def get_subtree_ids(self, model_object):
+        """
+        Идентификаторы объектов поддерева (для агрегации метрик с
+        subtree=true). По умолчанию – только сам объект.
+        """
+        return [model_object.pk]
+
+    @INGEST_METRIC_VALUES_SCHEMA
+    @action(methods=["post"], detail=True, url_path="metric_values")
+    def ingest_metric_values(self, request, pk=None):
+        """Загрузка значений метрики."""
+        model_object = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data["metric"]
+        content_type = ContentType.objects.get_for_model(model_object)
+        metric = (
+            Metric.objects.filter(
+                content_type=content_type,
+                object_id=model_object.pk,
+                name=name,
+            )
+            .order_by("id")
+            .first()
+        )
+        if metric is None:
+            metric = Metric.objects.create(
+                content_object=model_object, name=name, description=""
             )
-            return self.get_paginated_response(serializer.data)
+        # При повторе времени в запросе сохраняется последнее значение
+        points = {
+            point["timestamp"]: point["value"]
+            for point in serializer.validated_data["points"]
+        }
+        MetricValue.objects.bulk_create(
+            [
+                MetricValue(metric=metric, timestamp=timestamp, value=value)
+                for timestamp, value in points.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["metric", "timestamp"],
+            update_fields=["value"],
+            batch_size=1000,
+        )
+        return Response(
+            {"metric": metric.id, "count": len(points)},
+            status=status.HTTP_200_OK,
+        )
 
+    @AGGREGATE_METRIC_SCHEMA
+    @action(methods=["get"], detail=True, url_path="metric_aggregate")
+    def aggregate_metric(self, request, pk=None):
+        """Агрегация значений метрики по периодам."""
+        model_object = self.get_object()
+        query = MetricAggregateQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        if params["subtree"]:
+            object_ids = self.get_subtree_ids(model_object)
+        else:
+            object_ids = [model_object.pk]
+        values = MetricValue.objects.for_objects(
+            type(model_object), object_ids, params["metric"]
+        )
+        if "date_from" in params:
+            values = values.filter(timestamp__gte=params["date_from"])
+        if "date_to" in params:
+            values = values.filter(timestamp__lt=params["date_to"])
         serializer = self.get_serializer(
-            queryset, many=True, context={"request": request}
+            values.aggregate_by_period(params["period"], params["function"]),
+            many=True,
         )
         return Response(serializer.data)
 
+    def get_paginated_data(self, request, queryset):
+        """
+        Пагинация и сериализия queryset.
+
+        Поддерживаются режимы limit/offset и курсора (?cursor=),
+        см. company.pagination.LimitOffsetCursorPagination. Queryset
+        сокращается под параметры ?fields= и ?expand=.
+        """
+        queryset = self.get_sparse_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(
+            queryset if page is None else page,
+            many=True,
+            context={"request": request},
+        )
+        with timer("serializer"):
+            data = self.get_serializer_data(serializer)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
     def is_object_exists(self, pk):
         """Проверка, существует ли объект в БД."""
         if not self.get_queryset().filter(id=pk).exists():
@@ -1,6 +1,11 @@
+from collections import defaultdict
+
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import Avg, F, Max, Min, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
 
 
 class AdditionalField(models.Model):
@@ -45,3 +50,371 @@ class Metric(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class MetricValueQuerySet(models.QuerySet):
+    """Запросы к значениям метрик."""
+
+    functions = {"sum": Sum, "avg": Avg, "min": Min, "max": Max}
+
+    def for_objects(self, model, object_ids, name):
+        """Значения метрики с названием name у объектов модели."""
+        return self.filter(
+            metric__content_type=ContentType.objects.get_for_model(model),
+            metric__object_id__in=object_ids,
+            metric__name=name,
+        )
+
+    def aggregate_by_period(self, period, function):
+        """
+        Агрегация значений по периодам (day, week, month) функцией
+        (sum, avg, min, max) на стороне БД.
+        """
+        return (
+            self.annotate(period=Trunc("timestamp", period))
+            .values("period")
+            .annotate(value=self.functions[function]("value"))
+            .order_by("period")
+        )
+
+
+class MetricValue(models.Model):
+    """Значение метрики (точка временного ряда)."""
+
+    metric = models.ForeignKey(
+        Metric,
+        verbose_name="Метрика",
+        on_delete=models.CASCADE,
+        related_name="points",
+    )
+    timestamp = models.DateTimeField(verbose_name="Время")
+    value = models.FloatField(verbose_name="Значение")
+
+    objects = MetricValueQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "значение метрики"
+        verbose_name_plural = "Значения метрик"
+        # Ограничение уникальности служит и индексом для выборки
+        # временного ряда метрики
+        constraints = [
+            models.UniqueConstraint(
+                fields=["metric", "timestamp"], name="unique_metric_value"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.metric.name}: {self.value} ({self.timestamp})"
+
+
+class OutboxMessage(models.Model):
+    """
+    Задача Celery, ожидающая публикации в брокер.
+
+    Сообщение записывается в транзакции изменения данных и публикуется
+    задачей company.tasks.relay_outbox после фиксации транзакции,
+    см. company.outbox.
+    """
+
+    task = models.CharField(verbose_name="Задача", max_length=255)
+    kwargs = models.JSONField(verbose_name="Аргументы", default=dict)
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания", default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = "сообщение outbox"
+        verbose_name_plural = "Сообщения outbox"
+
+    def __str__(self):
+        return f"{self.task} ({self.created_at})"
+
+
+class MediaBlob(models.Model):
+    """
+    Файл контентно-адресуемого хранилища и число ссылок на него.
+
+    Файлы без ссылок удаляются командой collect_media_garbage, см.
+    company.storage.
+    """
+
+    name = models.CharField(
+        verbose_name="Имя файла", max_length=255, unique=True
+    )
+    ref_count = models.PositiveIntegerField(
+        verbose_name="Число ссылок", default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения", default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = "файл хранилища"
+        verbose_name_plural = "Файлы хранилища"
+        indexes = [
+            models.Index(fields=["ref_count", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class DenormalizedModel(models.Model):
+    """
+    Абстрактная модель с денормализованными полями (счетчиками).
+
+    Такие поля обновляются только атомарными UPDATE-запросами, поэтому
+    при обычном сохранении существующего объекта они не перезаписываются
+    (в памяти может храниться устаревшее значение).
+    """
+
+    denormalized_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and self.denormalized_fields
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def add_to_counter(cls, field_name, deltas):
+        """
+        Атомарное изменение денормализованного счетчика объектов.
+
+        deltas – словарь {id объекта: дельта}. Объекты с одинаковой
+        дельтой обновляются одним запросом.
+        """
+        groups = defaultdict(list)
+        for pk, delta in deltas.items():
+            if delta:
+                groups[delta].append(pk)
+        for delta, ids in groups.items():
+            cls._base_manager.filter(pk__in=ids).update(
+                **{field_name: F(field_name) + delta}
+            )
+
+
+class VersionedModel(DenormalizedModel):
+    """
+    Абстрактная модель с версией объекта.
+
+    Версия увеличивается при любом изменении, влияющем на представление
+    объекта в API (см. company.cache.invalidate), и используется для
+    условных GET-запросов (ETag / Last-Modified).
+    """
+
+    denormalized_fields = ("version", "modified_at")
+
+    version = models.PositiveIntegerField(
+        verbose_name="Версия", default=1, editable=False
+    )
+    modified_at = models.DateTimeField(
+        verbose_name="Дата изменения", default=timezone.now, editable=False
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bump_versions(cls, ids):
+        """Увеличение версий объектов."""
+        cls._base_manager.filter(pk__in=ids).update(
+            version=F("version") + 1, modified_at=timezone.now()
+        )
+
+
+class ClosureBase(models.Model):
+    """
+    Абстрактная модель таблицы замыкания (closure table) для иерархий.
+
+    Хранит все пары «предок – потомок» с расстоянием между ними, включая
+    пару узла с самим собой (depth = 0). В наследниках должны быть объявлены
+    внешние ключи ``ancestor`` и ``descendant`` на модель дерева.
+    """
+
+    depth = models.PositiveIntegerField(verbose_name="Глубина")
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def insert_node(cls, node_id, parent_id):
+        """Добавление связей для нового узла дерева."""
+        links = [cls(ancestor_id=node_id, descendant_id=node_id, depth=0)]
+        if parent_id is not None:
+            links.extend(
+                cls(ancestor_id=ancestor_id, descendant_id=node_id,
+                    depth=depth + 1)
+                for ancestor_id, depth in cls.objects.filter(
+                    descendant_id=parent_id
+                ).values_list("ancestor_id", "depth")
+            )
+        cls.objects.bulk_create(links)
+
+    @classmethod
+    def move_subtree(cls, node_id, parent_id):
+        """Перенос поддерева с корнем node_id под нового родителя."""
+        subtree = list(
+            cls.objects.filter(ancestor_id=node_id).values_list(
+                "descendant_id", "depth"
+            )
+        )
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        # Удаляем связи поддерева со старыми предками
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+        if parent_id is None:
+            return
+        ancestors = cls.objects.filter(descendant_id=parent_id).values_list(
+            "ancestor_id", "depth"
+        )
+        cls.objects.bulk_create(
+            [
+                cls(
+                    ancestor_id=ancestor_id,
+                    descendant_id=descendant_id,
+                    depth=ancestor_depth + depth + 1,
+                )
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, depth in subtree
+            ]
+        )
+
+    @classmethod
+    def get_tree_ids(cls, node_ids):
+        """Идентификаторы всех узлов деревьев, содержащих заданные узлы."""
+        return set(
+            cls.objects.filter(
+                ancestor_id__in=cls.objects.filter(
+                    descendant_id__in=node_ids
+                ).values("ancestor_id")
+            ).values_list("descendant_id", flat=True)
+        )
+
+    @classmethod
+    def get_ancestor_ids(cls, node_ids):
+        """Идентификаторы заданных узлов и всех их предков."""
+        return set(
+            cls.objects.filter(descendant_id__in=node_ids).values_list(
+                "ancestor_id", flat=True
+            )
+        )
+
+    @classmethod
+    def get_subtree_ids(cls, node_ids):
+        """Идентификаторы узлов поддеревьев с корнями в заданных узлах."""
+        return set(
+            cls.objects.filter(ancestor_id__in=node_ids).values_list(
+                "descendant_id", flat=True
+            )
+        )
+
+    @classmethod
+    def get_ancestor_map(cls, node_ids):
+        """Словарь {id узла: множество id узла и всех его предков}."""
+        ancestors = defaultdict(set)
+        for descendant_id, ancestor_id in cls.objects.filter(
+            descendant_id__in=node_ids
+        ).values_list("descendant_id", "ancestor_id"):
+            ancestors[descendant_id].add(ancestor_id)
+        return ancestors
+
+    @classmethod
+    def get_related_ids(cls, node_ids):
+        """
+        Идентификаторы заданных узлов, всех их предков и непосредственных
+        потомков.
+        """
+        related_ids = set(node_ids)
+        for ancestor_id, descendant_id in cls.objects.filter(
+            Q(descendant_id__in=related_ids)
+            | Q(ancestor_id__in=related_ids, depth=1)
+        ).values_list("ancestor_id", "descendant_id"):
+            related_ids.update((ancestor_id, descendant_id))
+        return related_ids
+
+    @classmethod
+    def creates_cycle(cls, node_id, parent_id):
+        """
+        Проверка, что перенос узла под parent_id создаст цикл, т.е. новый
+        родитель – сам узел или один из его потомков.
+
+        Выполняется одним запросом по уникальному индексу, без обхода
+        цепочки предков.
+        """
+        if node_id is None or parent_id is None:
+            return False
+        return cls.objects.filter(
+            ancestor_id=node_id, descendant_id=parent_id
+        ).exists()
+
+    @staticmethod
+    def find_cycle(parents, node_ids):
+        """
+        Поиск цикла, проходящего через один из узлов node_ids.
+
+        parents – словарь {id узла: id родителя или None}. Возвращает
+        id узла цикла или None. Каждый узел проверяется один раз.
+        """
+        checked = set()
+        for node_id in node_ids:
+            path = set()
+            current = node_id
+            while current is not None and current not in checked:
+                if current in path:
+                    return current
+                path.add(current)
+                current = parents.get(current)
+            checked |= path
+        return None
+
+    @classmethod
+    def build_links(cls, parents, node_ids):
+        """Связи узлов node_ids со всеми их предками в дереве parents."""
+        for node_id in node_ids:
+            ancestor_id, depth = node_id, 0
+            visited = set()
+            while ancestor_id is not None and ancestor_id not in visited:
+                visited.add(ancestor_id)
+                yield cls(
+                    ancestor_id=ancestor_id, descendant_id=node_id, depth=depth
+                )
+                ancestor_id, depth = parents.get(ancestor_id), depth + 1
+
+    @classmethod
+    def relink(cls, parents, node_ids):
+        """
+        Перестроение связей заданных узлов с предками, например после
+        переноса нескольких поддеревьев.
+
+        parents – словарь {id узла: id родителя или None} с новым
+        положением узлов.
+        """
+        cls.objects.filter(descendant_id__in=node_ids).delete()
+        cls.objects.bulk_create(
+            cls.build_links(parents, node_ids), batch_size=1000
+        )
+
+    @classmethod
+    def rebuild(cls, parents):
+        """
+        Полное перестроение таблицы замыкания.
+
+        parents – словарь {id узла: id родителя или None}.
+        """
+        cls.objects.all().delete()
+        cls.objects.bulk_create(
+            cls.build_links(parents, parents), batch_size=1000
+        )
@@ -0,0 +1,94 @@
+"""
+Публикация задач Celery через таблицу outbox.
+
+Вместо вызова task.delay() в обработчике запроса задача записывается
+функцией enqueue в таблицу OutboxMessage в той же транзакции, что и
+изменение данных: задача не теряется при недоступности брокера и не
+публикуется при откате транзакции, а запрос не ждет брокер.
+
+Записанные сообщения публикует задача company.tasks.relay_outbox
+(по расписанию Celery beat) пачками через одно соединение с брокером.
+Сообщения задач с атрибутом outbox_merge (имя аргумента-списка)
+объединяются в пачке в одну задачу со всеми элементами списков.
+Доставка выполняется не менее одного раза: при ошибке публикации пачка
+публикуется повторно целиком.
+"""
+import logging
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+
+from company.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, **kwargs):
+    """
+    Запись задачи с именованными аргументами в outbox (в текущей
+    транзакции, если она открыта).
+    """
+    return OutboxMessage.objects.create(task=task.name, kwargs=kwargs)
+
+
+def merge_messages(messages):
+    """
+    Задачи и аргументы для публикации пачки сообщений с объединением
+    сообщений задач с атрибутом outbox_merge.
+    """
+    merged = {}
+    calls = []
+    for message in messages:
+        # Незарегистрированные в процессе задачи публикуются по имени
+        task = current_app.tasks.get(message.task, message.task)
+        field = getattr(task, "outbox_merge", None)
+        if field is None:
+            calls.append((task, message.kwargs))
+        elif task.name in merged:
+            merged[task.name][field].extend(message.kwargs[field])
+        else:
+            kwargs = {**message.kwargs, field: list(message.kwargs[field])}
+            merged[task.name] = kwargs
+            calls.append((task, kwargs))
+    return calls
+
+
+def publish(messages):
+    """Публикация сообщений через одно соединение с брокером."""
+    with current_app.producer_or_acquire() as producer:
+        for task, kwargs in merge_messages(messages):
+            if isinstance(task, str):
+                current_app.send_task(task, kwargs=kwargs, producer=producer)
+            else:
+                task.apply_async(kwargs=kwargs, producer=producer)
+
+
+def relay(batch_size=None):
+    """
+    Публикация сообщений outbox пачками до опустошения таблицы.
+    Возвращает число опубликованных сообщений.
+
+    Пачка выбирается с блокировкой строк (SKIP LOCKED), поэтому
+    несколько одновременных публикаций не отправляют сообщения дважды.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    published = 0
+    while True:
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects.select_for_update(skip_locked=True)
+                .order_by("id")[:batch_size]
+            )
+            if not messages:
+                break
+            publish(messages)
+            OutboxMessage.objects.filter(
+                id__in=[message.id for message in messages]
+            ).delete()
+        published += len(messages)
+        if len(messages) < batch_size:
+            break
+    if published:
+        logger.info("Published %s outbox messages.", published)
+    return published
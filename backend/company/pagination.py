@@ -0,0 +1,133 @@
+from rest_framework import pagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# Порядок выборки, совместимый с keyset-пагинацией (пустой – порядок не
+# задан представлением)
+KEYSET_ORDERINGS = ((), ("id",), ("pk",))
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Keyset-пагинация по первичному ключу.
+
+    Выборка следующей страницы выполняется условием id > <последний id>
+    по индексу, без OFFSET и без подсчета общего числа записей.
+    """
+
+    ordering = "id"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "limit"
+
+
+class LimitOffsetCursorPagination(pagination.LimitOffsetPagination):
+    """
+    Пагинация limit/offset с дополнительным режимом курсора.
+
+    Режим курсора включается параметром запроса cursor (для первой
+    страницы можно передать пустое значение: ?cursor=) и использует
+    KeysetPagination. Курсор упорядочивает записи по id, поэтому для
+    выборок с другим порядком (например, поиск с ранжированием или
+    потомки департамента по глубине) режим курсора недоступен и запрос
+    отклоняется с ошибкой 400.
+
+    В режиме limit/offset подсчет общего числа записей можно отключить
+    параметром with_count=false, тогда count = null, а наличие следующей
+    страницы определяется выборкой limit + 1 записей.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "with_count"
+
+    cursor_paginator = None
+    has_next = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            if tuple(queryset.query.order_by) not in KEYSET_ORDERINGS:
+                raise ValidationError(
+                    {
+                        self.cursor_query_param: "Курсор недоступен для "
+                        "выборки с порядком, отличным от порядка по id."
+                    }
+                )
+            self.cursor_paginator = KeysetPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        if self.is_count_requested(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = None
+        self.offset = self.get_offset(request)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def is_count_requested(self, request):
+        """Нужно ли считать общее число записей."""
+        value = request.query_params.get(self.count_query_param, "true")
+        return value.lower() not in ("false", "0", "no")
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.count is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["required"] = ["results"]
+        response_schema["properties"]["count"]["nullable"] = True
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.extend(
+            [
+                {
+                    "name": self.cursor_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": "Курсор страницы (keyset-пагинация по id). "
+                                   "Для первой страницы передается пустое "
+                                   "значение. Недоступен для выборок с "
+                                   "другим порядком (поиск, потомки).",
+                    "schema": {"type": "string"},
+                },
+                {
+                    "name": self.count_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": "Подсчитывать ли общее число записей "
+                                   "(по умолчанию true).",
+                    "schema": {"type": "boolean"},
+                },
+            ]
+        )
+        return parameters
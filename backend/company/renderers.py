@@ -0,0 +1,77 @@
+"""
+Быстрые рендереры ответов API.
+
+Значения, которые не являются простыми типами JSON (дата и время,
+ленивые строки переводов, Decimal, UUID и т.д.), преобразуются
+JSONEncoder DRF, поэтому формат значений совпадает со стандартным
+JSONRenderer. Даты полей сериализаторов (DATE_FORMAT) к этому моменту
+уже преобразованы в строки самими сериализаторами.
+"""
+import msgpack
+import orjson
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+def encode_default(value):
+    """Преобразование значения, не поддерживаемого кодировщиком."""
+    return _encoder.default(value)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    Рендерер JSON на основе orjson.
+
+    Вывод компактный, без экранирования не-ASCII символов (кроме U+2028 и
+    U+2029, как в JSONRenderer DRF). Значения, которые orjson не может
+    закодировать (например, целые числа больше 64 бит), и запросы
+    с отступами (параметр indent типа содержимого) обрабатываются
+    стандартным рендерером.
+
+    Отличия от JSONRenderer DRF: NaN и бесконечность выводятся как null
+    (DRF выбрасывает ошибку), а у вещественных чисел может отличаться
+    запись того же значения (1e16 вместо 1e+16).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            content = orjson.dumps(
+                data, default=encode_default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Разделители строк допустимы в JSON, но не в JavaScript
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return content
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Рендерер MessagePack (Accept: application/msgpack)."""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(
+            data, default=encode_default, use_bin_type=True, datetime=False
+        )
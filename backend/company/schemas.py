@@ -1,6 +1,11 @@
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+                                   extend_schema_view)
 
-from company.serializers import AdditionalFieldSerializer, MetricSerializer
+from company.serializers import (AdditionalFieldSerializer,
+                                 MetricAggregateQuerySerializer,
+                                 MetricAggregateSerializer, MetricSerializer,
+                                 MetricValuesIngestSerializer)
 
 ADD_FIELD_SCHEMA = extend_schema(
     request=AdditionalFieldSerializer,
@@ -27,3 +32,58 @@ GET_FIELDS_SCHEMA = extend_schema(
     description="Получение списка дополнительных полей.",
     summary="Получение списка дополнительных полей.",
 )
+
+INGEST_METRIC_VALUES_SCHEMA = extend_schema(
+    request=MetricValuesIngestSerializer,
+    responses={200: OpenApiTypes.OBJECT},
+    description="Загрузка значений метрики объекта (временного ряда). "
+                "Метрика с указанным названием создается, если ее нет. "
+                "Значения с уже существующим временем перезаписываются.",
+    summary="Загрузка значений метрики.",
+)
+
+AGGREGATE_METRIC_SCHEMA = extend_schema(
+    parameters=[MetricAggregateQuerySerializer],
+    responses={200: MetricAggregateSerializer(many=True)},
+    description="Агрегация значений метрики по периодам (день, неделя, "
+                "месяц) функцией sum, avg, min или max. С параметром "
+                "subtree=true для департаментов и продуктов учитываются "
+                "значения метрики всех дочерних объектов.",
+    summary="Агрегация значений метрики.",
+)
+
+INCLUDE_PARAMETER = OpenApiParameter(
+    name="include",
+    description="Добавление в ответ связанных данных объектов через "
+                "запятую: fields – дополнительные поля, metrics – метрики. "
+                "Например: ?include=fields,metrics",
+    required=False,
+    type=OpenApiTypes.STR,
+)
+
+FIELDS_PARAMETER = OpenApiParameter(
+    name="fields",
+    description="Поля объектов в ответе через запятую. Связанные объекты "
+                "выводятся идентификаторами, если не перечислены в "
+                "expand. Например: ?fields=id,product_name",
+    required=False,
+    type=OpenApiTypes.STR,
+)
+
+EXPAND_PARAMETER = OpenApiParameter(
+    name="expand",
+    description="Связанные объекты, которые выводятся целиком при выборе "
+                "полей параметром fields (по умолчанию – идентификаторы). "
+                "Например: ?fields=id,product_manager&expand=product_manager",
+    required=False,
+    type=OpenApiTypes.STR,
+)
+
+BASE_SCHEMA = extend_schema_view(
+    list=extend_schema(
+        parameters=[INCLUDE_PARAMETER, FIELDS_PARAMETER, EXPAND_PARAMETER]
+    ),
+    retrieve=extend_schema(
+        parameters=[INCLUDE_PARAMETER, FIELDS_PARAMETER, EXPAND_PARAMETER]
+    ),
+)
@@ -1,6 +1,15 @@
+from operator import attrgetter
+
 from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 
+from company.constants import (METRIC_FUNCTIONS, METRIC_PERIODS,
+                               METRIC_VALUES_MAX_COUNT,
+                               MOVE_SUBTREES_MAX_COUNT)
 from company.models import AdditionalField, Metric
 
 User = get_user_model()
@@ -29,6 +38,56 @@ class AddEmployeesBaseSerializer(serializers.Serializer):
         return list(provided_ids)
 
 
+class MoveNodeSerializer(serializers.Serializer):
+    """Сериализатор для переноса узла дерева под нового родителя."""
+
+    id = serializers.IntegerField(min_value=1)
+    parent = serializers.IntegerField(min_value=1, allow_null=True)
+
+
+class MoveSubtreesBaseSerializer(serializers.Serializer):
+    """
+    Базовый сериализатор для переноса нескольких поддеревьев.
+
+    В наследниках задается модель дерева tree_model.
+    """
+
+    tree_model = None
+
+    moves = MoveNodeSerializer(
+        many=True, allow_empty=False, max_length=MOVE_SUBTREES_MAX_COUNT
+    )
+
+    def validate_moves(self, value):
+        """
+        Проверяем, что каждый узел переносится один раз, а узлы и новые
+        родители существуют в БД. Возвращаем словарь
+        {id узла: id нового родителя}.
+        """
+        moves = {}
+        for move in value:
+            if move["id"] in moves:
+                raise serializers.ValidationError(
+                    f"Узел {move['id']} переносится несколько раз."
+                )
+            if move["id"] == move["parent"]:
+                raise serializers.ValidationError(
+                    f"Узел {move['id']} не может быть родителем самому себе."
+                )
+            moves[move["id"]] = move["parent"]
+        node_ids = moves.keys() | set(moves.values()) - {None}
+        existing_ids = set(
+            self.tree_model.objects.filter(id__in=node_ids).values_list(
+                "id", flat=True
+            )
+        )
+        if missing_ids := node_ids - existing_ids:
+            raise serializers.ValidationError(
+                f"Следующие узлы не существуют: {sorted(missing_ids)}"
+            )
+        return moves
+
+
 class AdditionalFieldSerializer(serializers.ModelSerializer):
     """Сериализатор для дополнительного поля."""
 
@@ -47,3 +106,136 @@ class MetricSerializer(serializers.ModelSerializer):
     class Meta:
         model = Metric
         fields = ["id", "name", "description"]
+
+
+class MetricPointSerializer(serializers.Serializer):
+    """Сериализатор значения метрики."""
+
+    timestamp = serializers.DateTimeField()
+    value = serializers.FloatField()
+
+
+class MetricValuesIngestSerializer(serializers.Serializer):
+    """Сериализатор для загрузки значений метрики."""
+
+    metric = serializers.CharField(max_length=255)
+    points = serializers.ListField(
+        child=MetricPointSerializer(),
+        allow_empty=False,
+        max_length=METRIC_VALUES_MAX_COUNT,
+    )
+
+
+class MetricAggregateQuerySerializer(serializers.Serializer):
+    """Сериализатор параметров агрегации значений метрики."""
+
+    metric = serializers.CharField(max_length=255)
+    period = serializers.ChoiceField(choices=METRIC_PERIODS, default="day")
+    function = serializers.ChoiceField(
+        choices=METRIC_FUNCTIONS, default="avg"
+    )
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    subtree = serializers.BooleanField(default=False)
+
+
+class MetricAggregateSerializer(serializers.Serializer):
+    """Сериализатор агрегированного значения метрики за период."""
+
+    period = serializers.DateTimeField()
+    value = serializers.FloatField()
+
+
+def get_model_attname(field):
+    """
+    Имя атрибута модели, из которого поле сериализатора модели читает
+    значение напрямую, или None.
+
+    Для внешних ключей, выводимых идентификатором, это столбец
+    идентификатора (например, product_id).
+    """
+    model = getattr(getattr(field.parent, "Meta", None), "model", None)
+    if model is None or len(field.source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.many_to_many:
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            return None
+        return model_field.attname
+    if isinstance(field, serializers.RelatedField):
+        return None
+    return model_field.name
+
+
+def compile_field(field):
+    """
+    Функция получения значения поля объекта, эквивалентная чтению поля
+    сериализатором DRF.
+    """
+    if isinstance(field, serializers.ListSerializer):
+        child = compile_serializer(field.child)
+
+        def convert(value):
+            if isinstance(value, BaseManager):
+                value = value.all()
+            return [child(item) for item in value]
+
+    elif isinstance(field, serializers.BaseSerializer):
+        convert = compile_serializer(field)
+    elif isinstance(field, serializers.ReadOnlyField):
+        convert = None
+    else:
+        convert = field.to_representation
+
+    attname = get_model_attname(field)
+    if attname is None:
+        # Общий случай: атрибут читается средствами поля DRF
+        get = field.get_attribute
+    else:
+        get = attrgetter(attname)
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            convert = None
+
+    def get_value(instance):
+        value = get(instance)
+        if value is None or (
+            isinstance(value, PKOnlyObject) and value.pk is None
+        ):
+            return None
+        return value if convert is None else convert(value)
+
+    return get_value
+
+
+def compile_serializer(serializer):
+    """
+    Функция представления объекта для чтения, эквивалентная
+    serializer.to_representation, но без разбора полей для каждого
+    объекта.
+
+    Поля сериализатора (с контекстом запроса) разбираются один раз:
+    значения полей модели читаются напрямую из атрибутов объекта, внешние
+    ключи – из столбцов идентификаторов, вложенные сериализаторы
+    компилируются рекурсивно. Остальные поля читаются и преобразуются
+    самими полями DRF, поэтому ответ совпадает с ответом сериализатора.
+    """
+    fields = [
+        (field.field_name, compile_field(field))
+        for field in serializer._readable_fields
+    ]
+
+    def represent(instance):
+        data = {}
+        for name, get_value in fields:
+            try:
+                data[name] = get_value(instance)
+            except SkipField:
+                pass
+        return data
+
+    return represent
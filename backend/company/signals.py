@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from company.cache import invalidate
+from company.models import AdditionalField, Metric
+
+
+@receiver(post_save, sender=AdditionalField)
+@receiver(post_delete, sender=AdditionalField)
+@receiver(post_save, sender=Metric)
+@receiver(post_delete, sender=Metric)
+def invalidate_additional_data(sender, instance, **kwargs):
+    """
+    Инвалидация кэша ответов объекта с дополнительными данными (и
+    списков, в которые они добавляются параметром ?include=).
+    """
+    invalidate(instance.content_type.model_class(), [instance.object_id])
@@ -0,0 +1,190 @@
+"""
+Выборочные поля ответа (?fields=) и раскрытие связей (?expand=).
+
+В выборочном режиме сериализатор оставляет только запрошенные поля, а
+связанные объекты выводятся идентификаторами, если они не перечислены
+в expand. Queryset сокращается под итоговый сериализатор: из .only(),
+select_related и prefetch_related убираются поля и связи, которые не
+попадут в ответ.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(value):
+    """Множество имен из значения параметра через запятую."""
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def get_model_field(serializer, source):
+    """Поле модели сериализатора по имени или None."""
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if model is None:
+        return None
+    try:
+        return model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+
+
+def is_expandable(field):
+    """Является ли поле вложенным сериализатором связанного объекта."""
+    if not isinstance(field, serializers.BaseSerializer):
+        return False
+    if len(field.source_attrs) != 1:
+        return False
+    model_field = get_model_field(field.parent, field.source)
+    return model_field is not None and model_field.is_relation
+
+
+def is_pk_only(field):
+    """Выводит ли поле только идентификаторы связанных объектов."""
+    if isinstance(field, serializers.ManyRelatedField):
+        field = field.child_relation
+    return isinstance(field, serializers.PrimaryKeyRelatedField)
+
+
+def sparse_serializer(serializer, fields=None, expand=()):
+    """
+    Сокращение полей сериализатора (для списка – дочернего сериализатора).
+
+    fields – имена выводимых полей (None – все поля), expand – вложенные
+    сериализаторы, которые выводятся целиком; остальные вложенные
+    сериализаторы связей заменяются идентификаторами.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.Serializer):
+        return
+    readable = {
+        name
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    }
+    if fields is None:
+        fields = readable
+    unknown = fields - readable
+    if unknown:
+        raise ValidationError(
+            {"fields": f"Неизвестные поля: {', '.join(sorted(unknown))}."}
+        )
+    expandable = {
+        name for name in fields if is_expandable(serializer.fields[name])
+    }
+    unknown = set(expand) - expandable
+    if unknown:
+        raise ValidationError(
+            {
+                "expand": "Поля нельзя раскрыть: "
+                f"{', '.join(sorted(unknown))}."
+            }
+        )
+    for name in list(serializer.fields):
+        if name not in fields:
+            del serializer.fields[name]
+    for name in expandable - set(expand):
+        field = serializer.fields[name]
+        kwargs = {"read_only": True}
+        if field.source != name:
+            kwargs["source"] = field.source
+        if isinstance(field, serializers.ListSerializer):
+            kwargs["many"] = True
+        serializer.fields[name] = serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+def get_source_roots(serializer):
+    """
+    Атрибуты модели, которые читает сериализатор: все атрибуты и те, у
+    которых читаются связанные объекты (а не только идентификаторы).
+    None, если поле читает объект целиком (source="*").
+    """
+    loaded, traversed = set(), set()
+    for field in serializer._readable_fields:
+        if field.source == "*":
+            return None
+        root = field.source_attrs[0]
+        loaded.add(root)
+        if len(field.source_attrs) > 1 or not is_pk_only(field):
+            traversed.add(root)
+    return loaded, traversed
+
+
+def flatten_select_related(tree, prefix=""):
+    """Пути select_related из дерева query.select_related."""
+    paths = []
+    for name, children in tree.items():
+        path = f"{prefix}{name}"
+        paths.extend(
+            flatten_select_related(children, f"{path}{LOOKUP_SEP}")
+            if children
+            else [path]
+        )
+    return paths
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    Сокращение queryset под поля сериализатора.
+
+    Из .only() удаляются поля, которые сериализатор не читает, из
+    select_related и prefetch_related – связи, объекты которых не
+    выводятся. Для queryset без .only() загружаются только читаемые
+    поля модели.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(queryset, QuerySet) or not isinstance(
+        serializer, serializers.Serializer
+    ):
+        return queryset
+    roots = get_source_roots(serializer)
+    if roots is None:
+        return queryset
+    loaded, traversed = roots
+
+    def is_needed(path):
+        root, _, rest = path.partition(LOOKUP_SEP)
+        return root in (traversed if rest else loaded)
+
+    select_related = queryset.query.select_related
+    if isinstance(select_related, dict):
+        paths = [
+            path
+            for path in flatten_select_related(select_related)
+            if path.split(LOOKUP_SEP)[0] in traversed
+        ]
+        queryset = queryset.select_related(None)
+        if paths:
+            queryset = queryset.select_related(*paths)
+
+    lookups = [
+        lookup
+        for lookup in queryset._prefetch_related_lookups
+        if is_needed(
+            lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+        )
+    ]
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+    names, defer = queryset.query.deferred_loading
+    if defer and names:
+        # Явно отложенные поля (.defer()) не меняются
+        return queryset
+    opts = queryset.model._meta
+    only = {name for name in names if is_needed(name)}
+    for root in loaded:
+        try:
+            model_field = opts.get_field(root)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.concrete or model_field.many_to_many:
+            continue
+        if defer or any(
+            name == root or name.startswith(f"{root}{LOOKUP_SEP}")
+            for name in names
+        ):
+            only.add(root)
+    return queryset.only(opts.pk.name, *only)
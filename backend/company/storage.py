@@ -0,0 +1,149 @@
+"""
+Контентно-адресуемое хранилище файлов.
+
+Файл сохраняется под именем из SHA-256 содержимого
+(<каталог>/<2 первых символа>/<хеш><расширение>), поэтому одинаковые
+файлы хранятся один раз, а содержимое файла по имени никогда не
+меняется: nginx отдает такие файлы с бессрочным кэшированием.
+
+Один файл может использоваться несколькими объектами, поэтому файлы не
+удаляются напрямую: владельцы учитывают ссылки методами acquire и
+release (см. users.signals), а файлы без ссылок удаляет команда
+collect_media_garbage.
+"""
+import hashlib
+import os
+import posixpath
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from company.models import MediaBlob
+
+CONTENT_NAME_REGEX = re.compile(
+    r"(?:^|/)(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{62}(?:\.\w+)?$"
+)
+
+
+@deconstructible(path="company.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище с именами файлов по хешу содержимого."""
+
+    def get_content_name(self, name, content):
+        """Имя файла по хешу содержимого в каталоге исходного имени."""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        hexdigest = digest.hexdigest()
+        return posixpath.join(
+            directory, hexdigest[:2], f"{hexdigest}{extension}"
+        )
+
+    def is_content_name(self, name):
+        return CONTENT_NAME_REGEX.search(name) is not None
+
+    def save(self, name, content, max_length=None):
+        """
+        Сохранение файла. Если файл с таким содержимым уже есть, новый
+        файл не записывается. Ссылка на файл не учитывается (см.
+        acquire): файл без ссылок будет удален сборкой мусора.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        with transaction.atomic():
+            # Блокировка записи не дает сборке мусора удалить файл,
+            # а дата изменения откладывает его удаление
+            MediaBlob.objects.update_or_create(
+                name=name, defaults={"updated_at": timezone.now()}
+            )
+            if not self.exists(name):
+                saved = super().save(name, content, max_length)
+                if saved != name:
+                    # Такой же файл одновременно записан другим процессом
+                    super().delete(saved)
+        return name
+
+    def acquire(self, names):
+        """Добавление ссылок на файлы."""
+        for name, count in Counter(names).items():
+            if not MediaBlob.objects.filter(name=name).update(
+                ref_count=F("ref_count") + count,
+                updated_at=timezone.now(),
+            ):
+                MediaBlob.objects.create(name=name, ref_count=count)
+
+    def release(self, names):
+        """
+        Удаление ссылок на файлы. Файлы, сохраненные до подключения
+        хранилища (с исходными именами), не разделяются между объектами
+        и удаляются сразу.
+        """
+        for name, count in Counter(names).items():
+            if self.is_content_name(name):
+                MediaBlob.objects.filter(name=name).update(
+                    ref_count=Greatest(F("ref_count") - count, 0),
+                    updated_at=timezone.now(),
+                )
+            else:
+                self.delete(name)
+
+    def collect_garbage(self, min_age):
+        """
+        Удаление файлов без ссылок, не изменявшихся min_age секунд, и
+        файлов, отсутствующих в учете ссылок. Возвращает число
+        удаленных файлов.
+        """
+        threshold = timezone.now() - timedelta(seconds=min_age)
+        deleted = 0
+        garbage = MediaBlob.objects.filter(
+            ref_count=0, updated_at__lt=threshold
+        )
+        for blob_id in list(garbage.values_list("id", flat=True)):
+            with transaction.atomic():
+                # Файл могли снова сохранить или назначить объекту
+                blob = (
+                    garbage.select_for_update(skip_locked=True)
+                    .filter(id=blob_id)
+                    .first()
+                )
+                if blob is None:
+                    continue
+                self.delete(blob.name)
+                blob.delete()
+            deleted += 1
+        for name in self.list_content_names():
+            if (
+                self.get_modified_time(name) < threshold
+                and not MediaBlob.objects.filter(name=name).exists()
+            ):
+                self.delete(name)
+                deleted += 1
+        return deleted
+
+    def list_content_names(self):
+        """Имена всех файлов хранилища с именами по хешу содержимого."""
+        for root, _, filenames in os.walk(self.location):
+            directory = os.path.relpath(root, self.location)
+            for filename in filenames:
+                name = posixpath.normpath(
+                    posixpath.join(
+                        directory.replace(os.sep, "/"), filename
+                    )
+                )
+                if self.is_content_name(name):
+                    yield name
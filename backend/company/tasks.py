@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from company.outbox import relay
+
+
+@shared_task(ignore_result=True)
+def relay_outbox():
+    """Публикация задач из outbox в брокер."""
+    return relay()
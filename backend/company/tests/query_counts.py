@@ -0,0 +1,325 @@
+"""
+Проверка числа SQL-запросов действий ViewSet.
+
+QueryCountTestCase находит все GET-действия ViewSet, зарегистрированные
+в роутерах (по URL-конфигурации проекта), выполняет каждое действие
+после добавления count и count * factor объектов и проверяет, что число
+SQL-запросов не изменилось. При расхождении тест падает со списком
+запросов, число которых выросло (как правило, это N+1: загрузка
+отложенного поля или связанного объекта для каждой строки).
+
+Проверяются только GET-действия: данные их ответов растут с числом
+объектов в БД, и запросы к ним можно выполнить без тела запроса.
+Запросы действий изменения (create, update, destroy и POST/PATCH/DELETE
+действия ViewSet) зависят от содержимого запроса, которое нельзя
+сформировать автоматически; такие действия проверяются тестами
+приложений.
+
+На тех же данных проверяется, что ответы действий со скомпилированными
+сериализаторами (fast_serialization) совпадают с ответами сериализаторов
+DRF, а выборочные поля (?fields=, ?expand=) сокращают запросы и
+отклоняют неизвестные имена.
+"""
+import abc
+import itertools
+import re
+from collections import Counter
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from company.models import AdditionalField, Metric, MetricValue
+from users.constants import GRADES, JOB_TYPES
+
+User = get_user_model()
+
+# Литералы в тексте запросов: строки, числа и списки параметров IN (...)
+SQL_LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(\.\d+)?\b"), "?"),
+    (re.compile(r"\((?:\?, )*\?\)"), "(...)"),
+)
+
+
+def iter_viewset_patterns(patterns=None, namespace=""):
+    """
+    Адреса GET-действий ViewSet, зарегистрированных в роутерах: пары
+    (view-функция, имя адреса с пространством имен). Адреса с суффиксом
+    формата (.json) не учитываются.
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_viewset_patterns(
+                pattern.url_patterns,
+                ":".join(filter(None, (namespace, pattern.namespace))),
+            )
+            continue
+        callback = pattern.callback
+        if (
+            getattr(callback, "cls", None) is None
+            or "get" not in getattr(callback, "actions", {})
+            or "format" in pattern.pattern.regex.groupindex
+        ):
+            continue
+        yield pattern, ":".join(filter(None, (namespace, pattern.name)))
+
+
+def get_viewset_actions(viewset):
+    """
+    GET-действия ViewSet: словарь {действие: (имя адреса, параметры
+    адреса)}.
+    """
+    return {
+        pattern.callback.actions["get"]: (
+            name, set(pattern.pattern.regex.groupindex)
+        )
+        for pattern, name in iter_viewset_patterns()
+        if pattern.callback.cls is viewset
+    }
+
+
+def normalize_sql(sql):
+    """Текст запроса без литералов (для группировки одинаковых запросов)."""
+    for regex, replacement in SQL_LITERALS:
+        sql = regex.sub(replacement, sql)
+    return sql
+
+
+def get_query_shape(queries):
+    """
+    Число выбираемых столбцов SELECT-запросов (по запятым до FROM, без
+    учета вложенных запросов) и соединений таблиц (JOIN) в запросах.
+    """
+    columns = joins = 0
+    for query in queries:
+        sql = query["sql"]
+        if sql.startswith("SELECT"):
+            columns += sql.split(" FROM ", 1)[0].count(",") + 1
+        joins += sql.count(" JOIN ")
+    return columns, joins
+
+
+def format_query_diff(first, second):
+    """Запросы, число которых выросло, с числом повторов."""
+    first = Counter(normalize_sql(query["sql"]) for query in first)
+    second = Counter(normalize_sql(query["sql"]) for query in second)
+    return "\n".join(
+        f"  {count - first[sql]} x {sql}"
+        for sql, count in second.most_common()
+        if count > first[sql]
+    )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+)
+class QueryCountTestCase(APITestCase, metaclass=abc.ABCMeta):
+    """
+    Базовый класс проверки постоянства числа SQL-запросов GET-действий
+    ViewSet (кэш ответов отключен).
+
+    В наследнике задаются viewset и методы create_objects (добавление
+    объектов, число которых влияет на ответы действий) и get_object
+    (объект detail-действий). Дополнительные поля и метрики объекта
+    добавляются базовым классом.
+    """
+
+    viewset = None
+    count = 2
+    factor = 10
+    # Параметры запросов по действиям. Параметр limit выводит все
+    # объекты на одну страницу, иначе N+1 на странице не изменится
+    # с ростом числа объектов
+    params = {
+        "aggregate_metric": {
+            "metric": "Выручка",
+            "period": "day",
+            "function": "sum",
+        },
+    }
+    default_params = {"limit": 1000}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.numbers = itertools.count()
+
+    def get_name(self, prefix):
+        """Уникальное название объекта."""
+        return f"{prefix} {next(self.numbers)}"
+
+    def create_employee(self, **fields):
+        number = next(self.numbers)
+        return User.objects.create_user(
+            email=f"employee{number}@example.com",
+            employee_fio=f"Сотрудник {number}",
+            employee_grade=GRADES[number % len(GRADES)][0],
+            employee_type_job=JOB_TYPES[number % len(JOB_TYPES)][0],
+            **fields,
+        )
+
+    @abc.abstractmethod
+    def create_objects(self, count):
+        """Добавление count объектов для каждого проверяемого действия."""
+
+    @abc.abstractmethod
+    def get_object(self):
+        """Объект, для которого выполняются detail-действия."""
+
+    def get_url_kwargs(self, action, kwargs):
+        """Параметры адреса действия."""
+        return {"pk": self.get_object().pk} if "pk" in kwargs else {}
+
+    def seed(self, count):
+        self.create_objects(count)
+        model_object = self.get_object()
+        content_type = ContentType.objects.get_for_model(model_object)
+        now = timezone.now()
+        for number in range(count):
+            AdditionalField.objects.create(
+                content_type=content_type,
+                object_id=model_object.pk,
+                name=f"Поле {number}",
+                description="Значение",
+            )
+            metric = Metric.objects.create(
+                content_type=content_type,
+                object_id=model_object.pk,
+                name="Выручка",
+                description="Метрика",
+            )
+            MetricValue.objects.create(
+                metric=metric,
+                timestamp=now - timezone.timedelta(days=number),
+                value=number,
+            )
+
+    def request(self, action, name, kwargs, extra_params=None):
+        """Запрос к действию (с чтением содержимого потокового ответа)."""
+        url = reverse(name, kwargs=self.get_url_kwargs(action, kwargs))
+        params = {
+            **self.default_params,
+            **self.params.get(action, {}),
+            **(extra_params or {}),
+        }
+        response = self.client.get(url, params)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            f"{action}: {getattr(response, 'data', '')}",
+        )
+        return response
+
+    def capture(self, action, name, kwargs, extra_params=None):
+        """SQL-запросы, выполненные при запросе к действию."""
+        with CaptureQueriesContext(connection) as context:
+            self.request(action, name, kwargs, extra_params)
+        return context.captured_queries
+
+    def test_query_count_is_constant(self):
+        actions = get_viewset_actions(self.viewset)
+        self.assertTrue(actions, f"{self.viewset.__name__}: нет действий")
+        self.seed(self.count)
+        first = {
+            action: self.capture(action, name, kwargs)
+            for action, (name, kwargs) in actions.items()
+        }
+        self.seed(self.count * (self.factor - 1))
+        for action, (name, kwargs) in actions.items():
+            with self.subTest(action=action):
+                second = self.capture(action, name, kwargs)
+                if len(second) != len(first[action]):
+                    self.fail(
+                        f"{self.viewset.__name__}.{action}: "
+                        f"{len(first[action])} SQL-запросов для "
+                        f"{self.count} объектов и {len(second)} для "
+                        f"{self.count * self.factor}. Добавились запросы:\n"
+                        + format_query_diff(first[action], second)
+                    )
+
+    def test_fast_serialization(self):
+        """
+        Ответы действий fast_serialization совпадают с ответами
+        сериализаторов DRF.
+        """
+        actions = get_viewset_actions(self.viewset)
+        self.seed(self.count)
+        for action in self.viewset.fast_serialization:
+            name, kwargs = actions[action]
+            with self.subTest(action=action):
+                fast = self.request(action, name, kwargs)
+                with mock.patch.object(
+                    self.viewset, "fast_serialization", ()
+                ):
+                    slow = self.request(action, name, kwargs)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_sparse_fields(self):
+        """
+        Ответ списка и объекта с ?fields=id содержит только id, требует
+        не больше SQL-запросов, чем полный ответ, и выбирает меньше
+        столбцов и соединений таблиц.
+        """
+        actions = get_viewset_actions(self.viewset)
+        self.seed(self.count)
+        for action in ("list", "retrieve"):
+            if action not in actions:
+                continue
+            name, kwargs = actions[action]
+            with self.subTest(action=action):
+                full = self.capture(action, name, kwargs)
+                sparse = self.capture(action, name, kwargs, {"fields": "id"})
+                self.assertLessEqual(len(sparse), len(full))
+                full_columns, full_joins = get_query_shape(full)
+                sparse_columns, sparse_joins = get_query_shape(sparse)
+                self.assertLess(sparse_columns, full_columns)
+                if full_joins:
+                    self.assertLess(sparse_joins, full_joins)
+                url = reverse(
+                    name, kwargs=self.get_url_kwargs(action, kwargs)
+                )
+                data = self.client.get(
+                    url, {**self.default_params, "fields": "id"}
+                ).data
+                for item in data["results"] if action == "list" else [data]:
+                    self.assertEqual(list(item), ["id"])
+
+    def test_unknown_sparse_fields(self):
+        """Неизвестные поля в ?fields= и ?expand= – ошибка 400."""
+        actions = get_viewset_actions(self.viewset)
+        self.seed(1)
+        for action in ("list", "retrieve"):
+            if action not in actions:
+                continue
+            name, kwargs = actions[action]
+            url = reverse(name, kwargs=self.get_url_kwargs(action, kwargs))
+            for param in ("fields", "expand"):
+                with self.subTest(action=action, param=param):
+                    response = self.client.get(url, {param: "id,unknown"})
+                    self.assertEqual(
+                        response.status_code, status.HTTP_400_BAD_REQUEST
+                    )
+                    self.assertIn("unknown", response.data[param])
@@ -0,0 +1,718 @@
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from importlib import import_module
+from importlib.util import find_spec
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from kombu.exceptions import OperationalError
+from prometheus_client import REGISTRY
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from company import outbox
+from company.cache_backends import InstrumentedRedisCache
+from company.metrics import CeleryQueueCollector
+from company.models import (AdditionalField, MediaBlob, Metric,
+                            OutboxMessage)
+from company.renderers import ORJSONRenderer
+from company.storage import ContentAddressedStorage
+from company.tests import query_counts
+from departments.models import Department
+from products.models import Product
+from teams.models import Team
+from users.notifications import ADD_TO_TEAM, REMOVE_FROM_TEAM
+from users.tasks import import_employees, send_team_notifications
+
+User = get_user_model()
+
+
+class QueryCountCoverageTest(SimpleTestCase):
+    """Проверка числа SQL-запросов есть для каждого ViewSet проекта."""
+
+    def test_every_viewset_has_query_count_test(self):
+        for app_config in apps.get_app_configs():
+            if Path(app_config.path).is_relative_to(
+                settings.BASE_DIR
+            ) and find_spec(f"{app_config.name}.tests"):
+                import_module(f"{app_config.name}.tests")
+        covered = {
+            case.viewset
+            for case in query_counts.QueryCountTestCase.__subclasses__()
+        }
+        registered = {
+            pattern.callback.cls
+            for pattern, _ in query_counts.iter_viewset_patterns()
+        }
+        self.assertFalse(
+            {viewset.__name__ for viewset in registered - covered},
+            "ViewSet без проверки числа SQL-запросов "
+            "(см. company.tests.query_counts)",
+        )
+
+
+class OutboxTest(TestCase):
+    def enqueue_team_event(self, event, team_name, emails):
+        return outbox.enqueue(
+            send_team_notifications,
+            events=[
+                {"event": event, "team_name": team_name, "emails": emails}
+            ],
+        )
+
+    def test_message_is_written_in_transaction(self):
+        with transaction.atomic():
+            outbox.enqueue(import_employees, import_id=1)
+            transaction.set_rollback(True)
+        self.assertFalse(OutboxMessage.objects.exists())
+        outbox.enqueue(import_employees, import_id=1)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, import_employees.name)
+        self.assertEqual(message.kwargs, {"import_id": 1})
+
+    def test_mergeable_messages_are_published_as_one_task(self):
+        self.enqueue_team_event(ADD_TO_TEAM, "Альфа", ["a@a.ru"])
+        outbox.enqueue(import_employees, import_id=1)
+        self.enqueue_team_event(REMOVE_FROM_TEAM, "Бета", ["a@a.ru"])
+        calls = outbox.merge_messages(OutboxMessage.objects.order_by("id"))
+        self.assertEqual(
+            calls,
+            [
+                (
+                    send_team_notifications,
+                    {
+                        "events": [
+                            {
+                                "event": ADD_TO_TEAM,
+                                "team_name": "Альфа",
+                                "emails": ["a@a.ru"],
+                            },
+                            {
+                                "event": REMOVE_FROM_TEAM,
+                                "team_name": "Бета",
+                                "emails": ["a@a.ru"],
+                            },
+                        ]
+                    },
+                ),
+                (import_employees, {"import_id": 1}),
+            ],
+        )
+
+    def test_relay_publishes_in_batches(self):
+        for import_id in range(5):
+            outbox.enqueue(import_employees, import_id=import_id)
+        with mock.patch.object(outbox, "publish") as publish:
+            self.assertEqual(outbox.relay(batch_size=2), 5)
+        self.assertEqual(
+            [len(call.args[0]) for call in publish.call_args_list], [2, 2, 1]
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failed_batch_stays_in_outbox(self):
+        outbox.enqueue(import_employees, import_id=1)
+        with mock.patch.object(
+            outbox, "publish", side_effect=ConnectionError
+        ), self.assertRaises(ConnectionError):
+            outbox.relay()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        self.storage = ContentAddressedStorage(location=location.name)
+
+    def test_identical_files_are_stored_once(self):
+        name = self.storage.save("avatars/a.JPG", ContentFile(b"photo"))
+        self.assertRegex(name, r"^avatars/([0-9a-f]{2})/\1[0-9a-f]{62}\.jpg$")
+        self.assertEqual(
+            self.storage.save("avatars/b.jpg", ContentFile(b"photo")), name
+        )
+        self.assertNotEqual(
+            self.storage.save("avatars/a.jpg", ContentFile(b"other")), name
+        )
+        self.assertEqual(
+            os.listdir(self.storage.path(os.path.dirname(name))),
+            [os.path.basename(name)],
+        )
+
+    def test_garbage_collection(self):
+        used = self.storage.save("avatars/a.jpg", ContentFile(b"used"))
+        released = self.storage.save("avatars/b.jpg", ContentFile(b"old"))
+        unused = self.storage.save("avatars/c.jpg", ContentFile(b"unused"))
+        self.storage.acquire([used, released, released])
+        self.storage.release([released])
+        self.assertEqual(MediaBlob.objects.get(name=released).ref_count, 1)
+        self.storage.release([released])
+        # Файл без записи в учете ссылок
+        MediaBlob.objects.filter(name=unused).delete()
+
+        self.assertEqual(self.storage.collect_garbage(min_age=60), 0)
+        self.assertEqual(self.storage.collect_garbage(min_age=0), 2)
+        self.assertTrue(self.storage.exists(used))
+        self.assertFalse(self.storage.exists(released))
+        self.assertFalse(self.storage.exists(unused))
+        self.assertFalse(MediaBlob.objects.filter(name=released).exists())
+
+    def test_legacy_file_is_deleted_on_release(self):
+        path = self.storage.path("avatars/photo.jpg")
+        os.makedirs(os.path.dirname(path))
+        Path(path).write_bytes(b"photo")
+        self.storage.release(["avatars/photo.jpg"])
+        self.assertFalse(os.path.exists(path))
+
+
+class RendererTest(SimpleTestCase):
+    """Совпадение вывода ORJSONRenderer с JSONRenderer DRF."""
+
+    def assert_same_output(self, data):
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_same_output(self):
+        self.assert_same_output(
+            {
+                "date": date(2024, 2, 29),
+                "datetime": datetime(2024, 2, 29, 10, 30, 15, 123456),
+                "aware": datetime(2024, 2, 29, 10, 30, tzinfo=timezone.utc),
+                "time": time(10, 30, 15, 500),
+                "lazy": gettext_lazy("Сотрудник"),
+                "decimal": Decimal("12.50"),
+                "text": "Привет\u2028мир\u2029",
+                "big": 2**70,
+                "nested": [{"id": 1, "name": None}, 1.5, True],
+            }
+        )
+
+    def test_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indent(self):
+        self.assertEqual(
+            ORJSONRenderer().render(
+                {"ids": [1, 2]}, "application/json; indent=2"
+            ),
+            JSONRenderer().render(
+                {"ids": [1, 2]}, "application/json; indent=2"
+            ),
+        )
+
+
+class MetricAggregationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        # root -> child -> grandchild, other
+        cls.root = cls.create_department("root")
+        cls.child = cls.create_department("child", cls.root)
+        cls.grandchild = cls.create_department("grandchild", cls.child)
+        cls.other = cls.create_department("other")
+
+    @staticmethod
+    def create_department(name, parent=None):
+        return Department.objects.create(
+            departament_name=name,
+            departament_description="Описание",
+            parent_department=parent,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.ingest(
+            self.root,
+            {
+                "2024-03-01T09:00:00Z": 1,
+                "2024-03-01T18:00:00Z": 3,
+                "2024-03-02T12:00:00Z": 5,
+                "2024-03-11T12:00:00Z": 7,
+            },
+        )
+        self.ingest(self.child, {"2024-03-01T12:00:00Z": 10})
+        self.ingest(self.grandchild, {"2024-03-02T12:00:00Z": 20})
+        self.ingest(self.other, {"2024-03-01T12:00:00Z": 100})
+
+    def get_url(self, department, action):
+        return f"/api/department/department/{department.pk}/{action}/"
+
+    def ingest(self, department, points, metric="Выручка"):
+        response = self.client.post(
+            self.get_url(department, "metric_values"),
+            {
+                "metric": metric,
+                "points": [
+                    {"timestamp": timestamp, "value": value}
+                    for timestamp, value in points.items()
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def aggregate(self, department, **params):
+        response = self.client.get(
+            self.get_url(department, "metric_aggregate"),
+            {"metric": "Выручка", **params},
+        )
+        self.assertEqual(response.status_code, 200)
+        return [(item["period"][:10], item["value"]) for item in response.data]
+
+    def test_sum_and_avg_by_day(self):
+        self.assertEqual(
+            self.aggregate(self.root, period="day", function="sum"),
+            [("2024-03-01", 4), ("2024-03-02", 5), ("2024-03-11", 7)],
+        )
+        self.assertEqual(
+            self.aggregate(self.root, period="day", function="avg"),
+            [("2024-03-01", 2), ("2024-03-02", 5), ("2024-03-11", 7)],
+        )
+
+    def test_buckets_by_week_and_month(self):
+        # 2024-03-01 – пятница, неделя начинается с понедельника 26.02
+        self.assertEqual(
+            self.aggregate(self.root, period="week", function="sum"),
+            [("2024-02-26", 9), ("2024-03-11", 7)],
+        )
+        self.assertEqual(
+            self.aggregate(self.root, period="month", function="max"),
+            [("2024-03-01", 7)],
+        )
+
+    def test_date_range(self):
+        self.assertEqual(
+            self.aggregate(
+                self.root,
+                function="sum",
+                date_from="2024-03-01T12:00:00Z",
+                date_to="2024-03-11T00:00:00Z",
+            ),
+            [("2024-03-01", 3), ("2024-03-02", 5)],
+        )
+
+    def test_repeated_point_replaces_value(self):
+        self.ingest(self.root, {"2024-03-11T12:00:00Z": 8})
+        self.assertEqual(
+            self.aggregate(self.root, function="sum")[-1], ("2024-03-11", 8)
+        )
+
+    def test_subtree_rollup(self):
+        self.assertEqual(
+            self.aggregate(self.root, function="sum", subtree="true"),
+            [("2024-03-01", 14), ("2024-03-02", 25), ("2024-03-11", 7)],
+        )
+        self.assertEqual(
+            self.aggregate(self.child, function="sum", subtree="true"),
+            [("2024-03-01", 10), ("2024-03-02", 20)],
+        )
+        self.assertEqual(
+            self.aggregate(self.child, function="sum"),
+            [("2024-03-01", 10)],
+        )
+
+    def test_other_metric_is_not_aggregated(self):
+        self.ingest(self.root, {"2024-03-01T12:00:00Z": 50}, metric="Затраты")
+        self.assertEqual(
+            self.aggregate(self.root, function="sum")[0], ("2024-03-01", 4)
+        )
+
+
+class ServerTimingTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="employee@example.com", employee_fio="Сотрудник"
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    def test_enabled(self):
+        response = self.client.get(f"/api/users/{self.user.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(f"/api/users/{self.user.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class GenerateCompanyTest(TestCase):
+    def test_generate_and_benchmark(self):
+        User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        call_command(
+            "generate_company",
+            employees=20,
+            department_depth=2,
+            department_children=2,
+            product_depth=2,
+            product_children=2,
+            teams=2,
+            team_size=3,
+            skills=5,
+            employee_skills=2,
+            components=3,
+            metric_points=2,
+            seed=1,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 21)
+        self.assertEqual(Department.objects.count(), 6)
+        self.assertEqual(Product.objects.count(), 6)
+        self.assertEqual(Team.objects.count(), 2)
+
+        out = io.StringIO()
+        call_command(
+            "benchmark_api", repeat=1, warmup=0, json=True, stdout=out
+        )
+        results = json.loads(out.getvalue())
+        self.assertIn("users:list", {result["name"] for result in results})
+        for result in results:
+            self.assertGreater(result["queries"], 0, result["name"])
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class ConditionalRetrieveTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        cls.department = Department.objects.create(
+            departament_name="Департамент",
+            departament_description="Описание",
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/department/department/{self.department.pk}/"
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+    def test_modified(self):
+        response = self.client.get(self.url)
+        self.client.patch(
+            self.url, {"departament_name": "Новое название"}, format="json"
+        )
+        updated = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(updated.status_code, 200)
+        self.assertNotEqual(updated["ETag"], response["ETag"])
+        self.assertEqual(updated.data["departament_name"], "Новое название")
+
+    def test_not_found(self):
+        for url in (
+            "/api/department/department/",
+            "/api/product/product/",
+            "/api/team/team/",
+        ):
+            for pk in ("abc", "0"):
+                with self.subTest(url=url, pk=pk):
+                    response = self.client.get(f"{url}{pk}/")
+                    self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+)
+class PaginationTest(APITestCase):
+    url = "/api/department/department/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        cls.root = Department.objects.create(
+            departament_name="root", departament_description="Описание"
+        )
+        cls.departments = [cls.root] + [
+            Department.objects.create(
+                departament_name=f"child {number}",
+                departament_description="Описание",
+                parent_department=cls.root,
+            )
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_cursor(self):
+        response = self.client.get(self.url, {"cursor": "", "limit": 2})
+        self.assertEqual(
+            self.get_ids(response),
+            [department.pk for department in self.departments[:2]],
+        )
+        self.assertNotIn("count", response.data)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.get_ids(response), [self.departments[2].pk])
+        self.assertIsNone(response.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "invalid"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_ordering_is_rejected(self):
+        response = self.client.get(
+            f"{self.url}{self.root.pk}/descendants/", {"cursor": ""}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.data)
+
+    def test_without_count(self):
+        response = self.client.get(
+            self.url, {"limit": 2, "with_count": "false"}
+        )
+        self.assertEqual(len(self.get_ids(response)), 2)
+        self.assertIsNone(response.data["count"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.get_ids(response), [self.departments[2].pk])
+        self.assertIsNone(response.data["count"])
+        self.assertIsNone(response.data["next"])
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+)
+class IncludeTest(APITestCase):
+    url = "/api/department/department/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        cls.departments = [cls.create_department() for _ in range(2)]
+
+    @staticmethod
+    def create_department():
+        number = Department.objects.count()
+        department = Department.objects.create(
+            departament_name=f"Департамент {number}",
+            departament_description="Описание",
+        )
+        AdditionalField.objects.create(
+            content_object=department,
+            name=f"Поле {number}",
+            description="Значение",
+        )
+        Metric.objects.create(
+            content_object=department,
+            name=f"Метрика {number}",
+            description="Описание",
+        )
+        return department
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_list(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"], len(queries)
+
+    def assert_included(self, data, department):
+        self.assertEqual(
+            [item["name"] for item in data["fields"]],
+            list(
+                AdditionalField.objects.filter(
+                    object_id=department.pk
+                ).values_list("name", flat=True)
+            ),
+        )
+        self.assertEqual(
+            [item["name"] for item in data["metrics"]],
+            list(
+                Metric.objects.filter(object_id=department.pk).values_list(
+                    "name", flat=True
+                )
+            ),
+        )
+
+    def test_list(self):
+        results, _ = self.get_list({"include": "fields,metrics"})
+        self.assertEqual(len(results), len(self.departments))
+        for data, department in zip(results, self.departments):
+            self.assert_included(data, department)
+
+        results, _ = self.get_list({"include": "metrics"})
+        self.assertIn("metrics", results[0])
+        self.assertNotIn("fields", results[0])
+
+        results, _ = self.get_list({})
+        self.assertNotIn("fields", results[0])
+        self.assertNotIn("metrics", results[0])
+
+    def test_retrieve(self):
+        department = self.departments[0]
+        response = self.client.get(
+            f"{self.url}{department.pk}/", {"include": "fields,metrics"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_included(response.data, department)
+
+    def test_unknown_include(self):
+        response = self.client.get(self.url, {"include": "fields,teams"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("include", response.data)
+
+    def test_included_data_is_prefetched(self):
+        params = {"include": "fields,metrics"}
+        _, without_include = self.get_list({})
+        _, with_include = self.get_list(params)
+        # Один запрос на каждый вид связанных данных для всей страницы
+        self.assertEqual(with_include, without_include + 2)
+        for _ in range(3):
+            self.create_department()
+        results, queries = self.get_list(params)
+        self.assertEqual(len(results), len(self.departments) + 3)
+        self.assertEqual(queries, with_include)
+
+
+def get_sample(name, **labels):
+    """Текущее значение метрики Prometheus (0, если ее еще нет)."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+@mock.patch(
+    "backend.celery_app.app.connection_for_read",
+    side_effect=OperationalError("broker is unavailable"),
+)
+class MetricsTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+
+    def test_endpoint(self, connection_for_read):
+        self.client.force_authenticate(self.user)
+        self.client.get("/api/department/department/")
+        with self.assertLogs("company.metrics", "DEBUG"):
+            response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        for name in (
+            "http_request_duration_seconds_bucket",
+            "http_request_db_queries_bucket",
+            "api_response_cache_requests_total",
+            "celery_queue_length",
+        ):
+            self.assertIn(name, content)
+
+    def test_response_cache_counters(self, connection_for_read):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        labels = {
+            "name": "api_response_cache_requests_total",
+            "view": "DepartmentViewSet.list",
+        }
+        misses = get_sample(**labels, result="miss")
+        hits = get_sample(**labels, result="hit")
+        self.client.get("/api/department/department/")
+        self.client.get("/api/department/department/")
+        self.assertEqual(get_sample(**labels, result="miss"), misses + 1)
+        self.assertEqual(get_sample(**labels, result="hit"), hits + 1)
+
+    def test_redis_cache_counters(self, connection_for_read):
+        backend = InstrumentedRedisCache("redis://localhost:6379", {})
+        name = "django_cache_requests_total"
+        misses = get_sample(name, result="miss")
+        hits = get_sample(name, result="hit")
+        with mock.patch.object(
+            RedisCache, "get_many", return_value={"a": 1}
+        ):
+            backend.get_many(["a", "b", "c"])
+        with mock.patch.object(RedisCache, "get", return_value=1):
+            backend.get("a")
+        self.assertEqual(get_sample(name, result="hit"), hits + 2)
+        self.assertEqual(get_sample(name, result="miss"), misses + 2)
+
+    def test_broker_warning_is_rate_limited(self, connection_for_read):
+        collector = CeleryQueueCollector()
+        with self.assertLogs("company.metrics", "WARNING"):
+            list(collector.collect())
+        with self.assertNoLogs("company.metrics", "WARNING"):
+            list(collector.collect())
+        collector.warned_at -= collector.warning_interval
+        with self.assertLogs("company.metrics", "WARNING"):
+            list(collector.collect())
@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from company.metrics import get_registry
+
+
+def metrics(request):
+    """
+    Метрики Prometheus.
+
+    Адрес не проксируется nginx и доступен только из сети контейнеров.
+    При запуске в нескольких процессах (PROMETHEUS_MULTIPROC_DIR)
+    отдаются метрики всех воркеров gunicorn.
+    """
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
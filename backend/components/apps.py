@@ -5,3 +5,6 @@ class ComponentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "components"
     verbose_name = "Компоненты"
+
+    def ready(self):
+        import components.signals  # noqa: F401
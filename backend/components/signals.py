@@ -0,0 +1,29 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from company.cache import invalidate
+from components.models import Component
+from users.signals import employees_changed
+
+
+@receiver(post_save, sender=Component)
+@receiver(post_delete, sender=Component)
+def invalidate_component(sender, instance, **kwargs):
+    """Инвалидация кэша ответов компонента."""
+    invalidate(Component, [instance.pk])
+
+
+@receiver(employees_changed)
+def invalidate_employee_components(sender, employee_ids, **kwargs):
+    """
+    Инвалидация кэша ответов компонентов, владельцами которых являются
+    измененные сотрудники.
+    """
+    invalidate(
+        Component,
+        Component.objects.filter(
+            Q(component_owner_id__in=employee_ids)
+            | Q(component_second_owner_id__in=employee_ids)
+        ).values_list("id", flat=True),
+    )
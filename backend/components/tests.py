@@ -1 +1,28 @@
-# Create your tests here.
+from company.tests import query_counts
+from components.models import Component
+from components.views import ComponentViewSet
+
+
+class ComponentViewSetQueryCountTest(query_counts.QueryCountTestCase):
+    viewset = ComponentViewSet
+
+    def setUp(self):
+        super().setUp()
+        self.component = self.create_component()
+
+    def create_component(self):
+        return Component.objects.create(
+            component_name=self.get_name("Компонент"),
+            component_type="Сервис",
+            component_link="https://example.com",
+            component_owner=self.create_employee(),
+            component_second_owner=self.create_employee(),
+            component_description="Описание",
+        )
+
+    def create_objects(self, count):
+        for _ in range(count):
+            self.create_component()
+
+    def get_object(self):
+        return self.component
@@ -29,6 +29,7 @@ class ComponentViewSet(BaseViewSet):
         "component_description",
     )
     filterset_fields = ("component_type",)
+    cache_responses = True
 
     def get_queryset(self):
         queryset = Component.objects.all()
@@ -5,3 +5,6 @@ class DepartmentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "departments"
     verbose_name = "Департаменты"
+
+    def ready(self):
+        import departments.signals  # noqa: F401
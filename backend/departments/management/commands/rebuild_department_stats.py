@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from departments.models import (Department, DepartmentClosure,
+                                DepartmentHeadcount)
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает иерархию департаментов (таблицу замыкания), "
+        "численность сотрудников департаментов и их поддеревьев."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            DepartmentClosure.rebuild(
+                dict(
+                    Department.objects.values_list(
+                        "id", "parent_department_id"
+                    )
+                )
+            )
+            DepartmentHeadcount.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS("Статистика департаментов перестроена.")
+        )
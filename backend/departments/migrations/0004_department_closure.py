@@ -0,0 +1,93 @@
+# Generated by Django 4.2 on 2026-10-18 20:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_closure(apps, schema_editor):
+    """Заполнение таблицы замыкания для существующих департаментов."""
+    Department = apps.get_model("departments", "Department")
+    DepartmentClosure = apps.get_model("departments", "DepartmentClosure")
+    parents = dict(
+        Department.objects.values_list("id", "parent_department_id")
+    )
+    links = []
+    for node_id in parents:
+        ancestor_id, depth = node_id, 0
+        while ancestor_id is not None:
+            links.append(
+                DepartmentClosure(
+                    ancestor_id=ancestor_id, descendant_id=node_id, depth=depth
+                )
+            )
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    DepartmentClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("departments", "0003_alter_department_departament_owner_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepartmentClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField(verbose_name="Глубина")),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="departments.department",
+                        verbose_name="Предок",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="departments.department",
+                        verbose_name="Потомок",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "связь департаментов",
+                "verbose_name_plural": "Иерархия департаментов",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="departmentclosure",
+            index=models.Index(
+                fields=["ancestor", "depth"],
+                name="departments_ancesto_553884_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="departmentclosure",
+            index=models.Index(
+                fields=["descendant", "depth"],
+                name="departments_descend_11b46a_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="departmentclosure",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"),
+                name="unique_department_closure",
+            ),
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
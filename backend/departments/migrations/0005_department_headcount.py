@@ -0,0 +1,123 @@
+# Generated by Django 4.2 on 2026-10-18 20:21
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def build_headcount(apps, schema_editor):
+    """Расчет численности поддеревьев для существующих департаментов."""
+    Department = apps.get_model("departments", "Department")
+    DepartmentClosure = apps.get_model("departments", "DepartmentClosure")
+    DepartmentHeadcount = apps.get_model("departments", "DepartmentHeadcount")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    ancestors = defaultdict(list)
+    for descendant_id, ancestor_id in DepartmentClosure.objects.values_list(
+        "descendant_id", "ancestor_id"
+    ):
+        ancestors[descendant_id].append(ancestor_id)
+    rows = Counter()
+    totals = Counter()
+    direct = (
+        User.objects.filter(employee_departament__isnull=False)
+        .values_list(
+            "employee_departament_id", "employee_grade", "employee_type_job"
+        )
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for department_id, grade, type_job, count in direct:
+        for ancestor_id in ancestors[department_id]:
+            rows[ancestor_id, grade or "", type_job or ""] += count
+            totals[ancestor_id] += count
+    DepartmentHeadcount.objects.bulk_create(
+        [
+            DepartmentHeadcount(
+                department_id=department_id,
+                employee_grade=grade,
+                employee_type_job=type_job,
+                employee_count=count,
+            )
+            for (department_id, grade, type_job), count in rows.items()
+        ],
+        batch_size=1000,
+    )
+    for department_id, count in totals.items():
+        Department.objects.filter(id=department_id).update(
+            total_employee_count=count
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("departments", "0004_department_closure"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="total_employee_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Число сотрудников с учетом дочерних департаментов",
+            ),
+        ),
+        migrations.CreateModel(
+            name="DepartmentHeadcount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "employee_grade",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Грейд"
+                    ),
+                ),
+                (
+                    "employee_type_job",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Тип занятости"
+                    ),
+                ),
+                (
+                    "employee_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число сотрудников"
+                    ),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="headcount",
+                        to="departments.department",
+                        verbose_name="Департамент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "численность департамента",
+                "verbose_name_plural": "Численность департаментов",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="departmentheadcount",
+            constraint=models.UniqueConstraint(
+                fields=("department", "employee_grade", "employee_type_job"),
+                name="unique_department_headcount",
+            ),
+        ),
+        migrations.RunPython(build_headcount, migrations.RunPython.noop),
+    ]
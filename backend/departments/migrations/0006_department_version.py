@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 20:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("departments", "0005_department_headcount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="modified_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Дата изменения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="department",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="Версия"
+            ),
+        ),
+    ]
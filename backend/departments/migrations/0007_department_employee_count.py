@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-18 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_employee_count(apps, schema_editor):
+    """Расчет прямой численности существующих департаментов."""
+    Department = apps.get_model("departments", "Department")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    counts = dict(
+        User.objects.filter(employee_departament__isnull=False)
+        .values_list("employee_departament_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    departments = list(Department.objects.only("id"))
+    for department in departments:
+        department.employee_count = counts.get(department.id, 0)
+    Department.objects.bulk_update(
+        departments, ["employee_count"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("departments", "0006_department_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="employee_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Число сотрудников департамента",
+            ),
+        ),
+        migrations.RunPython(fill_employee_count, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,26 @@
+from collections import Counter, defaultdict
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
+
+from company.cache import invalidate
+from company.models import ClosureBase, VersionedModel
 
 User = get_user_model()
 
 
 # Create your models here.
-class Department(models.Model):
+class Department(VersionedModel):
     """Модель департамента (отдела)."""
 
+    denormalized_fields = (
+        *VersionedModel.denormalized_fields,
+        "employee_count",
+        "total_employee_count",
+    )
+
     departament_name = models.CharField(
         max_length=250, verbose_name="Название", unique=True
     )
@@ -28,6 +40,16 @@ class Department(models.Model):
         blank=True,
         related_name="children_departament",
     )
+    employee_count = models.PositiveIntegerField(
+        verbose_name="Число сотрудников департамента",
+        default=0,
+        editable=False,
+    )
+    total_employee_count = models.PositiveIntegerField(
+        verbose_name="Число сотрудников с учетом дочерних департаментов",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "департамент"
@@ -42,17 +64,380 @@ class Department(models.Model):
 
     def clean(self):
         """
-        Проверяем, что родителем департамента не назначен сам департамент.
+        Проверяем, что родителем департамента не назначен сам департамент
+        или один из его дочерних департаментов любого уровня.
         """
         if self.parent_department == self:
             raise ValidationError("Department cannot be a parent to itself.")
+        if not self._state.adding and DepartmentClosure.creates_cycle(
+            self.pk, self.parent_department_id
+        ):
+            raise ValidationError(
+                "Department cannot be moved into its own subtree."
+            )
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        is_new = self._state.adding
+        with transaction.atomic():
+            if not is_new:
+                old_parent_id = (
+                    Department.objects.filter(pk=self.pk)
+                    .values_list("parent_department_id", flat=True)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            # Поддерживаем таблицу замыкания в актуальном состоянии
+            if is_new:
+                DepartmentClosure.insert_node(
+                    self.pk, self.parent_department_id
+                )
+            elif old_parent_id != self.parent_department_id:
+                DepartmentClosure.move_subtree(
+                    self.pk, self.parent_department_id
+                )
+                DepartmentHeadcount.objects.move_subtree(
+                    self.pk, old_parent_id, self.parent_department_id
+                )
 
         # После сохранения проверяем, назначен ли руководитель
         if self.departament_owner:
             # Обновляем поле employee_departament у назначенного руководителя
             self.departament_owner.employee_departament = self
             self.departament_owner.save()
+
+    @classmethod
+    def move_subtrees(cls, moves):
+        """
+        Атомарный перенос нескольких поддеревьев департаментов.
+
+        moves – словарь {id департамента: id нового родителя или None}.
+        Таблица замыкания и численность перестраиваются только для узлов
+        перенесенных поддеревьев и их предков, число запросов не зависит
+        от числа переносов.
+        """
+        with transaction.atomic():
+            parents = dict(
+                cls.objects.select_for_update().values_list(
+                    "id", "parent_department_id"
+                )
+            )
+            if missing_ids := moves.keys() - parents.keys():
+                raise ValidationError(
+                    f"Departments do not exist: {sorted(missing_ids)}."
+                )
+            moves = {
+                department_id: parent_id
+                for department_id, parent_id in moves.items()
+                if parents[department_id] != parent_id
+            }
+            if not moves:
+                return
+            parents.update(moves)
+            department_id = DepartmentClosure.find_cycle(parents, moves)
+            if department_id is not None:
+                raise ValidationError(
+                    f"Moving department {department_id} creates a cycle."
+                )
+            related_ids = DepartmentClosure.get_related_ids(moves)
+            subtree_ids = DepartmentClosure.get_subtree_ids(moves)
+            old_ancestors = DepartmentClosure.get_ancestor_map(subtree_ids)
+            cls.objects.bulk_update(
+                [
+                    cls(id=department_id, parent_department_id=parent_id)
+                    for department_id, parent_id in moves.items()
+                ],
+                ["parent_department"],
+                batch_size=1000,
+            )
+            DepartmentClosure.relink(parents, subtree_ids)
+            DepartmentHeadcount.objects.move_departments(
+                subtree_ids, old_ancestors
+            )
+            # Прежние и новые предки выводят дочерние департаменты и
+            # потомков, списки предков инвалидируются тегом списков
+            invalidate(
+                cls, related_ids | DepartmentClosure.get_related_ids(moves)
+            )
+
+
+class DepartmentClosure(ClosureBase):
+    """Таблица замыкания иерархии департаментов."""
+
+    ancestor = models.ForeignKey(
+        to=Department,
+        verbose_name="Предок",
+        on_delete=models.CASCADE,
+        related_name="descendant_links",
+    )
+    descendant = models.ForeignKey(
+        to=Department,
+        verbose_name="Потомок",
+        on_delete=models.CASCADE,
+        related_name="ancestor_links",
+    )
+
+    class Meta:
+        verbose_name = "связь департаментов"
+        verbose_name_plural = "Иерархия департаментов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="unique_department_closure",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["ancestor", "depth"]),
+            models.Index(fields=["descendant", "depth"]),
+        ]
+
+
+class DepartmentHeadcountManager(models.Manager):
+    """
+    Менеджер для поддержки численности сотрудников по поддеревьям.
+
+    Изменения численности передаются в виде дельт по ключу
+    (id департамента, грейд, тип занятости) и применяются ко всем
+    предкам департамента с помощью таблицы замыкания.
+    """
+
+    @staticmethod
+    def employee_key(department_id, grade, type_job):
+        """Ключ агрегата для сотрудника."""
+        return department_id, grade or "", type_job or ""
+
+    def apply(self, deltas, direct=True):
+        """
+        Применение дельт численности ко всем предкам департаментов.
+
+        direct – дельты относятся к сотрудникам, входящим в сами
+        департаменты, и меняют также прямую численность департаментов
+        (False – при переносе численности поддерева).
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if direct:
+            direct_totals = Counter()
+            for (department_id, _, _), delta in deltas.items():
+                direct_totals[department_id] += delta
+            Department.add_to_counter("employee_count", direct_totals)
+        ancestors = defaultdict(list)
+        for descendant_id, ancestor_id in DepartmentClosure.objects.filter(
+            descendant_id__in={key[0] for key in deltas}
+        ).values_list("descendant_id", "ancestor_id"):
+            ancestors[descendant_id].append(ancestor_id)
+
+        rows = Counter()
+        for (department_id, grade, type_job), delta in deltas.items():
+            for ancestor_id in ancestors[department_id]:
+                rows[ancestor_id, grade, type_job] += delta
+
+        self.add_counts(rows)
+
+    def add_counts(self, rows):
+        """
+        Изменение строк агрегата на заданные дельты.
+
+        rows – счетчик {(id департамента, грейд, тип занятости): дельта},
+        дельты уже разнесены по всем нужным департаментам.
+        """
+        rows = Counter({key: delta for key, delta in rows.items() if delta})
+        if not rows:
+            return
+        totals = Counter()
+        for (department_id, _, _), delta in rows.items():
+            totals[department_id] += delta
+
+        # Создаем недостающие строки агрегата
+        existing = set(
+            self.filter(
+                department_id__in={key[0] for key in rows}
+            ).values_list(
+                "department_id", "employee_grade", "employee_type_job"
+            )
+        )
+        self.bulk_create(
+            [
+                self.model(
+                    department_id=department_id,
+                    employee_grade=grade,
+                    employee_type_job=type_job,
+                )
+                for department_id, grade, type_job in rows.keys() - existing
+            ],
+            ignore_conflicts=True,
+        )
+
+        # Группируем обновления, чтобы сократить число запросов
+        row_groups = defaultdict(list)
+        for (department_id, grade, type_job), delta in rows.items():
+            if delta:
+                row_groups[grade, type_job, delta].append(department_id)
+        for (grade, type_job, delta), department_ids in row_groups.items():
+            self.filter(
+                department_id__in=department_ids,
+                employee_grade=grade,
+                employee_type_job=type_job,
+            ).update(employee_count=F("employee_count") + delta)
+
+        Department.add_to_counter("total_employee_count", totals)
+        # Версии увеличиваются только у департаментов с измененной
+        # численностью, списки предков инвалидируются тегом списков
+        invalidate(Department, totals)
+
+    def move_employees(self, employees, department):
+        """Перевод сотрудников в другой департамент (или вывод из него)."""
+        department_id = department.pk if department else None
+        deltas = Counter()
+        for old_department_id, grade, type_job in employees.values_list(
+            "employee_departament_id", "employee_grade", "employee_type_job"
+        ):
+            if old_department_id == department_id:
+                continue
+            if old_department_id is not None:
+                deltas[
+                    self.employee_key(old_department_id, grade, type_job)
+                ] -= 1
+            if department_id is not None:
+                deltas[self.employee_key(department_id, grade, type_job)] += 1
+        employees.update(employee_departament=department)
+        self.apply(deltas)
+
+    def move_subtree(self, department_id, old_parent_id, new_parent_id):
+        """Перенос численности поддерева к новым предкам."""
+        deltas = Counter()
+        for grade, type_job, count in self.filter(
+            department_id=department_id, employee_count__gt=0
+        ).values_list("employee_grade", "employee_type_job", "employee_count"):
+            if old_parent_id is not None:
+                deltas[old_parent_id, grade, type_job] -= count
+            if new_parent_id is not None:
+                deltas[new_parent_id, grade, type_job] += count
+        self.apply(deltas, direct=False)
+
+    def move_departments(self, department_ids, old_ancestors):
+        """
+        Перенос численности после перестроения связей департаментов.
+
+        Прямая численность каждого из department_ids снимается с прежних
+        предков (old_ancestors, см. ClosureBase.get_ancestor_map), которых
+        у него больше нет, и добавляется новым.
+        """
+        new_ancestors = DepartmentClosure.get_ancestor_map(department_ids)
+        rows = Counter()
+        for department_id, grade, type_job, count in self.direct_counts(
+            department_ids
+        ):
+            old_ids = old_ancestors[department_id]
+            new_ids = new_ancestors[department_id]
+            for ancestor_id in old_ids - new_ids:
+                rows[self.employee_key(ancestor_id, grade, type_job)] -= count
+            for ancestor_id in new_ids - old_ids:
+                rows[self.employee_key(ancestor_id, grade, type_job)] += count
+        self.add_counts(rows)
+
+    @staticmethod
+    def direct_counts(department_ids=None):
+        """
+        Численность сотрудников, входящих непосредственно в департаменты,
+        в разбивке по грейду и типу занятости.
+        """
+        employees = User.objects.filter(employee_departament__isnull=False)
+        if department_ids is not None:
+            employees = employees.filter(
+                employee_departament_id__in=department_ids
+            )
+        return (
+            employees.values_list(
+                "employee_departament_id",
+                "employee_grade",
+                "employee_type_job",
+            )
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+
+    def rebuild(self):
+        """
+        Полный пересчет численности (в т.ч. прямой численности
+        департаментов) по данным сотрудников.
+        """
+        direct = self.direct_counts()
+        ancestors = defaultdict(list)
+        links = DepartmentClosure.objects.values_list(
+            "descendant_id", "ancestor_id"
+        )
+        for descendant_id, ancestor_id in links:
+            ancestors[descendant_id].append(ancestor_id)
+
+        rows = Counter()
+        totals = Counter()
+        direct_totals = Counter()
+        for department_id, grade, type_job, count in direct:
+            direct_totals[department_id] += count
+            for ancestor_id in ancestors[department_id]:
+                rows[ancestor_id, grade or "", type_job or ""] += count
+                totals[ancestor_id] += count
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        department_id=department_id,
+                        employee_grade=grade,
+                        employee_type_job=type_job,
+                        employee_count=count,
+                    )
+                    for (department_id, grade, type_job), count in rows.items()
+                ],
+                batch_size=1000,
+            )
+            departments = list(Department.objects.only("id"))
+            for department in departments:
+                department.employee_count = direct_totals[department.id]
+                department.total_employee_count = totals[department.id]
+            Department.objects.bulk_update(
+                departments,
+                ["employee_count", "total_employee_count"],
+                batch_size=1000,
+            )
+            invalidate(
+                Department, [department.id for department in departments]
+            )
+
+
+class DepartmentHeadcount(models.Model):
+    """
+    Численность сотрудников департамента с учетом всех дочерних
+    департаментов в разбивке по грейду и типу занятости.
+    """
+
+    department = models.ForeignKey(
+        to=Department,
+        verbose_name="Департамент",
+        on_delete=models.CASCADE,
+        related_name="headcount",
+    )
+    employee_grade = models.CharField(
+        verbose_name="Грейд", max_length=50, blank=True
+    )
+    employee_type_job = models.CharField(
+        verbose_name="Тип занятости", max_length=50, blank=True
+    )
+    employee_count = models.PositiveIntegerField(
+        verbose_name="Число сотрудников", default=0
+    )
+
+    objects = DepartmentHeadcountManager()
+
+    class Meta:
+        verbose_name = "численность департамента"
+        verbose_name_plural = "Численность департаментов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["department", "employee_grade", "employee_type_job"],
+                name="unique_department_headcount",
+            )
+        ]
@@ -3,7 +3,9 @@ from drf_spectacular.utils import (OpenApiParameter, OpenApiResponse,
                                    extend_schema, extend_schema_view)
 
 from departments.serializers import (DepartmentAddEmployeesSerializer,
-                                     DepartmentChildrenReadSerializer)
+                                     DepartmentChildrenReadSerializer,
+                                     DepartmentMoveSerializer,
+                                     DepartmentTreeReadSerializer)
 from users.serializers import EmployeeShortGetSerializer
 
 DEPARTMENT_SCHEMA = extend_schema_view(
@@ -99,3 +101,45 @@ ROOT_DEPARTMENTS_SCHEMA = extend_schema(
                 "не имеющих родительских департаментов.",
     summary="Получение списка корневых департаментов.",
 )
+
+DESCENDANTS_DEPARTMENTS_SCHEMA = extend_schema(
+    responses={
+        200: DepartmentTreeReadSerializer(many=True),
+        404: OpenApiResponse(
+            description="No Department matches the given query.",
+        ),
+    },
+    description="Получение всех департаментов поддерева (дочерних "
+                "департаментов любого уровня вложенности), упорядоченных "
+                "по глубине.",
+    summary="Получение поддерева департамента.",
+)
+
+ANCESTORS_DEPARTMENTS_SCHEMA = extend_schema(
+    responses={
+        200: DepartmentTreeReadSerializer(many=True),
+        404: OpenApiResponse(
+            description="No Department matches the given query.",
+        ),
+    },
+    description="Получение цепочки родительских департаментов "
+                "от ближайшего родителя до корневого департамента.",
+    summary="Получение родительских департаментов.",
+)
+
+MOVE_DEPARTMENTS_SCHEMA = extend_schema(
+    request=DepartmentMoveSerializer,
+    responses={
+        204: OpenApiResponse(
+            description="Поддеревья перенесены",
+        ),
+        400: OpenApiResponse(
+            description="Invalid data",
+        ),
+    },
+    description="Атомарный перенос нескольких департаментов вместе с "
+                "дочерними департаментами под новых родителей "
+                "(parent: null – сделать корневым). Переносы, создающие "
+                "цикл в иерархии, отклоняются.",
+    summary="Перенос поддеревьев департаментов.",
+)
@@ -1,7 +1,12 @@
+from collections import Counter
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from company.serializers import AddEmployeesBaseSerializer
-from departments.models import Department
+from company.serializers import (AddEmployeesBaseSerializer,
+                                 MoveSubtreesBaseSerializer)
+from departments.models import Department, DepartmentClosure
 from users.serializers import EmployeeShortGetSerializer
 
 
@@ -24,22 +29,54 @@ class DepartmentWriteSerializer(DepartmentBaseSerializer):
 
     def validate_parent_department(self, value):
         """
-        Проверяем, что родителем департамента не назначен сам департамент.
+        Проверяем, что родителем департамента не назначен сам департамент
+        или один из его дочерних департаментов.
         """
         if self.instance and value == self.instance:
             raise serializers.ValidationError(
                 "Нельзя назначить родительским "
                 "департаментом сам департамент."
             )
+        if self.instance and value and DepartmentClosure.creates_cycle(
+            self.instance.pk, value.pk
+        ):
+            raise serializers.ValidationError(
+                "Нельзя назначить родительским департаментом "
+                "дочерний департамент."
+            )
         return value
 
 
+@extend_schema_field(OpenApiTypes.OBJECT)
+class DepartmentHeadcountField(serializers.Field):
+    """
+    Разбивка численности сотрудников департамента с учетом дочерних
+    департаментов по грейдам и типам занятости.
+
+    Сотрудники без указанного грейда (типа занятости) в соответствующую
+    разбивку не попадают.
+    """
+
+    def to_representation(self, value):
+        grades = Counter()
+        job_types = Counter()
+        for row in value.all():
+            if row.employee_grade:
+                grades[row.employee_grade] += row.employee_count
+            if row.employee_type_job:
+                job_types[row.employee_type_job] += row.employee_count
+        return {
+            "grades": dict(sorted(grades.items())),
+            "job_types": dict(sorted(job_types.items())),
+        }
+
+
 class DepartmentReadSerializer(DepartmentBaseSerializer):
     """Сериализатор для получения департаментов."""
 
     departament_owner = EmployeeShortGetSerializer()
     parent_department = DepartmentBaseSerializer()
-    employee_count = serializers.IntegerField(read_only=True)
+    headcount = DepartmentHeadcountField(read_only=True)
 
     class Meta:
         model = Department
@@ -50,6 +87,8 @@ class DepartmentReadSerializer(DepartmentBaseSerializer):
             "departament_description",
             "parent_department",
             "employee_count",
+            "total_employee_count",
+            "headcount",
         ]
 
 
@@ -57,7 +96,6 @@ class DepartmentChildrenReadSerializer(DepartmentBaseSerializer):
     """Сериализатор для получения дочерних департаментов."""
 
     departament_owner = EmployeeShortGetSerializer()
-    employee_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Department
@@ -67,8 +105,39 @@ class DepartmentChildrenReadSerializer(DepartmentBaseSerializer):
             "departament_owner",
             "departament_description",
             "employee_count",
+            "total_employee_count",
+        ]
+
+
+class DepartmentTreeReadSerializer(DepartmentBaseSerializer):
+    """
+    Сериализатор для получения предков и потомков департамента.
+
+    Поле depth – расстояние до департамента, от которого строится выборка.
+    """
+
+    departament_owner = EmployeeShortGetSerializer()
+    depth = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Department
+        fields = [
+            "id",
+            "departament_name",
+            "departament_owner",
+            "departament_description",
+            "parent_department",
+            "employee_count",
+            "total_employee_count",
+            "depth",
         ]
 
 
 class DepartmentAddEmployeesSerializer(AddEmployeesBaseSerializer):
     """Сериализатор для добавления сотрудников в департамент."""
+
+
+class DepartmentMoveSerializer(MoveSubtreesBaseSerializer):
+    """Сериализатор для переноса нескольких поддеревьев департаментов."""
+
+    tree_model = Department
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from company.cache import invalidate
+from departments.models import (Department, DepartmentClosure,
+                                DepartmentHeadcount)
+from users.signals import employees_changed
+
+User = get_user_model()
+
+# Поля сотрудника, от которых зависит численность департаментов
+HEADCOUNT_FIELDS = (
+    "employee_departament",
+    "employee_grade",
+    "employee_type_job",
+)
+
+
+def get_headcount_key(department_id, grade, type_job):
+    """Ключ агрегата численности или None, если департамент не задан."""
+    if department_id is None:
+        return None
+    return DepartmentHeadcount.objects.employee_key(
+        department_id, grade, type_job
+    )
+
+
+def get_employee_headcount_key(employee):
+    """Ключ агрегата численности для экземпляра сотрудника."""
+    return get_headcount_key(
+        employee.employee_departament_id,
+        employee.employee_grade,
+        employee.employee_type_job,
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_headcount_key(sender, instance, update_fields=None, **kwargs):
+    """Запоминаем ключ численности сотрудника до сохранения."""
+    instance._headcount_tracked = update_fields is None or bool(
+        set(HEADCOUNT_FIELDS) & set(update_fields)
+    )
+    instance._headcount_key = None
+    if instance._headcount_tracked and not instance._state.adding:
+        old_values = (
+            User.objects.filter(pk=instance.pk)
+            .values_list(*HEADCOUNT_FIELDS)
+            .first()
+        )
+        if old_values:
+            instance._headcount_key = get_headcount_key(*old_values)
+
+
+@receiver(post_save, sender=User)
+def update_headcount_on_save(sender, instance, **kwargs):
+    """Обновляем численность департаментов после сохранения сотрудника."""
+    if not getattr(instance, "_headcount_tracked", False):
+        return
+    old_key = instance._headcount_key
+    new_key = get_employee_headcount_key(instance)
+    if old_key == new_key:
+        return
+    deltas = {}
+    if old_key is not None:
+        deltas[old_key] = -1
+    if new_key is not None:
+        deltas[new_key] = 1
+    DepartmentHeadcount.objects.apply(deltas)
+
+
+@receiver(post_delete, sender=User)
+def update_headcount_on_delete(sender, instance, **kwargs):
+    """Обновляем численность департаментов после удаления сотрудника."""
+    key = get_employee_headcount_key(instance)
+    if key is not None:
+        DepartmentHeadcount.objects.apply({key: -1})
+
+
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Department)
+def invalidate_department(sender, instance, **kwargs):
+    """
+    Инвалидация кэша ответов департамента, его предков (списки потомков)
+    и дочерних департаментов (родительский департамент в ответе).
+
+    Таблица замыкания обновляется после сигнала, поэтому при переносе
+    департамента она содержит прежних предков, а новые – это предки
+    нового родительского департамента. Списки предков департаментов
+    поддерева инвалидируются тегом списков.
+    """
+    invalidate(
+        Department,
+        DepartmentClosure.get_related_ids([instance.pk])
+        | DepartmentClosure.get_ancestor_ids(
+            [instance.parent_department_id]
+        ),
+    )
+
+
+@receiver(employees_changed)
+def invalidate_employee_departments(sender, employee_ids, **kwargs):
+    """
+    Инвалидация кэша ответов департаментов после изменения данных
+    сотрудников: департаментов, которыми они руководят, и их предков, а
+    также списков сотрудников их департаментов.
+    """
+    invalidate(
+        Department,
+        DepartmentClosure.get_related_ids(
+            Department.objects.filter(
+                departament_owner_id__in=employee_ids
+            ).values_list("id", flat=True)
+        ),
+    )
+    invalidate(
+        Department,
+        User.objects.filter(
+            id__in=employee_ids, employee_departament__isnull=False
+        ).values_list("employee_departament_id", flat=True),
+        collection=False,
+    )
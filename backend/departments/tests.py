@@ -1 +1,497 @@
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from company.cache import flush_invalidation
+from company.models import OutboxMessage
+from company.tests import query_counts
+from departments.models import (Department, DepartmentClosure,
+                                DepartmentHeadcount)
+from departments.views import DepartmentViewSet
+from users.notifications import MOVE_TO_DEPARTMENT, REMOVE_FROM_DEPARTMENT
+
+User = get_user_model()
+
+
+class DepartmentViewSetQueryCountTest(query_counts.QueryCountTestCase):
+    viewset = DepartmentViewSet
+
+    def setUp(self):
+        super().setUp()
+        self.department = self.create_department(None)
+        self.leaf = self.department
+
+    def create_department(self, parent, owner=None):
+        return Department.objects.create(
+            departament_name=self.get_name("Департамент"),
+            departament_description="Описание",
+            departament_owner=owner,
+            parent_department=parent,
+        )
+
+    def create_objects(self, count):
+        """
+        Сотрудники и дочерние департаменты проверяемого департамента,
+        корневые департаменты и цепочка предков для ancestors.
+        """
+        for _ in range(count):
+            owner = self.create_employee(employee_departament=self.department)
+            self.create_department(self.department, owner)
+            self.create_department(None, owner)
+            self.leaf = self.create_department(self.leaf, owner)
+
+    def get_object(self):
+        return self.department
+
+    def get_url_kwargs(self, action, kwargs):
+        if action == "ancestors":
+            return {"pk": self.leaf.pk}
+        return super().get_url_kwargs(action, kwargs)
+
+
+class DepartmentEmployeesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        cls.department = Department.objects.create(
+            departament_name="Департамент",
+            departament_description="Описание",
+        )
+        cls.employee = User.objects.create_user(
+            email="employee@example.com", employee_fio="Сотрудник"
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = (
+            f"/api/department/department/{self.department.pk}/employees/"
+        )
+
+    def move_and_remove(self):
+        data = {"employee_ids": [self.employee.pk]}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete(self.url, data, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.employee.refresh_from_db()
+        self.assertIsNone(self.employee.employee_departament)
+
+    @override_settings(NOTIFICATION_DIGEST_ENABLED=False)
+    def test_no_notifications_without_digest(self):
+        self.move_and_remove()
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(NOTIFICATION_DIGEST_ENABLED=True)
+    def test_notifications_in_digest_mode(self):
+        self.move_and_remove()
+        self.assertEqual(
+            [
+                message.kwargs["events"][0]["event"]
+                for message in OutboxMessage.objects.order_by("id")
+            ],
+            [MOVE_TO_DEPARTMENT, REMOVE_FROM_DEPARTMENT],
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class DepartmentResponseCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        cls.department = Department.objects.create(
+            departament_name="Департамент",
+            departament_description="Описание",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/department/department/{self.department.pk}/"
+
+    def test_new_version_is_not_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+        # Изменение зафиксировано, а теги кэша еще не инвалидированы
+        Department.objects.filter(pk=self.department.pk).update(
+            departament_name="Новое название"
+        )
+        Department.bump_versions([self.department.pk])
+        updated = self.client.get(self.url)
+        self.assertEqual(updated["X-Cache"], "MISS")
+        self.assertNotEqual(updated["ETag"], response["ETag"])
+        self.assertEqual(updated.data["departament_name"], "Новое название")
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class DepartmentInvalidationTest(APITestCase):
+    """Инвалидация кэша ответов при изменениях в дереве департаментов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        # root -> a -> a1, root -> b
+        cls.root = cls.create_department("root")
+        cls.a = cls.create_department("a", cls.root)
+        cls.a1 = cls.create_department("a1", cls.a)
+        cls.b = cls.create_department("b", cls.root)
+
+    @classmethod
+    def create_department(cls, name, parent=None):
+        return Department.objects.create(
+            departament_name=name,
+            departament_description="Описание",
+            parent_department=parent,
+        )
+
+    def setUp(self):
+        # Инвалидация при создании дерева запланирована в откаченной
+        # транзакции setUpTestData
+        flush_invalidation()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_versions(self):
+        return dict(Department.objects.values_list("id", "version"))
+
+    def test_headcount_change_bumps_changed_departments(self):
+        versions = self.get_versions()
+        User.objects.create_user(
+            email="employee@example.com",
+            employee_fio="Сотрудник",
+            employee_departament=self.a1,
+        )
+        updated = self.get_versions()
+        self.assertEqual(
+            {pk for pk in versions if updated[pk] != versions[pk]},
+            {self.root.pk, self.a.pk, self.a1.pk},
+        )
+
+    def test_rename_bumps_ancestors_and_children(self):
+        versions = self.get_versions()
+        self.a.departament_name = "a2"
+        self.a.save()
+        updated = self.get_versions()
+        self.assertEqual(
+            {pk for pk in versions if updated[pk] != versions[pk]},
+            {self.root.pk, self.a.pk, self.a1.pk},
+        )
+
+    def test_ancestors_are_invalidated(self):
+        url = f"/api/department/department/{self.a1.pk}/ancestors/"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                email="employee@example.com",
+                employee_fio="Сотрудник",
+                employee_departament=self.b,
+            )
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            {
+                item["id"]: item["total_employee_count"]
+                for item in response.data["results"]
+            },
+            {self.a.pk: 0, self.root.pk: 1},
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+)
+class DepartmentTreeTest(APITestCase):
+    """Иерархия департаментов: таблица замыкания и перенос поддеревьев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        # root -> a -> a1, root -> b -> b1, c
+        self.root = self.create_department("root")
+        self.a = self.create_department("a", self.root)
+        self.a1 = self.create_department("a1", self.a)
+        self.b = self.create_department("b", self.root)
+        self.b1 = self.create_department("b1", self.b)
+        self.c = self.create_department("c")
+
+    def create_department(self, name, parent=None):
+        return Department.objects.create(
+            departament_name=name,
+            departament_description="Описание",
+            parent_department=parent,
+        )
+
+    def reparent(self, department, parent):
+        department.parent_department = parent
+        department.save()
+
+    def get_tree_ids(self, action, department):
+        """id департаментов ответа действия descendants или ancestors."""
+        response = self.client.get(
+            f"/api/department/department/{department.pk}/{action}/"
+        )
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    def assert_closure_is_consistent(self):
+        """Таблица замыкания совпадает с построенной заново по родителям."""
+        parents = dict(
+            Department.objects.values_list("id", "parent_department_id")
+        )
+        self.assertEqual(
+            set(
+                DepartmentClosure.objects.values_list(
+                    "ancestor_id", "descendant_id", "depth"
+                )
+            ),
+            {
+                (link.ancestor_id, link.descendant_id, link.depth)
+                for link in DepartmentClosure.build_links(parents, parents)
+            },
+        )
+
+    def test_subtree(self):
+        self.assert_closure_is_consistent()
+        self.assertEqual(
+            self.get_tree_ids("descendants", self.root),
+            [self.a.pk, self.b.pk, self.a1.pk, self.b1.pk],
+        )
+        self.assertEqual(
+            self.get_tree_ids("ancestors", self.a1), [self.a.pk, self.root.pk]
+        )
+
+    def test_reparenting(self):
+        self.reparent(self.a, self.c)
+        self.assert_closure_is_consistent()
+        self.assertEqual(
+            self.get_tree_ids("descendants", self.root),
+            [self.b.pk, self.b1.pk],
+        )
+        self.assertEqual(
+            self.get_tree_ids("descendants", self.c), [self.a.pk, self.a1.pk]
+        )
+        self.assertEqual(
+            self.get_tree_ids("ancestors", self.a1), [self.a.pk, self.c.pk]
+        )
+
+        self.reparent(self.a, None)
+        self.assert_closure_is_consistent()
+        self.assertEqual(self.get_tree_ids("ancestors", self.a1), [self.a.pk])
+
+    def test_deleted_department_leaves_subtree(self):
+        self.b1.delete()
+        self.assert_closure_is_consistent()
+        self.assertEqual(self.get_tree_ids("descendants", self.b), [])
+
+    def move_subtrees(self, moves):
+        return self.client.post(
+            "/api/department/department/move/",
+            {
+                "moves": [
+                    {"id": department.pk, "parent": parent and parent.pk}
+                    for department, parent in moves
+                ]
+            },
+            format="json",
+        )
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.reparent(self.root, self.a1)
+        response = self.client.patch(
+            f"/api/department/department/{self.root.pk}/",
+            {"parent_department": self.a1.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent_department", response.data)
+        self.root.refresh_from_db()
+        self.assertIsNone(self.root.parent_department)
+        self.assert_closure_is_consistent()
+
+    def test_move_subtrees_swaps_children(self):
+        response = self.move_subtrees([(self.a1, self.b), (self.b1, self.a)])
+        self.assertEqual(response.status_code, 204)
+        self.assert_closure_is_consistent()
+        self.assertEqual(
+            self.get_tree_ids("descendants", self.a), [self.b1.pk]
+        )
+        self.assertEqual(
+            self.get_tree_ids("descendants", self.b), [self.a1.pk]
+        )
+
+    def test_move_subtrees_swaps_siblings(self):
+        # a и b меняются местами: b переносится под c, a – на место b
+        response = self.move_subtrees([(self.b, self.c), (self.a, self.b)])
+        self.assertEqual(response.status_code, 204)
+        self.assert_closure_is_consistent()
+        self.assertEqual(
+            self.get_tree_ids("ancestors", self.a1),
+            [self.a.pk, self.b.pk, self.c.pk],
+        )
+        self.assertEqual(self.get_tree_ids("descendants", self.root), [])
+
+    def test_move_subtrees_rejects_cycle(self):
+        response = self.move_subtrees([(self.a, self.b), (self.b, self.a1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("moves", response.data)
+        self.assertEqual(
+            dict(
+                Department.objects.filter(
+                    pk__in=[self.a.pk, self.b.pk]
+                ).values_list("id", "parent_department_id")
+            ),
+            {self.a.pk: self.root.pk, self.b.pk: self.root.pk},
+        )
+        self.assert_closure_is_consistent()
+
+
+class DepartmentHeadcountTest(TestCase):
+    """Численность сотрудников департаментов и их поддеревьев."""
+
+    def setUp(self):
+        # root -> a -> a1, root -> b
+        self.root = self.create_department("root")
+        self.a = self.create_department("a", self.root)
+        self.a1 = self.create_department("a1", self.a)
+        self.b = self.create_department("b", self.root)
+        self.employees = [
+            self.create_employee(1, self.a1, "1", "full_time"),
+            self.create_employee(2, self.a1, "2", "part_time"),
+            self.create_employee(3, self.b, "1", "full_time"),
+            self.create_employee(4, None, "1", "full_time"),
+        ]
+
+    def create_department(self, name, parent=None):
+        return Department.objects.create(
+            departament_name=name,
+            departament_description="Описание",
+            parent_department=parent,
+        )
+
+    def create_employee(self, number, department, grade, type_job):
+        return User.objects.create_user(
+            email=f"employee{number}@example.com",
+            employee_fio=f"Сотрудник {number}",
+            employee_departament=department,
+            employee_grade=grade,
+            employee_type_job=type_job,
+        )
+
+    def get_counts(self):
+        """{название: (прямая численность, численность поддерева)}."""
+        return {
+            name: (employee_count, total_employee_count)
+            for name, employee_count, total_employee_count in (
+                Department.objects.values_list(
+                    "departament_name",
+                    "employee_count",
+                    "total_employee_count",
+                )
+            )
+        }
+
+    def get_headcount(self):
+        """Ненулевые строки численности в разбивке по грейду и занятости."""
+        return set(
+            DepartmentHeadcount.objects.filter(employee_count__gt=0)
+            .values_list(
+                "department__departament_name",
+                "employee_grade",
+                "employee_type_job",
+                "employee_count",
+            )
+        )
+
+    def assert_counts(self, counts):
+        self.assertEqual(self.get_counts(), counts)
+        # Пересчет с нуля совпадает с инкрементальным обновлением
+        headcount = self.get_headcount()
+        DepartmentHeadcount.objects.rebuild()
+        self.assertEqual(self.get_counts(), counts)
+        self.assertEqual(self.get_headcount(), headcount)
+
+    def test_counts(self):
+        self.assert_counts(
+            {"root": (0, 3), "a": (0, 2), "a1": (2, 2), "b": (1, 1)}
+        )
+        self.assertEqual(
+            {row for row in self.get_headcount() if row[0] == "root"},
+            {
+                ("root", "1", "full_time", 2),
+                ("root", "2", "part_time", 1),
+            },
+        )
+
+    def test_moving_and_removing_employees(self):
+        first, second, third, fourth = self.employees
+        DepartmentHeadcount.objects.move_employees(
+            User.objects.filter(pk__in=[first.pk, fourth.pk]), self.b
+        )
+        self.assert_counts(
+            {"root": (0, 4), "a": (0, 1), "a1": (1, 1), "b": (3, 3)}
+        )
+        second.employee_departament = None
+        second.save()
+        third.delete()
+        self.assert_counts(
+            {"root": (0, 2), "a": (0, 0), "a1": (0, 0), "b": (2, 2)}
+        )
+
+    def test_changing_grade(self):
+        first = self.employees[0]
+        first.employee_grade = "3"
+        first.save()
+        self.assert_counts(
+            {"root": (0, 3), "a": (0, 2), "a1": (2, 2), "b": (1, 1)}
+        )
+        self.assertIn(("root", "3", "full_time", 1), self.get_headcount())
+
+    def test_moving_subtrees(self):
+        self.a.parent_department = self.b
+        self.a.save()
+        self.assert_counts(
+            {"root": (0, 3), "a": (0, 2), "a1": (2, 2), "b": (1, 3)}
+        )
+        Department.move_subtrees({self.a1.pk: None, self.b.pk: None})
+        self.assert_counts(
+            {"root": (0, 0), "a": (0, 0), "a1": (2, 2), "b": (1, 1)}
+        )
@@ -1,22 +1,36 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import F, Prefetch
 from drf_spectacular.utils import extend_schema
 from rest_framework import filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from company.cache import cache_response, model_tag
 from company.mixins import BaseViewSet
+from company.outbox import enqueue
 from company.permissions import IsSuperuserOrReadOnly
-from departments.models import Department
-from departments.schemas import (CHILDREN_DEPARTMENTS_SCHEMA,
-                                 DEPARTMENT_SCHEMA, EMPLOYEES_LIST_SCHEMA,
-                                 EMPLOYEES_SCHEMA, ROOT_DEPARTMENTS_SCHEMA)
+from departments.models import (Department, DepartmentClosure,
+                                DepartmentHeadcount)
+from departments.schemas import (ANCESTORS_DEPARTMENTS_SCHEMA,
+                                 CHILDREN_DEPARTMENTS_SCHEMA,
+                                 DEPARTMENT_SCHEMA,
+                                 DESCENDANTS_DEPARTMENTS_SCHEMA,
+                                 EMPLOYEES_LIST_SCHEMA, EMPLOYEES_SCHEMA,
+                                 MOVE_DEPARTMENTS_SCHEMA,
+                                 ROOT_DEPARTMENTS_SCHEMA)
 from departments.serializers import (DepartmentAddEmployeesSerializer,
                                      DepartmentChildrenReadSerializer,
+                                     DepartmentMoveSerializer,
                                      DepartmentReadSerializer,
+                                     DepartmentTreeReadSerializer,
                                      DepartmentWriteSerializer)
+from users.notifications import MOVE_TO_DEPARTMENT, REMOVE_FROM_DEPARTMENT
 from users.serializers import EmployeeShortGetSerializer
+from users.tasks import send_team_notifications
 
 User = get_user_model()
 
@@ -32,6 +46,16 @@ class DepartmentViewSet(BaseViewSet):
     ]
     filter_backends = (filters.SearchFilter,)
     search_fields = ("id", "departament_name", "departament_description")
+    cache_responses = True
+    fast_serialization = (
+        "list",
+        "retrieve",
+        "root_departments",
+        "children_departments",
+        "descendants",
+        "ancestors",
+        "employees_list",
+    )
 
     def get_queryset(self):
         queryset = Department.objects.all()
@@ -48,43 +72,81 @@ class DepartmentViewSet(BaseViewSet):
                     "departament_owner__id",
                     "departament_owner__employee_fio",
                     "departament_owner__employee_avatar",
+                    "departament_owner__employee_avatar_variants",
                     "departament_owner__employee_position",
                     "departament_owner__employee_grade",
                     "parent_department__id",
                     "parent_department__departament_name",
                     "parent_department__departament_owner",
+                    "employee_count",
+                    "total_employee_count",
+                )
+                .prefetch_related(
+                    Prefetch(
+                        "headcount",
+                        queryset=DepartmentHeadcount.objects.filter(
+                            employee_count__gt=0
+                        ),
+                    )
                 )
-                .annotate(employee_count=Count("users"))
             )
-        if self.action in ("root_departments", "children_departments"):
+        if self.action in (
+            "root_departments",
+            "children_departments",
+            "descendants",
+            "ancestors",
+        ):
             queryset = (
                 queryset.select_related("departament_owner")
                 .only(
                     "id",
                     "departament_name",
                     "departament_description",
+                    "parent_department",
                     "departament_owner__id",
                     "departament_owner__employee_fio",
                     "departament_owner__employee_avatar",
+                    "departament_owner__employee_avatar_variants",
                     "departament_owner__employee_position",
                     "departament_owner__employee_grade",
+                    "employee_count",
+                    "total_employee_count",
                 )
-                .annotate(employee_count=Count("users"))
             )
         return queryset
 
+    def get_cache_tags(self):
+        """
+        Список предков меняется при изменении любого департамента выше по
+        дереву, версии департаментов поддерева при этом не
+        увеличиваются: ответ инвалидируется вместе со списками.
+        """
+        tags = super().get_cache_tags()
+        if self.action == "ancestors":
+            tags.append(model_tag(Department))
+        return tags
+
+    def get_subtree_ids(self, model_object):
+        return DepartmentClosure.objects.filter(
+            ancestor=model_object
+        ).values_list("descendant_id", flat=True)
+
     def get_serializer_class(self):
         match self.action:
             case "retrieve" | "list":
                 return DepartmentReadSerializer
             case "children_departments" | "root_departments":
                 return DepartmentChildrenReadSerializer
+            case "descendants" | "ancestors":
+                return DepartmentTreeReadSerializer
             case "employees":
                 return DepartmentAddEmployeesSerializer
             case "employees_list":
                 return EmployeeShortGetSerializer
             case "create" | "update" | "partial_update":
                 return DepartmentWriteSerializer
+            case "move_subtrees":
+                return DepartmentMoveSerializer
             case _:
                 return super().get_serializer_class()
 
@@ -98,15 +160,40 @@ class DepartmentViewSet(BaseViewSet):
         serializer.is_valid(raise_exception=True)
         employee_ids = serializer.validated_data["employee_ids"]
         employees = User.objects.filter(id__in=employee_ids)
+        # Обновляем департамент сотрудников вместе с численностью
+        # департаментов; переведенные сотрудники уведомляются только
+        # в режиме сводки, чтобы массовый перевод не рассылал письма
         if request.method == "POST":
-            employees.update(employee_departament=department)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            event = MOVE_TO_DEPARTMENT
+            emails = list(
+                employees.exclude(
+                    employee_departament=department
+                ).values_list("email", flat=True)
+            )
+            DepartmentHeadcount.objects.move_employees(employees, department)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
         else:
-            employees.update(employee_departament=None)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            event = REMOVE_FROM_DEPARTMENT
+            employees = employees.filter(employee_departament=department)
+            emails = list(employees.values_list("email", flat=True))
+            DepartmentHeadcount.objects.move_employees(employees, None)
+            response = Response(status=status.HTTP_204_NO_CONTENT)
+        if emails and settings.NOTIFICATION_DIGEST_ENABLED:
+            enqueue(
+                send_team_notifications,
+                events=[
+                    {
+                        "event": event,
+                        "department_name": department.departament_name,
+                        "emails": emails,
+                    }
+                ],
+            )
+        return response
 
     @CHILDREN_DEPARTMENTS_SCHEMA
     @action(["get"], detail=True, url_path="subsidiary")
+    @cache_response
     def children_departments(self, request, pk=None):
         """Получение списка дочерних департаментов."""
         department = self.get_object()
@@ -115,6 +202,7 @@ class DepartmentViewSet(BaseViewSet):
 
     @EMPLOYEES_LIST_SCHEMA
     @action(["get"], detail=True, url_path="employees_list")
+    @cache_response
     def employees_list(self, request, pk=None):
         """Получение списка сотрудников."""
         department = self.get_object()
@@ -122,6 +210,7 @@ class DepartmentViewSet(BaseViewSet):
             "id",
             "employee_fio",
             "employee_avatar",
+            "employee_avatar_variants",
             "employee_position",
             "employee_grade",
         )
@@ -129,7 +218,54 @@ class DepartmentViewSet(BaseViewSet):
 
     @ROOT_DEPARTMENTS_SCHEMA
     @action(["get"], detail=False, url_path="root_departments")
+    @cache_response
     def root_departments(self, request):
         """Получение списка корневых департаментов."""
         departments = self.get_queryset().filter(parent_department=None)
         return self.get_paginated_data(request=request, queryset=departments)
+
+    @DESCENDANTS_DEPARTMENTS_SCHEMA
+    @action(["get"], detail=True, url_path="descendants")
+    @cache_response
+    def descendants(self, request, pk=None):
+        """Получение всех дочерних департаментов любого уровня."""
+        department = self.get_object()
+        descendants = (
+            self.get_queryset()
+            .filter(
+                ancestor_links__ancestor=department,
+                ancestor_links__depth__gt=0,
+            )
+            .annotate(depth=F("ancestor_links__depth"))
+            .order_by("depth", "id")
+        )
+        return self.get_paginated_data(request=request, queryset=descendants)
+
+    @ANCESTORS_DEPARTMENTS_SCHEMA
+    @action(["get"], detail=True, url_path="ancestors")
+    @cache_response
+    def ancestors(self, request, pk=None):
+        """Получение всех родительских департаментов."""
+        department = self.get_object()
+        ancestors = (
+            self.get_queryset()
+            .filter(
+                descendant_links__descendant=department,
+                descendant_links__depth__gt=0,
+            )
+            .annotate(depth=F("descendant_links__depth"))
+            .order_by("depth")
+        )
+        return self.get_paginated_data(request=request, queryset=ancestors)
+
+    @MOVE_DEPARTMENTS_SCHEMA
+    @action(["post"], detail=False, url_path="move")
+    def move_subtrees(self, request):
+        """Перенос нескольких поддеревьев департаментов."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            Department.move_subtrees(serializer.validated_data["moves"])
+        except DjangoValidationError as error:
+            raise ValidationError({"moves": error.messages})
+        return Response(status=status.HTTP_204_NO_CONTENT)
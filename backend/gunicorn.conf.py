@@ -0,0 +1,24 @@
+"""
+Настройки gunicorn.
+
+Воркеры gunicorn – отдельные процессы, поэтому метрики Prometheus
+собираются через каталог PROMETHEUS_MULTIPROC_DIR (см. company.metrics).
+"""
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    """Очистка метрик предыдущего запуска."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Удаление метрик завершенного воркера."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
@@ -5,3 +5,6 @@ class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "products"
     verbose_name = "Продукты"
+
+    def ready(self):
+        import products.signals  # noqa: F401
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from company.cache import invalidate
+from products.models import Product, ProductClosure
+
+
+class Command(BaseCommand):
+    help = "Перестраивает иерархию продуктов (таблицу замыкания)."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            parents = dict(
+                Product.objects.values_list("id", "parent_product_id")
+            )
+            ProductClosure.rebuild(parents)
+            invalidate(Product, parents)
+        self.stdout.write(
+            self.style.SUCCESS("Иерархия продуктов перестроена.")
+        )
@@ -0,0 +1,91 @@
+# Generated by Django 4.2 on 2026-10-18 20:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_closure(apps, schema_editor):
+    """Заполнение таблицы замыкания для существующих продуктов."""
+    Product = apps.get_model("products", "Product")
+    ProductClosure = apps.get_model("products", "ProductClosure")
+    parents = dict(Product.objects.values_list("id", "parent_product_id"))
+    links = []
+    for node_id in parents:
+        ancestor_id, depth = node_id, 0
+        while ancestor_id is not None:
+            links.append(
+                ProductClosure(
+                    ancestor_id=ancestor_id, descendant_id=node_id, depth=depth
+                )
+            )
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    ProductClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField(verbose_name="Глубина")),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="products.product",
+                        verbose_name="Предок",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="products.product",
+                        verbose_name="Потомок",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "связь продуктов",
+                "verbose_name_plural": "Иерархия продуктов",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="productclosure",
+            index=models.Index(
+                fields=["ancestor", "depth"],
+                name="products_pr_ancesto_7f9197_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productclosure",
+            index=models.Index(
+                fields=["descendant", "depth"],
+                name="products_pr_descend_b5b02b_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productclosure",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"),
+                name="unique_product_closure",
+            ),
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
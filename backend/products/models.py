@@ -1,13 +1,16 @@
+from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 
+from company.cache import invalidate
+from company.models import ClosureBase, VersionedModel
 from components.models import Component
 
 User = get_user_model()
 
 
-class Product(models.Model):
+class Product(VersionedModel):
     """Модель продукта."""
 
     product_name = models.CharField(
@@ -49,14 +52,123 @@ class Product(models.Model):
 
     def clean(self):
         """
-        Проверяем, что родителем продукта не назначен сам продукт.
+        Проверяем, что родителем продукта не назначен сам продукт или
+        один из его дочерних продуктов любого уровня.
         """
         if self.parent_product == self:
             raise ValidationError("Product cannot be a parent to itself.")
+        if not self._state.adding and ProductClosure.creates_cycle(
+            self.pk, self.parent_product_id
+        ):
+            raise ValidationError(
+                "Product cannot be moved into its own subtree."
+            )
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        is_new = self._state.adding
+        with transaction.atomic():
+            if not is_new:
+                old_parent_id = (
+                    Product.objects.filter(pk=self.pk)
+                    .values_list("parent_product_id", flat=True)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            # Поддерживаем таблицу замыкания в актуальном состоянии
+            if is_new:
+                ProductClosure.insert_node(self.pk, self.parent_product_id)
+            elif old_parent_id != self.parent_product_id:
+                ProductClosure.move_subtree(self.pk, self.parent_product_id)
+
+    @classmethod
+    def move_subtrees(cls, moves):
+        """
+        Атомарный перенос нескольких поддеревьев продуктов.
+
+        moves – словарь {id продукта: id нового родителя или None}.
+        Таблица замыкания перестраивается только для узлов перенесенных
+        поддеревьев, число запросов не зависит от числа переносов.
+        """
+        with transaction.atomic():
+            parents = dict(
+                cls.objects.select_for_update().values_list(
+                    "id", "parent_product_id"
+                )
+            )
+            if missing_ids := moves.keys() - parents.keys():
+                raise ValidationError(
+                    f"Products do not exist: {sorted(missing_ids)}."
+                )
+            moves = {
+                product_id: parent_id
+                for product_id, parent_id in moves.items()
+                if parents[product_id] != parent_id
+            }
+            if not moves:
+                return
+            parents.update(moves)
+            product_id = ProductClosure.find_cycle(parents, moves)
+            if product_id is not None:
+                raise ValidationError(
+                    f"Moving product {product_id} creates a cycle."
+                )
+            related_ids = ProductClosure.get_related_ids(moves)
+            cls.objects.bulk_update(
+                [
+                    cls(id=product_id, parent_product_id=parent_id)
+                    for product_id, parent_id in moves.items()
+                ],
+                ["parent_product"],
+                batch_size=1000,
+            )
+            ProductClosure.relink(
+                parents, ProductClosure.get_subtree_ids(moves)
+            )
+            # Прежние и новые предки выводят поддеревья в дереве продукта
+            invalidate(
+                cls, related_ids | ProductClosure.get_related_ids(moves)
+            )
+            # Команды выводят родительский продукт своего продукта
+            team_model = apps.get_model("teams", "Team")
+            invalidate(
+                team_model,
+                team_model.objects.filter(product_id__in=moves).values_list(
+                    "id", flat=True
+                ),
+                collection=False,
+            )
+
+
+class ProductClosure(ClosureBase):
+    """Таблица замыкания иерархии продуктов."""
+
+    ancestor = models.ForeignKey(
+        to=Product,
+        verbose_name="Предок",
+        on_delete=models.CASCADE,
+        related_name="descendant_links",
+    )
+    descendant = models.ForeignKey(
+        to=Product,
+        verbose_name="Потомок",
+        on_delete=models.CASCADE,
+        related_name="ancestor_links",
+    )
+
+    class Meta:
+        verbose_name = "связь продуктов"
+        verbose_name_plural = "Иерархия продуктов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="unique_product_closure",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["ancestor", "depth"]),
+            models.Index(fields=["descendant", "depth"]),
+        ]
 
 
 class ProductComponent(models.Model):
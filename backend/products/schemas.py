@@ -4,7 +4,8 @@ from drf_spectacular.utils import (OpenApiParameter, OpenApiResponse,
 
 from components.serializers import ComponentReadSerializer
 from products.serializers import (ProductChildrenReadSerializer,
-                                  ProductRootSerializer)
+                                  ProductMoveSerializer, ProductRootSerializer,
+                                  ProductTreeSerializer)
 from teams.serializers import TeamListSerializer
 
 PRODUCT_SCHEMA = extend_schema_view(
@@ -99,3 +100,33 @@ PRODUCT_COMPONENTS_SCHEMA = extend_schema(
     description="Получение списка компонентов продукта.",
     summary="Получение списка компонентов продукта.",
 )
+
+PRODUCT_TREE_SCHEMA = extend_schema(
+    responses={
+        200: ProductTreeSerializer,
+        404: OpenApiResponse(
+            description="No Product matches the given query.",
+        ),
+    },
+    description="Получение дерева дочерних продуктов любой глубины с "
+                "компонентами каждого продукта и списком компонентов "
+                "всего поддерева без повторов.",
+    summary="Получение дерева продукта.",
+)
+
+MOVE_PRODUCTS_SCHEMA = extend_schema(
+    request=ProductMoveSerializer,
+    responses={
+        204: OpenApiResponse(
+            description="Поддеревья перенесены",
+        ),
+        400: OpenApiResponse(
+            description="Invalid data",
+        ),
+    },
+    description="Атомарный перенос нескольких продуктов вместе с "
+                "дочерними продуктами под новых родителей "
+                "(parent: null – сделать корневым). Переносы, создающие "
+                "цикл в иерархии, отклоняются.",
+    summary="Перенос поддеревьев продуктов.",
+)
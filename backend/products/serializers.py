@@ -1,7 +1,8 @@
 from rest_framework import serializers
 
+from company.serializers import MoveSubtreesBaseSerializer
 from components.serializers import ComponentReadShortSerializer
-from products.models import Product
+from products.models import Product, ProductClosure
 from users.serializers import EmployeeShortGetSerializer
 
 
@@ -24,12 +25,19 @@ class ProductWriteSerializer(ProductBaseSerializer):
 
     def validate_parent_product(self, value):
         """
-        Проверяем, что родителем продукта не назначен сам продукт.
+        Проверяем, что родителем продукта не назначен сам продукт или
+        один из его дочерних продуктов.
         """
         if self.instance and value == self.instance:
             raise serializers.ValidationError(
                 "Нельзя назначить родительским " "продуктом сам продукт."
             )
+        if self.instance and value and ProductClosure.creates_cycle(
+            self.instance.pk, value.pk
+        ):
+            raise serializers.ValidationError(
+                "Нельзя назначить родительским продуктом дочерний продукт."
+            )
         return value
 
 
@@ -96,3 +104,51 @@ class ProductShortReadSerializer(ProductBaseSerializer):
             "product_description",
             "parent_product",
         ]
+
+
+class ProductTreeNodeSerializer(ProductBaseSerializer):
+    """Сериализатор для получения узла дерева продуктов."""
+
+    product_manager = EmployeeShortGetSerializer()
+    depth = serializers.IntegerField(read_only=True)
+    components = ComponentReadShortSerializer(
+        source="tree_components", many=True, read_only=True
+    )
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "product_name",
+            "product_description",
+            "product_manager",
+            "parent_product",
+            "depth",
+            "components",
+        ]
+
+
+class ProductTreeSerializer(ProductTreeNodeSerializer):
+    """
+    Сериализатор для описания дерева продуктов: узлы с вложенными
+    дочерними продуктами и компоненты всего поддерева.
+    """
+
+    children = ProductTreeNodeSerializer(many=True, read_only=True)
+    subtree_components = ComponentReadShortSerializer(
+        many=True, read_only=True
+    )
+
+    class Meta:
+        model = Product
+        fields = [
+            *ProductTreeNodeSerializer.Meta.fields,
+            "children",
+            "subtree_components",
+        ]
+
+
+class ProductMoveSerializer(MoveSubtreesBaseSerializer):
+    """Сериализатор для переноса нескольких поддеревьев продуктов."""
+
+    tree_model = Product
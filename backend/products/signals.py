@@ -0,0 +1,89 @@
+from django.db.models import Q
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from company.cache import invalidate
+from components.models import Component
+from products.models import Product, ProductClosure, ProductComponent
+from teams.models import Team
+from users.signals import employees_changed
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    """
+    Инвалидация кэша ответов продукта, связанных с ним продуктов и
+    команд продукта.
+
+    Таблица замыкания обновляется после сигнала, поэтому при переносе
+    продукта она содержит прежних предков, а новые – это предки нового
+    родительского продукта.
+    """
+    invalidate(
+        Product,
+        ProductClosure.get_related_ids([instance.pk])
+        | ProductClosure.get_ancestor_ids([instance.parent_product_id]),
+    )
+    invalidate(
+        Team,
+        Team.objects.filter(product=instance).values_list("id", flat=True),
+        collection=False,
+    )
+
+
+@receiver(m2m_changed, sender=Product.components.through)
+def invalidate_product_components(sender, instance, action, reverse, pk_set,
+                                  **kwargs):
+    """Инвалидация кэша ответов продуктов после изменения компонентов."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate(Product, ProductClosure.get_related_ids([instance.pk]))
+    elif pk_set:
+        invalidate(Product, ProductClosure.get_related_ids(pk_set))
+
+
+@receiver(post_save, sender=ProductComponent)
+@receiver(post_delete, sender=ProductComponent)
+def invalidate_product_component(sender, instance, **kwargs):
+    """Инвалидация кэша ответов продукта после изменения компонентов."""
+    invalidate(Product, ProductClosure.get_related_ids([instance.product_id]))
+
+
+@receiver(post_save, sender=Component)
+def invalidate_component_products(sender, instance, created, **kwargs):
+    """Инвалидация кэша ответов продуктов, содержащих компонент."""
+    if not created:
+        invalidate(
+            Product,
+            ProductClosure.get_related_ids(
+                instance.product.values_list("id", flat=True)
+            ),
+        )
+
+
+@receiver(employees_changed)
+def invalidate_employee_products(sender, employee_ids, **kwargs):
+    """
+    Инвалидация кэша ответов продуктов после изменения данных
+    сотрудников: продуктов, которыми они руководят, и списков компонентов
+    продуктов, владельцами которых они являются.
+    """
+    invalidate(
+        Product,
+        ProductClosure.get_related_ids(
+            Product.objects.filter(
+                product_manager_id__in=employee_ids
+            ).values_list("id", flat=True)
+        ),
+    )
+    invalidate(
+        Product,
+        Product.objects.filter(
+            Q(components__component_owner_id__in=employee_ids)
+            | Q(components__component_second_owner_id__in=employee_ids)
+        ).values_list("id", flat=True),
+        collection=False,
+    )
@@ -1 +1,181 @@
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from company.tests import query_counts
+from components.models import Component
+from products.models import Product, ProductClosure
+from products.views import ProductViewSet
+from teams.models import Team
+
+User = get_user_model()
+
+
+class ProductViewSetQueryCountTest(query_counts.QueryCountTestCase):
+    viewset = ProductViewSet
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product(None)
+        self.child = self.create_product(self.product)
+        self.leaf = self.child
+
+    def create_product(self, parent, manager=None):
+        return Product.objects.create(
+            product_name=self.get_name("Продукт"),
+            product_description="Описание",
+            product_manager=manager,
+            parent_product=parent,
+        )
+
+    def create_objects(self, count):
+        """
+        Дочерние и корневые продукты, уровни дерева продукта, компоненты
+        и команды проверяемого продукта.
+        """
+        for _ in range(count):
+            manager = self.create_employee()
+            child = self.create_product(self.product, manager)
+            self.create_product(None, manager).components.add(
+                self.create_component(manager)
+            )
+            self.leaf = self.create_product(self.leaf, manager)
+            component = self.create_component(manager)
+            self.product.components.add(component)
+            child.components.add(component)
+            self.leaf.components.add(self.create_component(manager))
+            Team.objects.create(
+                team_name=self.get_name("Команда"),
+                team_manager=manager,
+                product=self.product,
+            )
+
+    def create_component(self, owner):
+        return Component.objects.create(
+            component_name=self.get_name("Компонент"),
+            component_type="Сервис",
+            component_link="https://example.com",
+            component_owner=owner,
+            component_second_owner=owner,
+            component_description="Описание",
+        )
+
+    def get_object(self):
+        return self.product
+
+    def get_url_kwargs(self, action, kwargs):
+        # У продукта в ответе retrieve есть родительский продукт
+        if action == "retrieve":
+            return {"pk": self.child.pk}
+        return super().get_url_kwargs(action, kwargs)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+)
+class ProductTreeTest(APITestCase):
+    """Перенос продуктов с проверкой циклов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        # root -> a -> a1, root -> b -> b1, c
+        self.root = self.create_product("root")
+        self.a = self.create_product("a", self.root)
+        self.a1 = self.create_product("a1", self.a)
+        self.b = self.create_product("b", self.root)
+        self.b1 = self.create_product("b1", self.b)
+        self.c = self.create_product("c")
+
+    def create_product(self, name, parent=None):
+        return Product.objects.create(
+            product_name=name,
+            product_description="Описание",
+            parent_product=parent,
+        )
+
+    def move_subtrees(self, moves):
+        return self.client.post(
+            "/api/product/product/move/",
+            {
+                "moves": [
+                    {"id": product.pk, "parent": parent and parent.pk}
+                    for product, parent in moves
+                ]
+            },
+            format="json",
+        )
+
+    def get_parents(self):
+        return dict(Product.objects.values_list("id", "parent_product_id"))
+
+    def assert_closure_is_consistent(self):
+        """Таблица замыкания совпадает с построенной заново по родителям."""
+        parents = self.get_parents()
+        self.assertEqual(
+            set(
+                ProductClosure.objects.values_list(
+                    "ancestor_id", "descendant_id", "depth"
+                )
+            ),
+            {
+                (link.ancestor_id, link.descendant_id, link.depth)
+                for link in ProductClosure.build_links(parents, parents)
+            },
+        )
+
+    def test_reparenting(self):
+        self.a.parent_product = self.c
+        self.a.save()
+        self.assert_closure_is_consistent()
+        self.assertEqual(
+            ProductClosure.get_subtree_ids([self.c.pk]),
+            {self.c.pk, self.a.pk, self.a1.pk},
+        )
+
+    def test_cycle_is_rejected(self):
+        self.root.parent_product = self.a1
+        with self.assertRaises(ValidationError):
+            self.root.save()
+        response = self.client.patch(
+            f"/api/product/product/{self.root.pk}/",
+            {"parent_product": self.a1.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent_product", response.data)
+        self.assertIsNone(self.get_parents()[self.root.pk])
+        self.assert_closure_is_consistent()
+
+    def test_move_subtrees_swaps_siblings(self):
+        # a и b меняются местами: b переносится под c, a – на место b
+        response = self.move_subtrees([(self.b, self.c), (self.a, self.b)])
+        self.assertEqual(response.status_code, 204)
+        self.assert_closure_is_consistent()
+        self.assertEqual(
+            ProductClosure.get_ancestor_ids([self.a1.pk]),
+            {self.a1.pk, self.a.pk, self.b.pk, self.c.pk},
+        )
+        self.assertEqual(
+            ProductClosure.get_subtree_ids([self.root.pk]), {self.root.pk}
+        )
+
+    def test_move_subtrees_rejects_cycle(self):
+        parents = self.get_parents()
+        response = self.move_subtrees([(self.a, self.b), (self.b, self.a1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("moves", response.data)
+        self.assertEqual(self.get_parents(), parents)
+        self.assert_closure_is_consistent()
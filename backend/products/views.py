@@ -1,19 +1,26 @@
-from django.db.models import Prefetch
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Prefetch
 from drf_spectacular.utils import extend_schema
-from rest_framework import filters
+from rest_framework import filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
+from company.cache import cache_response
 from company.mixins import BaseViewSet
 from company.permissions import IsSuperuserOrReadOnly
 from components.models import Component
-from components.serializers import ComponentReadSerializer
-from products.models import Product
+from components.serializers import (ComponentReadSerializer,
+                                    ComponentReadShortSerializer)
+from products.models import Product, ProductClosure, ProductComponent
 from products.schemas import (CHILDREN_PRODUCTS_SCHEMA,
-                              PRODUCT_COMPONENTS_SCHEMA, PRODUCT_SCHEMA,
-                              PRODUCT_TEAMS_SCHEMA, ROOT_PRODUCTS_SCHEMA)
+                              MOVE_PRODUCTS_SCHEMA, PRODUCT_COMPONENTS_SCHEMA,
+                              PRODUCT_SCHEMA, PRODUCT_TEAMS_SCHEMA,
+                              PRODUCT_TREE_SCHEMA, ROOT_PRODUCTS_SCHEMA)
 from products.serializers import (ProductChildrenReadSerializer,
                                   ProductGetSerializer, ProductListSerializer,
-                                  ProductRootSerializer,
+                                  ProductMoveSerializer, ProductRootSerializer,
+                                  ProductTreeNodeSerializer,
                                   ProductWriteSerializer)
 from teams.models import Team
 from teams.serializers import TeamListSerializer
@@ -29,6 +36,15 @@ class ProductViewSet(BaseViewSet):
     ]
     filter_backends = (filters.SearchFilter,)
     search_fields = ("id", "product_name", "product_description")
+    cache_responses = True
+    fast_serialization = (
+        "list",
+        "retrieve",
+        "root_products",
+        "children_products",
+        "product_teams",
+        "product_components",
+    )
 
     def get_queryset(self):
         queryset = Product.objects.all()
@@ -61,6 +77,7 @@ class ProductViewSet(BaseViewSet):
                         "product_manager__id",
                         "product_manager__employee_fio",
                         "product_manager__employee_avatar",
+                        "product_manager__employee_avatar_variants",
                         "product_manager__employee_position",
                         "product_manager__employee_grade",
                         "parent_product__id",
@@ -69,6 +86,10 @@ class ProductViewSet(BaseViewSet):
                         "parent_product__product_manager",
                         "parent_product__parent_product",
                         "parent_product__components",
+                        "parent_product__version",
+                        "parent_product__modified_at",
+                        "version",
+                        "modified_at",
                     )
                 )
             else:
@@ -77,9 +98,12 @@ class ProductViewSet(BaseViewSet):
                     "product_name",
                     "product_description",
                     "parent_product",
+                    "version",
+                    "modified_at",
                     "product_manager__id",
                     "product_manager__employee_fio",
                     "product_manager__employee_avatar",
+                    "product_manager__employee_avatar_variants",
                     "product_manager__employee_position",
                     "product_manager__employee_grade",
                 )
@@ -91,6 +115,7 @@ class ProductViewSet(BaseViewSet):
                 "product_manager__id",
                 "product_manager__employee_fio",
                 "product_manager__employee_avatar",
+                "product_manager__employee_avatar_variants",
                 "product_manager__employee_position",
                 "product_manager__employee_grade",
             )
@@ -105,6 +130,11 @@ class ProductViewSet(BaseViewSet):
                 )
         return queryset
 
+    def get_subtree_ids(self, model_object):
+        return ProductClosure.objects.filter(
+            ancestor=model_object
+        ).values_list("descendant_id", flat=True)
+
     def get_serializer_class(self):
         match self.action:
             case "create" | "update" | "partial_update":
@@ -121,11 +151,16 @@ class ProductViewSet(BaseViewSet):
                 return ProductRootSerializer
             case "product_components":
                 return ComponentReadSerializer
+            case "product_tree":
+                return ProductTreeNodeSerializer
+            case "move_subtrees":
+                return ProductMoveSerializer
             case _:
                 return super().get_serializer_class()
 
     @CHILDREN_PRODUCTS_SCHEMA
     @action(["get"], detail=True, url_path="subsidiary")
+    @cache_response
     def children_products(self, request, pk=None):
         """Получение списка дочерних продуктов."""
         product = self.get_object()
@@ -134,6 +169,7 @@ class ProductViewSet(BaseViewSet):
 
     @ROOT_PRODUCTS_SCHEMA
     @action(["get"], detail=False, url_path="root_products")
+    @cache_response
     def root_products(self, request, pk=None):
         """Получение списка корневых продуктов."""
         products = self.get_queryset().filter(parent_product=None)
@@ -141,6 +177,7 @@ class ProductViewSet(BaseViewSet):
 
     @PRODUCT_TEAMS_SCHEMA
     @action(["get"], detail=True, url_path="product_teams")
+    @cache_response
     def product_teams(self, request, pk=None):
         """Получение списка команд продукта."""
         product = self.get_object()
@@ -151,9 +188,11 @@ class ProductViewSet(BaseViewSet):
                 "id",
                 "team_name",
                 "product",
+                "employee_count",
                 "team_manager__id",
                 "team_manager__employee_fio",
                 "team_manager__employee_avatar",
+                "team_manager__employee_avatar_variants",
                 "team_manager__employee_position",
                 "team_manager__employee_grade",
             )
@@ -162,6 +201,7 @@ class ProductViewSet(BaseViewSet):
 
     @PRODUCT_COMPONENTS_SCHEMA
     @action(["get"], detail=True, url_path="product_components")
+    @cache_response
     def product_components(self, request, pk=None):
         """Получение списка компонентов продукта."""
         product = self.get_object()
@@ -181,3 +221,73 @@ class ProductViewSet(BaseViewSet):
             )
         )
         return self.get_paginated_data(request=request, queryset=components)
+
+    @PRODUCT_TREE_SCHEMA
+    @action(["get"], detail=True, url_path="tree")
+    @cache_response
+    def product_tree(self, request, pk=None):
+        """
+        Получение дерева продукта.
+
+        Поддерево выбирается по таблице замыкания, компоненты всех узлов –
+        одним запросом, поэтому число запросов не зависит от глубины.
+        """
+        product = self.get_object()
+        nodes = list(
+            Product.objects.filter(ancestor_links__ancestor=product)
+            .annotate(depth=F("ancestor_links__depth"))
+            .select_related("product_manager")
+            .only(
+                "id",
+                "product_name",
+                "product_description",
+                "parent_product",
+                "product_manager__id",
+                "product_manager__employee_fio",
+                "product_manager__employee_avatar",
+                "product_manager__employee_avatar_variants",
+                "product_manager__employee_position",
+                "product_manager__employee_grade",
+            )
+            .order_by("depth", "id")
+        )
+        node_components = {node.id: [] for node in nodes}
+        subtree_components = {}
+        for link in (
+            ProductComponent.objects.filter(
+                product__ancestor_links__ancestor=product
+            )
+            .select_related("component")
+            .only("product_id", "component__id", "component__component_name")
+            .order_by("component_id")
+        ):
+            node_components[link.product_id].append(link.component)
+            subtree_components.setdefault(link.component_id, link.component)
+        for node in nodes:
+            node.tree_components = node_components[node.id]
+
+        serializer = self.get_serializer(nodes, many=True)
+        tree = {}
+        for node, node_data in zip(nodes, serializer.data):
+            node_data["children"] = []
+            tree[node.id] = node_data
+            parent = tree.get(node.parent_product_id)
+            if parent is not None:
+                parent["children"].append(node_data)
+        data = tree[product.pk]
+        data["subtree_components"] = ComponentReadShortSerializer(
+            subtree_components.values(), many=True
+        ).data
+        return Response(data)
+
+    @MOVE_PRODUCTS_SCHEMA
+    @action(["post"], detail=False, url_path="move")
+    def move_subtrees(self, request):
+        """Перенос нескольких поддеревьев продуктов."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            Product.move_subtrees(serializer.validated_data["moves"])
+        except DjangoValidationError as error:
+            raise ValidationError({"moves": error.messages})
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -5,3 +5,6 @@ class TeamsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "teams"
     verbose_name = "Команды"
+
+    def ready(self):
+        import teams.signals  # noqa: F401
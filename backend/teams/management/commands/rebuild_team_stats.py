@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from company.cache import invalidate
+from teams.models import Team
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет счетчики сотрудников команд с составом команд и "
+        "исправляет расхождения."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            team_ids = Team.reconcile_employee_counts()
+            invalidate(Team, team_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Счетчики команд сверены, исправлено: {len(team_ids)}."
+            )
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 20:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teams", "0003_alter_team_product_alter_team_team_manager"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="modified_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Дата изменения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="Версия"
+            ),
+        ),
+    ]
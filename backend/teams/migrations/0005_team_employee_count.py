@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-18 20:47
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_employee_count(apps, schema_editor):
+    """Расчет числа сотрудников существующих команд."""
+    Team = apps.get_model("teams", "Team")
+    GazpromUserTeam = apps.get_model("teams", "GazpromUserTeam")
+    counts = dict(
+        GazpromUserTeam.objects.values_list("team_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    teams = list(Team.objects.only("id"))
+    for team in teams:
+        team.employee_count = counts.get(team.id, 0)
+    Team.objects.bulk_update(teams, ["employee_count"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teams", "0004_team_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="employee_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Число сотрудников команды",
+            ),
+        ),
+        migrations.RunPython(fill_employee_count, migrations.RunPython.noop),
+    ]
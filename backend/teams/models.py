@@ -1,13 +1,21 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count
+
+from company.models import VersionedModel
 
 User = get_user_model()
 
 
 # Create your models here.
-class Team(models.Model):
+class Team(VersionedModel):
     """Модель команды."""
 
+    denormalized_fields = (
+        *VersionedModel.denormalized_fields,
+        "employee_count",
+    )
+
     team_name = models.CharField(
         max_length=250,
         verbose_name="Название",
@@ -27,6 +35,11 @@ class Team(models.Model):
         null=True,
         blank=True,
     )
+    employee_count = models.PositiveIntegerField(
+        verbose_name="Число сотрудников команды",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "команда"
@@ -56,6 +69,28 @@ class Team(models.Model):
                 gazprom_user_team.role = "Руководитель"
                 gazprom_user_team.save()
 
+    @classmethod
+    def reconcile_employee_counts(cls):
+        """
+        Сверка счетчиков сотрудников команд с составом команд.
+
+        Возвращает идентификаторы команд, счетчики которых исправлены.
+        """
+        counts = dict(
+            GazpromUserTeam.objects.values_list("team_id")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        teams = [
+            team
+            for team in cls.objects.only("id", "employee_count")
+            if team.employee_count != counts.get(team.id, 0)
+        ]
+        for team in teams:
+            team.employee_count = counts.get(team.id, 0)
+        cls.objects.bulk_update(teams, ["employee_count"], batch_size=1000)
+        return [team.id for team in teams]
+
 
 class GazpromUserTeam(models.Model):
     """Модель для связи сотрудников и команд."""
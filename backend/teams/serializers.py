@@ -28,7 +28,6 @@ class TeamListSerializer(TeamBaseSerializer):
     """Сериализатор для получения списка команд."""
 
     team_manager = EmployeeShortGetSerializer()
-    employee_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Team
@@ -41,7 +40,6 @@ class TeamGetSerializer(TeamBaseSerializer):
 
     team_manager = EmployeeShortGetSerializer()
     product = ProductShortReadSerializer()
-    employee_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Team
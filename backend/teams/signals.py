@@ -0,0 +1,78 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from company.cache import invalidate
+from products.models import Product
+from teams.models import GazpromUserTeam, Team
+from users.signals import employees_changed
+
+
+@receiver(pre_save, sender=Team)
+def remember_team_product(sender, instance, **kwargs):
+    """Запоминаем продукт команды до сохранения."""
+    instance._cache_product_id = None
+    if not instance._state.adding:
+        instance._cache_product_id = (
+            Team.objects.filter(pk=instance.pk)
+            .values_list("product_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def invalidate_team(sender, instance, **kwargs):
+    """
+    Инвалидация кэша ответов команды и списков команд продуктов (прежнего
+    и текущего).
+    """
+    invalidate(Team, [instance.pk])
+    invalidate(
+        Product,
+        {instance.product_id, getattr(instance, "_cache_product_id", None)},
+        collection=False,
+    )
+
+
+@receiver(post_save, sender=GazpromUserTeam)
+def add_team_member(sender, instance, created, **kwargs):
+    """
+    Обновление счетчика сотрудников и инвалидация кэша ответов команды
+    после изменения ее состава.
+    """
+    if created:
+        Team.add_to_counter("employee_count", {instance.team_id: 1})
+    invalidate(Team, [instance.team_id])
+
+
+@receiver(post_delete, sender=GazpromUserTeam)
+def remove_team_member(sender, instance, **kwargs):
+    """
+    Обновление счетчика сотрудников и инвалидация кэша ответов команды
+    после удаления сотрудника из команды (в т.ч. при удалении
+    сотрудника).
+    """
+    Team.add_to_counter("employee_count", {instance.team_id: -1})
+    invalidate(Team, [instance.team_id])
+
+
+@receiver(employees_changed)
+def invalidate_employee_teams(sender, employee_ids, **kwargs):
+    """
+    Инвалидация кэша ответов команд после изменения данных сотрудников:
+    команд, которыми они руководят (и списков команд их продуктов), и
+    списков участников команд.
+    """
+    managed = Team.objects.filter(team_manager_id__in=employee_ids)
+    invalidate(Team, managed.values_list("id", flat=True))
+    invalidate(
+        Product, managed.values_list("product_id", flat=True),
+        collection=False,
+    )
+    invalidate(
+        Team,
+        GazpromUserTeam.objects.filter(
+            employee_id__in=employee_ids
+        ).values_list("team_id", flat=True),
+        collection=False,
+    )
@@ -1 +1,99 @@
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from company.tests import query_counts
+from products.models import Product
+from teams.models import GazpromUserTeam, Team
+from teams.views import TeamViewSet
+
+User = get_user_model()
+
+
+class TeamViewSetQueryCountTest(query_counts.QueryCountTestCase):
+    viewset = TeamViewSet
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(
+            product_name="Продукт", product_description="Описание"
+        )
+        self.team = self.create_team(self.create_employee())
+
+    def create_team(self, manager):
+        return Team.objects.create(
+            team_name=self.get_name("Команда"),
+            team_manager=manager,
+            product=self.product,
+        )
+
+    def create_objects(self, count):
+        """Сотрудники проверяемой команды и другие команды."""
+        for _ in range(count):
+            employee = self.create_employee()
+            GazpromUserTeam.objects.create(
+                team=self.team, employee=employee, role="Разработчик"
+            )
+            self.create_team(employee)
+
+    def get_object(self):
+        return self.team
+
+
+class TeamEmployeeCountTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            employee_fio="Администратор",
+        )
+        cls.employees = [
+            User.objects.create_user(
+                email=f"employee{number}@example.com",
+                employee_fio=f"Сотрудник {number}",
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.team = Team.objects.create(
+            team_name="Команда",
+            team_manager=self.user,
+            product=Product.objects.create(
+                product_name="Продукт", product_description="Описание"
+            ),
+        )
+        self.url = f"/api/team/team/{self.team.pk}/"
+
+    def assert_employee_count(self, count):
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.employee_count, count)
+        self.assertEqual(Team.reconcile_employee_counts(), [])
+
+    def test_employee_count(self):
+        self.assert_employee_count(1)
+        response = self.client.post(
+            f"{self.url}add_employees/",
+            {
+                "employee_ids": [employee.pk for employee in self.employees],
+                "role": "Разработчик",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_employee_count(4)
+        response = self.client.patch(
+            f"{self.url}remove_employees/",
+            {"employee_ids": [self.employees[0].pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_employee_count(3)
+        self.employees[1].delete()
+        self.assert_employee_count(2)
+
+    def test_reconcile_employee_counts(self):
+        Team.objects.filter(pk=self.team.pk).update(employee_count=10)
+        self.assertEqual(Team.reconcile_employee_counts(), [self.team.pk])
+        self.assert_employee_count(1)
@@ -1,14 +1,13 @@
-from functools import partial
-
 from django.db import transaction
-from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
 from rest_framework import filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from company.cache import cache_response, invalidate
 from company.mixins import BaseViewSet
+from company.outbox import enqueue
 from company.permissions import IsSuperuserOrReadOnly
 from teams.models import GazpromUserTeam, Team
 from teams.schemas import (ADD_EMPLOYEES_SCHEMA, CHANGE_EMPLOYEE_ROLE_SCHEMA,
@@ -20,7 +19,10 @@ from teams.serializers import (TeamAddEmployeesSerializer,
                                TeamEmployeeListSerializer, TeamGetSerializer,
                                TeamListSerializer, TeamWriteSerializer)
 from users.models import GazpromUser
-from users.tasks import send_add_to_team_mail, send_remove_from_team_mail
+from users.notifications import (ADD_TO_TEAM, CHANGE_TEAM_ROLE,
+                                 REMOVE_FROM_TEAM)
+from users.search import schedule_search_refresh
+from users.tasks import send_team_notifications
 
 
 @TEAM_SCHEMA
@@ -33,22 +35,24 @@ class TeamViewSet(BaseViewSet):
     ]
     filter_backends = (filters.SearchFilter,)
     search_fields = ("id", "team_name")
+    cache_responses = True
+    fast_serialization = ("list", "retrieve", "employees_list")
 
     def get_queryset(self):
         queryset = Team.objects.all()
 
         if self.action in ("retrieve", "list"):
-            queryset = queryset.annotate(
-                employee_count=Count("gazpromuserteam__employee")
-            ).select_related(
+            queryset = queryset.select_related(
                 "team_manager",
             )
             common_fields = [
                 "id",
                 "team_name",
+                "employee_count",
                 "team_manager__id",
                 "team_manager__employee_fio",
                 "team_manager__employee_avatar",
+                "team_manager__employee_avatar_variants",
                 "team_manager__employee_position",
                 "team_manager__employee_grade",
             ]
@@ -89,6 +93,7 @@ class TeamViewSet(BaseViewSet):
 
     @EMPLOYEES_LIST_SCHEMA
     @action(["get"], detail=True, url_path="employees_list")
+    @cache_response
     def employees_list(self, request, pk=None):
         """Получение списка сотрудников команды."""
         team = self.get_object()
@@ -100,6 +105,7 @@ class TeamViewSet(BaseViewSet):
                 "employee__id",
                 "employee__employee_fio",
                 "employee__employee_avatar",
+                "employee__employee_avatar_variants",
                 "employee__employee_position",
                 "employee__employee_grade",
             )
@@ -130,6 +136,11 @@ class TeamViewSet(BaseViewSet):
                 for employee_id in employee_ids
             ]
         )
+        # bulk_create не отправляет сигналы, поэтому счетчик сотрудников,
+        # поисковые документы и кэш ответов команды обновляем явно
+        Team.add_to_counter("employee_count", {team.pk: len(employee_ids)})
+        schedule_search_refresh(employee_ids)
+        invalidate(Team, [team.id])
 
         # Получаем список email всех сотрудников, добавляемых в команду
         emails = list(
@@ -137,13 +148,16 @@ class TeamViewSet(BaseViewSet):
                 "email", flat=True
             )
         )
-        # Отправка уведомлений после успешного завершения транзакции
-        transaction.on_commit(
-            partial(
-                send_add_to_team_mail.delay,
-                team_name=team.team_name,
-                emails=emails
-            )
+        # Уведомления публикуются после успешного завершения транзакции
+        enqueue(
+            send_team_notifications,
+            events=[
+                {
+                    "event": ADD_TO_TEAM,
+                    "team_name": team.team_name,
+                    "emails": emails,
+                }
+            ],
         )
 
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -172,18 +186,22 @@ class TeamViewSet(BaseViewSet):
                 "email", flat=True
             )
         )
-        # Отправка уведомлений после успешного завершения транзакции
-        transaction.on_commit(
-            partial(
-                send_remove_from_team_mail.delay,
-                team_name=team.team_name,
-                emails=emails,
-            )
+        # Уведомления публикуются после успешного завершения транзакции
+        enqueue(
+            send_team_notifications,
+            events=[
+                {
+                    "event": REMOVE_FROM_TEAM,
+                    "team_name": team.team_name,
+                    "emails": emails,
+                }
+            ],
         )
 
         return Response(serializer.data, status=status.HTTP_204_NO_CONTENT)
 
     @CHANGE_EMPLOYEE_ROLE_SCHEMA
+    @transaction.atomic
     @action(["patch"], detail=True, url_path="change_employee_role")
     def change_employee_role(self, request, pk=None):
         """Изменение роли пользователя в команде."""
@@ -200,6 +218,19 @@ class TeamViewSet(BaseViewSet):
             team=team,
             employee=employee,
         )
+        role_changed = gazpromuserteam.role != role
         gazpromuserteam.role = role
         gazpromuserteam.save()
+        if role_changed:
+            enqueue(
+                send_team_notifications,
+                events=[
+                    {
+                        "event": CHANGE_TEAM_ROLE,
+                        "team_name": team.team_name,
+                        "role": role,
+                        "emails": [employee.email],
+                    }
+                ],
+            )
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,94 @@
+"""
+Уменьшенные копии (варианты) аватаров сотрудников.
+
+Загруженный аватар хранится как есть, а в списках выводятся его
+квадратные копии размеров AVATAR_VARIANT_SIZES в форматах WebP и JPEG.
+Варианты создает задача users.tasks.create_avatar_variants после
+изменения аватара (см. users.signals). Изображение поворачивается по
+EXIF-ориентации, метаданные EXIF (в том числе геолокация снимка)
+в варианты не копируются.
+
+Аватары и варианты хранятся в контентно-адресуемом хранилище
+(company.storage): одинаковые файлы разных сотрудников хранятся один
+раз и учитываются по ссылкам.
+"""
+import io
+import posixpath
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from users.constants import (AVATAR_VARIANT_FORMATS, AVATAR_VARIANT_SIZES,
+                             AVATAR_VARIANTS_DIR)
+
+
+def get_avatar_storage():
+    """Хранилище файлов аватаров."""
+    return get_user_model()._meta.get_field("employee_avatar").storage
+
+
+def load_image(file):
+    """
+    Чтение изображения для создания вариантов: поворот по EXIF-ориентации
+    и приведение к RGB (RGBA для изображений с прозрачностью).
+    """
+    with Image.open(file) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе, не меньше
+        # наибольшего варианта
+        largest = max(AVATAR_VARIANT_SIZES)
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+def render_variant(image, options):
+    """Содержимое файла варианта в формате с параметрами options."""
+    if options["format"] == "JPEG" and image.mode == "RGBA":
+        # JPEG не поддерживает прозрачность: накладываем на белый фон
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = io.BytesIO()
+    # EXIF сохраняется Pillow только при явной передаче, цветовой
+    # профиль сохраняем для правильной передачи цвета
+    image.save(
+        buffer, icc_profile=image.info.get("icc_profile"), **options
+    )
+    return buffer.getvalue()
+
+
+def create_variants(avatar):
+    """
+    Создание вариантов аватара (файла поля employee_avatar).
+    Возвращает имена файлов {размер: {формат: имя}}.
+    """
+    storage = avatar.storage
+    with avatar.open("rb"):
+        image = load_image(avatar)
+    stem = posixpath.splitext(posixpath.basename(avatar.name))[0]
+    variants = {}
+    # Меньшие варианты уменьшаются из большего, а не из исходного файла
+    for size in sorted(AVATAR_VARIANT_SIZES, reverse=True):
+        side = min(size, *image.size)
+        image = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+        variants[str(size)] = {
+            extension: storage.save(
+                f"{AVATAR_VARIANTS_DIR}{stem}_{size}.{extension}",
+                ContentFile(render_variant(image, options)),
+            )
+            for extension, options in AVATAR_VARIANT_FORMATS.items()
+        }
+    return {str(size): variants[str(size)] for size in AVATAR_VARIANT_SIZES}
+
+
+def get_variant_names(variants):
+    """Имена файлов вариантов аватара."""
+    return [name for files in variants.values() for name in files.values()]
+
+
+def release_variants(variants):
+    """Удаление ссылок на файлы вариантов аватара."""
+    get_avatar_storage().release(get_variant_names(variants))
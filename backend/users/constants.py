@@ -20,3 +20,44 @@ GRADES = [
     ("6", "Gr-6"),
     ("7", "Gr-7"),
 ]
+
+IMPORT_STATUSES = [
+    ("pending", "в очереди"),
+    ("processing", "выполняется"),
+    ("done", "завершен"),
+    ("failed", "ошибка"),
+]
+
+# Размер пакета строк при массовом импорте сотрудников
+IMPORT_CHUNK_SIZE = 1000
+
+# Максимальное число сохраняемых ошибок импорта
+IMPORT_MAX_ERRORS = 1000
+
+# Число потоков хеширования паролей при массовом импорте сотрудников
+IMPORT_HASH_WORKERS = 4
+
+# Размер пакета строк, читаемых из БД при экспорте сотрудников
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = [
+    ("csv", "CSV"),
+    ("ndjson", "NDJSON"),
+]
+
+# Каталог вариантов аватара сотрудника
+AVATAR_VARIANTS_DIR = "avatars/variants/"
+
+# Размеры (сторона квадрата в px) вариантов аватара
+AVATAR_VARIANT_SIZES = (48, 128, 512)
+
+# Форматы вариантов аватара: расширение файла и параметры сохранения Pillow
+AVATAR_VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80},
+    "jpeg": {
+        "format": "JPEG",
+        "quality": 85,
+        "optimize": True,
+        "progressive": True,
+    },
+}
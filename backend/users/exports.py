@@ -0,0 +1,80 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from users.constants import EXPORT_CHUNK_SIZE
+from users.models import EmployeeSkill
+
+# Колонки экспорта совпадают с колонками импорта сотрудников
+EXPORT_FIELDS = (
+    "id",
+    "email",
+    "employee_fio",
+    "employee_position",
+    "employee_date_of_birth",
+    "employee_date_of_hire",
+    "employee_telegram",
+    "employee_telephone",
+    "employee_type_job",
+    "employee_status",
+    "employee_location",
+    "employee_grade",
+    "employee_description",
+    "is_employee_outsource",
+)
+EXPORT_COLUMNS = (*EXPORT_FIELDS, "department", "skills")
+DATE_FIELDS = ("employee_date_of_birth", "employee_date_of_hire")
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Построчная выгрузка сотрудников.
+
+    Сотрудники читаются из БД курсором на стороне сервера пакетами по
+    chunk_size строк, навыки подгружаются одним запросом на пакет,
+    поэтому расход памяти не зависит от размера выгрузки.
+    """
+    date_format = settings.REST_FRAMEWORK["DATE_FORMAT"]
+    rows = queryset.distinct().values(
+        *EXPORT_FIELDS,
+        department=F("employee_departament__departament_name"),
+    )
+    iterator = rows.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(iterator, chunk_size)):
+        skills = {}
+        for employee_id, skill_name in EmployeeSkill.objects.filter(
+            employee_id__in=[row["id"] for row in chunk]
+        ).values_list("employee_id", "skill__name"):
+            skills.setdefault(employee_id, []).append(skill_name)
+        for row in chunk:
+            for field in DATE_FIELDS:
+                if row[field] is not None:
+                    row[field] = row[field].strftime(date_format)
+            row["skills"] = "; ".join(skills.get(row["id"], ()))
+            yield row
+
+
+def stream_csv(rows):
+    """Выгрузка сотрудников в формате CSV."""
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_COLUMNS)
+    # BOM для корректного открытия файла в Excel
+    yield "\ufeff" + writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    """Выгрузка сотрудников в формате NDJSON (один объект на строку)."""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
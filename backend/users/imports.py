@@ -0,0 +1,426 @@
+import csv
+import io
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from departments.models import Department, DepartmentHeadcount
+from users.constants import (IMPORT_CHUNK_SIZE, IMPORT_HASH_WORKERS,
+                             IMPORT_MAX_ERRORS)
+from users.models import EmployeeSearchDocument, EmployeeSkill, Skill
+from users.signals import employees_changed
+
+User = get_user_model()
+
+# Поля сотрудника, которые можно передать в файле импорта
+IMPORT_FIELDS = (
+    "employee_fio",
+    "employee_position",
+    "employee_date_of_birth",
+    "employee_date_of_hire",
+    "employee_telegram",
+    "employee_telephone",
+    "employee_type_job",
+    "employee_status",
+    "employee_location",
+    "employee_grade",
+    "employee_description",
+    "is_employee_outsource",
+)
+UNIQUE_FIELDS = ("employee_telegram", "employee_telephone")
+DATE_FORMATS = ("%d-%m-%Y", "%Y-%m-%d")
+TRUE_VALUES = ("1", "true", "yes", "да")
+FALSE_VALUES = ("0", "false", "no", "нет")
+
+
+def read_csv(file):
+    """Построчное чтение CSV-файла."""
+    reader = csv.DictReader(
+        io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    )
+    yield from reader
+
+
+def read_xlsx(file):
+    """Построчное чтение XLSX-файла (в режиме read-only)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as error:
+        raise ValidationError(
+            "Для импорта XLSX необходимо установить пакет openpyxl."
+        ) from error
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [
+            str(value).strip() if value is not None else ""
+            for value in next(rows, ())
+        ]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(file_field):
+    """Построчное чтение файла импорта в зависимости от расширения."""
+    if file_field.name.lower().endswith(".xlsx"):
+        reader = read_xlsx
+    else:
+        reader = read_csv
+    with file_field.open("rb") as file:
+        for row in reader(file):
+            yield {
+                str(key).strip().lower(): value
+                for key, value in row.items()
+                if key is not None
+            }
+
+
+def normalize_cell(value):
+    """Приведение значения ячейки к строке без пробелов по краям."""
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value
+    return str(value).strip()
+
+
+def parse_date(value):
+    """Разбор даты в форматах дд-мм-гггг и гггг-мм-дд."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValidationError(
+        f"Неверный формат даты: {value}. Используйте дд-мм-гггг."
+    )
+
+
+def parse_bool(value):
+    """Разбор логического значения."""
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValidationError(f"Неверное логическое значение: {value}.")
+
+
+def parse_choice(field, value):
+    """Поиск значения поля с выбором по значению или названию варианта."""
+    for choice, label in field.choices:
+        if value.lower() in (choice.lower(), str(label).lower()):
+            return choice
+    return value
+
+
+class EmployeeImporter:
+    """
+    Массовый импорт сотрудников.
+
+    Строки файла читаются потоком и обрабатываются пакетами: для пакета
+    выполняется валидация, поиск департаментов и навыков по названию через
+    словари в памяти и upsert сотрудников по email через bulk_create /
+    bulk_update. Для новых сотрудников без пароля в файле устанавливается
+    непригодный пароль (восстановить его можно через сброс пароля).
+
+    Хеширование пароля (PBKDF2) занимает сотни миллисекунд, поэтому
+    пароли из файла хешируются до транзакции пакета в нескольких потоках
+    (hashlib освобождает GIL): время импорта файла с паролями все равно
+    определяется в основном их хешированием.
+
+    В режиме проверки (dry_run) изменения каждого пакета отменяются, а
+    в импорте сохраняются только число сотрудников, которые были бы
+    созданы и обновлены, и ошибки строк.
+    """
+
+    def __init__(self, employee_import, chunk_size=IMPORT_CHUNK_SIZE):
+        self.employee_import = employee_import
+        self.chunk_size = chunk_size
+        self.departments = dict(
+            Department.objects.values_list("departament_name", "id")
+        )
+        self.skills = dict(Skill.objects.values_list("name", "id"))
+
+    def run(self):
+        """Импорт всех строк файла."""
+        chunk = []
+        # Первая строка файла – заголовок
+        for line, row in enumerate(read_rows(self.employee_import.file), 2):
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self.process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.process_chunk(chunk)
+        self.employee_import.errors.sort(key=lambda error: error["row"])
+
+    def add_error(self, line, messages):
+        """Сохранение ошибки строки."""
+        self.employee_import.error_count += 1
+        if len(self.employee_import.errors) < IMPORT_MAX_ERRORS:
+            self.employee_import.errors.append(
+                {"row": line, "errors": list(messages)}
+            )
+
+    def clean_row(self, row):
+        """Валидация строки и приведение значений к типам модели."""
+        errors = []
+        values = {}
+        email = normalize_cell(row.get("email"))
+        try:
+            email = User._meta.get_field("email").clean(email, None).lower()
+        except ValidationError as error:
+            errors.extend(f"email: {message}" for message in error.messages)
+
+        for name in IMPORT_FIELDS:
+            value = normalize_cell(row.get(name))
+            if value == "":
+                continue
+            field = User._meta.get_field(name)
+            try:
+                if name in ("employee_date_of_birth", "employee_date_of_hire"):
+                    value = parse_date(value)
+                elif name == "is_employee_outsource":
+                    value = parse_bool(value)
+                elif field.choices:
+                    value = parse_choice(field, value)
+                values[name] = field.clean(value, None)
+            except ValidationError as error:
+                errors.extend(
+                    f"{name}: {message}" for message in error.messages
+                )
+
+        department = normalize_cell(row.get("department"))
+        if department:
+            if department in self.departments:
+                values["employee_departament_id"] = self.departments[
+                    department
+                ]
+            else:
+                errors.append(
+                    f"department: департамент {department} не существует."
+                )
+
+        skills = [
+            name.strip()
+            for name in re.split(
+                r"[;,]", str(normalize_cell(row.get("skills")))
+            )
+            if name.strip()
+        ]
+        if errors:
+            raise ValidationError(errors)
+        return {
+            "email": email,
+            "values": values,
+            "skills": skills,
+            "password": normalize_cell(row.get("password")),
+        }
+
+    def check_unique(self, rows):
+        """
+        Проверка уникальных полей (телеграм, телефон) внутри пакета и
+        относительно уже существующих сотрудников.
+        """
+        owners = defaultdict(dict)
+        for name in UNIQUE_FIELDS:
+            values = {
+                row["values"][name] for _, row in rows if name in row["values"]
+            }
+            owners[name] = dict(
+                User.objects.filter(**{f"{name}__in": values}).values_list(
+                    name, Lower("email")
+                )
+            )
+        valid_rows = []
+        for line, row in rows:
+            errors = []
+            for name in UNIQUE_FIELDS:
+                value = row["values"].get(name)
+                if value is None:
+                    continue
+                owner = owners[name].setdefault(value, row["email"])
+                if owner != row["email"]:
+                    errors.append(f"{name}: значение {value} уже занято.")
+            if errors:
+                self.add_error(line, errors)
+            else:
+                valid_rows.append((line, row))
+        return valid_rows
+
+    def resolve_skills(self, rows):
+        """Создание отсутствующих навыков."""
+        missing = {
+            name
+            for _, row in rows
+            for name in row["skills"]
+            if name not in self.skills
+        }
+        if missing:
+            Skill.objects.bulk_create(
+                [Skill(name=name) for name in missing], ignore_conflicts=True
+            )
+            self.skills.update(
+                Skill.objects.filter(name__in=missing).values_list(
+                    "name", "id"
+                )
+            )
+
+    def process_chunk(self, chunk):
+        """Обработка пакета строк."""
+        rows = {}
+        for line, row in chunk:
+            try:
+                cleaned = self.clean_row(row)
+            except ValidationError as error:
+                self.add_error(line, error.messages)
+                continue
+            if cleaned["email"] in rows:
+                self.add_error(
+                    rows[cleaned["email"]][0],
+                    [
+                        "email: сотрудник повторяется в файле, "
+                        "используется последняя строка."
+                    ],
+                )
+            rows[cleaned["email"]] = (line, cleaned)
+
+        rows = self.check_unique(list(rows.values()))
+        self.hash_passwords(rows)
+        skills = dict(self.skills)
+        with transaction.atomic():
+            self.save_rows(rows)
+            if self.employee_import.dry_run:
+                transaction.set_rollback(True)
+        if self.employee_import.dry_run:
+            # Навыки, созданные в отмененной транзакции, не сохранены
+            self.skills = skills
+
+        self.employee_import.processed_rows += len(chunk)
+        self.employee_import.save(
+            update_fields=[
+                "processed_rows",
+                "created_count",
+                "updated_count",
+                "error_count",
+                "errors",
+            ]
+        )
+
+    def hash_passwords(self, rows):
+        """
+        Замена паролей строк их хешами. В режиме проверки пароли не
+        хешируются и не сохраняются.
+        """
+        rows = [row for _, row in rows if row["password"]]
+        if self.employee_import.dry_run:
+            for row in rows:
+                row["password"] = make_password(None)
+            return
+        with ThreadPoolExecutor(IMPORT_HASH_WORKERS) as executor:
+            hashes = executor.map(
+                make_password, [row["password"] for row in rows]
+            )
+            for row, password in zip(rows, hashes):
+                row["password"] = password
+
+    def save_rows(self, rows):
+        """Создание и обновление сотрудников пакета."""
+        # Сотрудники сопоставляются по email без учета регистра
+        existing = {
+            employee.email.lower(): employee
+            for employee in User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=[row["email"] for _, row in rows])
+            .only(
+                "id",
+                "email",
+                "employee_departament_id",
+                "employee_grade",
+                "employee_type_job",
+            )
+        }
+        self.resolve_skills(rows)
+        headcount = Counter()
+        new_employees = []
+        updated_groups = defaultdict(list)
+        employees = []
+        for line, row in rows:
+            employee = existing.get(row["email"])
+            if employee is None:
+                if "employee_fio" not in row["values"]:
+                    self.add_error(line, ["employee_fio: обязательное поле."])
+                    continue
+                employee = User(
+                    email=row["email"],
+                    password=row["password"] or make_password(None),
+                    **row["values"],
+                )
+                new_employees.append(employee)
+            else:
+                if employee.employee_departament_id is not None:
+                    headcount[
+                        DepartmentHeadcount.objects.employee_key(
+                            employee.employee_departament_id,
+                            employee.employee_grade,
+                            employee.employee_type_job,
+                        )
+                    ] -= 1
+                fields = set(row["values"])
+                if row["password"]:
+                    employee.password = row["password"]
+                    fields.add("password")
+                for name, value in row["values"].items():
+                    setattr(employee, name, value)
+                if fields:
+                    updated_groups[frozenset(fields)].append(employee)
+            if employee.employee_departament_id is not None:
+                headcount[
+                    DepartmentHeadcount.objects.employee_key(
+                        employee.employee_departament_id,
+                        employee.employee_grade,
+                        employee.employee_type_job,
+                    )
+                ] += 1
+            employees.append((employee, row["skills"]))
+
+        User.objects.bulk_create(new_employees)
+        for fields, group in updated_groups.items():
+            User.objects.bulk_update(group, list(fields))
+        EmployeeSkill.objects.bulk_create(
+            [
+                EmployeeSkill(employee=employee, skill_id=self.skills[name])
+                for employee, skills in employees
+                for name in skills
+            ],
+            ignore_conflicts=True,
+        )
+        DepartmentHeadcount.objects.apply(headcount)
+        EmployeeSearchDocument.objects.refresh(
+            [employee.pk for employee, _ in employees]
+        )
+        # bulk_update не отправляет post_save
+        employees_changed.send(
+            sender=User,
+            employee_ids=[
+                employee.pk
+                for employees_group in updated_groups.values()
+                for employee in employees_group
+            ],
+        )
+        self.employee_import.created_count += len(new_employees)
+        self.employee_import.updated_count += len(employees) - len(
+            new_employees
+        )
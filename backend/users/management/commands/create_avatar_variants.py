@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from company.outbox import enqueue
+from users.tasks import create_avatar_variants
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Планирует создание вариантов аватаров сотрудников, у которых "
+        "они еще не созданы (например, загруженных до появления "
+        "вариантов)."
+    )
+
+    def handle(self, *args, **options):
+        employees = (
+            User.objects.exclude(employee_avatar="")
+            .exclude(employee_avatar__isnull=True)
+            .filter(employee_avatar_variants={})
+            .values_list("id", "employee_avatar")
+        )
+        count = 0
+        with transaction.atomic():
+            for employee_id, name in employees.iterator():
+                enqueue(
+                    create_avatar_variants, employee_id=employee_id, name=name
+                )
+                count += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Запланировано создание вариантов аватаров: {count}."
+            )
+        )
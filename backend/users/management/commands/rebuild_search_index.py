@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users.models import EmployeeSearchDocument
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковые документы сотрудников."
+
+    def handle(self, *args, **options):
+        EmployeeSearchDocument.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Поисковый индекс перестроен: "
+                f"{EmployeeSearchDocument.objects.count()} документов."
+            )
+        )
@@ -0,0 +1,80 @@
+# Generated by Django 4.2 on 2026-10-18 20:23
+
+from django.conf import settings
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_search_indexes(apps, schema_editor):
+    """GIN-индексы для полнотекстового и триграммного поиска."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX users_search_vector_gin "
+        "ON users_employeesearchdocument USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX users_search_document_trgm "
+        "ON users_employeesearchdocument "
+        "USING gin (document gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS users_search_vector_gin")
+    schema_editor.execute("DROP INDEX IF EXISTS users_search_document_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_gazpromuser_employee_departament"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="EmployeeSearchDocument",
+            fields=[
+                (
+                    "employee",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Сотрудник",
+                    ),
+                ),
+                ("title", models.TextField(blank=True, verbose_name="ФИО")),
+                (
+                    "body",
+                    models.TextField(blank=True, verbose_name="Описание"),
+                ),
+                (
+                    "contacts",
+                    models.TextField(blank=True, verbose_name="Контакты"),
+                ),
+                (
+                    "document",
+                    models.TextField(blank=True, verbose_name="Документ"),
+                ),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False, null=True
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "поисковый документ сотрудника",
+                "verbose_name_plural": "Поисковые документы сотрудников",
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
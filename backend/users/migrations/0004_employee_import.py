@@ -0,0 +1,106 @@
+# Generated by Django 4.2 on 2026-10-18 20:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_employee_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmployeeImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to="imports/", verbose_name="Файл"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "в очереди"),
+                            ("processing", "выполняется"),
+                            ("done", "завершен"),
+                            ("failed", "ошибка"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "processed_rows",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Обработано строк"
+                    ),
+                ),
+                (
+                    "created_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Создано сотрудников"
+                    ),
+                ),
+                (
+                    "updated_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Обновлено сотрудников"
+                    ),
+                ),
+                (
+                    "error_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число строк с ошибками"
+                    ),
+                ),
+                (
+                    "errors",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="Ошибки"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Дата завершения"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="employee_imports",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "импорт сотрудников",
+                "verbose_name_plural": "Импорты сотрудников",
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_employee_import"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gazpromuser",
+            name="employee_avatar_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Варианты аватара",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 21:18
+
+import company.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_employee_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="gazpromuser",
+            name="employee_avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=company.storage.ContentAddressedStorage(),
+                upload_to="avatars/",
+                verbose_name="Аватар",
+            ),
+        ),
+    ]
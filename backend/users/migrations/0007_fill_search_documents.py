@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 21:26
+
+from django.db import migrations
+import users.models
+
+
+def fill_search_documents(apps, schema_editor):
+    """Поисковые документы существующих сотрудников."""
+    EmployeeSearchDocument = apps.get_model("users", "EmployeeSearchDocument")
+    EmployeeSearchDocument.objects.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_employee_avatar_storage"),
+        ("teams", "0005_team_employee_count"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="employeesearchdocument",
+            managers=[
+                ("objects", users.models.EmployeeSearchDocumentManager()),
+            ],
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_fill_search_documents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employeeimport",
+            name="dry_run",
+            field=models.BooleanField(
+                default=False, verbose_name="Проверка без сохранения"
+            ),
+        ),
+    ]
@@ -1,8 +1,11 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models
 from django.db.models import Q
 
-from users.constants import EMPLOYEE_STATUS, GRADES, JOB_TYPES
+from company.storage import ContentAddressedStorage
+from users.constants import (EMPLOYEE_STATUS, GRADES, IMPORT_STATUSES,
+                             JOB_TYPES)
 from users.manager import GazpromUserManager
 from users.validators import (phone_regex, validate_birth_date,
                               validate_hire_date)
@@ -43,7 +46,19 @@ class GazpromUser(AbstractUser):
         blank=True,
     )
     employee_avatar = models.ImageField(
-        verbose_name="Аватар", upload_to="avatars/", null=True, blank=True
+        verbose_name="Аватар",
+        upload_to="avatars/",
+        storage=ContentAddressedStorage(),
+        null=True,
+        blank=True,
+    )
+    # Файлы уменьшенных копий аватара: {размер: {формат: имя файла}},
+    # см. users.avatars
+    employee_avatar_variants = models.JSONField(
+        verbose_name="Варианты аватара",
+        default=dict,
+        blank=True,
+        editable=False,
     )
     employee_telegram = models.CharField(
         verbose_name="Телеграм",
@@ -171,3 +186,187 @@ class EmployeeSkill(models.Model):
         verbose_name = "навык сотрудника"
         verbose_name_plural = "Навыки сотрудников"
         default_related_name = "employeeskill"
+
+
+class EmployeeSearchDocumentManager(models.Manager):
+    """Менеджер для поддержки поисковых документов сотрудников."""
+
+    batch_size = 1000
+    # Менеджер используется для заполнения документов в миграции, поэтому
+    # модели берутся из реестра модели документа (исторического в миграции)
+    use_in_migrations = True
+
+    def build_documents(self, employee_ids):
+        """Сборка поисковых документов для переданных сотрудников."""
+        registry = self.model._meta.apps
+        GazpromUser = registry.get_model("users", "GazpromUser")
+        EmployeeSkill = registry.get_model("users", "EmployeeSkill")
+        GazpromUserTeam = registry.get_model("teams", "GazpromUserTeam")
+        extra = {employee_id: [] for employee_id in employee_ids}
+        for employee_id, team_name, product_name in (
+            GazpromUserTeam.objects.filter(employee_id__in=employee_ids)
+            .values_list("employee_id", "team__team_name",
+                         "team__product__product_name")
+        ):
+            extra[employee_id].extend(
+                value for value in (team_name, product_name) if value
+            )
+        for employee_id, skill_name in EmployeeSkill.objects.filter(
+            employee_id__in=employee_ids
+        ).values_list("employee_id", "skill__name"):
+            extra[employee_id].append(skill_name)
+
+        grades = dict(GRADES)
+        documents = []
+        for employee in GazpromUser.objects.filter(
+            id__in=employee_ids
+        ).values(
+            "id",
+            "employee_fio",
+            "employee_position",
+            "employee_location",
+            "employee_grade",
+            "employee_telegram",
+            "employee_telephone",
+            "email",
+        ):
+            body = [
+                employee["employee_position"],
+                employee["employee_location"],
+                grades.get(employee["employee_grade"]),
+                *extra[employee["id"]],
+            ]
+            contacts = [
+                employee["email"],
+                employee["employee_telegram"],
+                employee["employee_telephone"],
+            ]
+            title = employee["employee_fio"] or ""
+            body = " ".join(dict.fromkeys(value for value in body if value))
+            contacts = " ".join(value for value in contacts if value)
+            documents.append(
+                self.model(
+                    employee_id=employee["id"],
+                    title=title,
+                    body=body,
+                    contacts=contacts,
+                    document=" ".join(
+                        value for value in (title, body, contacts) if value
+                    ).lower(),
+                )
+            )
+        return documents
+
+    def refresh(self, employee_ids):
+        """Обновление поисковых документов сотрудников."""
+        employee_ids = list(employee_ids)
+        for start in range(0, len(employee_ids), self.batch_size):
+            batch = employee_ids[start:start + self.batch_size]
+            self.bulk_create(
+                self.build_documents(batch),
+                update_conflicts=True,
+                unique_fields=["employee"],
+                update_fields=["title", "body", "contacts", "document"],
+            )
+            self.update_search_vector(batch)
+
+    def rebuild(self):
+        """Полное перестроение поискового индекса."""
+        GazpromUser = self.model._meta.apps.get_model("users", "GazpromUser")
+        self.refresh(GazpromUser.objects.values_list("id", flat=True))
+
+    def update_search_vector(self, employee_ids):
+        """Пересчет tsvector (только для PostgreSQL)."""
+        if connection.vendor != "postgresql":
+            return
+        self.filter(employee_id__in=employee_ids).update(
+            search_vector=(
+                SearchVector("title", config="russian", weight="A")
+                + SearchVector("title", config="simple", weight="A")
+                + SearchVector("body", config="russian", weight="B")
+                + SearchVector("body", config="simple", weight="B")
+                + SearchVector("contacts", config="simple", weight="C")
+            )
+        )
+
+
+class EmployeeSearchDocument(models.Model):
+    """
+    Поисковый документ сотрудника.
+
+    Денормализованный текст по ФИО, должности, локации, контактам,
+    командам, продуктам и навыкам сотрудника. В PostgreSQL по полю
+    search_vector построен GIN-индекс полнотекстового поиска, а по полю
+    document – триграммный GIN-индекс (см. миграцию).
+    """
+
+    employee = models.OneToOneField(
+        to=GazpromUser,
+        verbose_name="Сотрудник",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title = models.TextField(verbose_name="ФИО", blank=True)
+    body = models.TextField(verbose_name="Описание", blank=True)
+    contacts = models.TextField(verbose_name="Контакты", blank=True)
+    document = models.TextField(verbose_name="Документ", blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = EmployeeSearchDocumentManager()
+
+    class Meta:
+        verbose_name = "поисковый документ сотрудника"
+        verbose_name_plural = "Поисковые документы сотрудников"
+
+    def __str__(self):
+        return self.title
+
+
+class EmployeeImport(models.Model):
+    """Задача массового импорта сотрудников из файла."""
+
+    file = models.FileField(verbose_name="Файл", upload_to="imports/")
+    status = models.CharField(
+        verbose_name="Статус",
+        choices=IMPORT_STATUSES,
+        max_length=20,
+        default="pending",
+    )
+    processed_rows = models.PositiveIntegerField(
+        verbose_name="Обработано строк", default=0
+    )
+    created_count = models.PositiveIntegerField(
+        verbose_name="Создано сотрудников", default=0
+    )
+    updated_count = models.PositiveIntegerField(
+        verbose_name="Обновлено сотрудников", default=0
+    )
+    error_count = models.PositiveIntegerField(
+        verbose_name="Число строк с ошибками", default=0
+    )
+    errors = models.JSONField(verbose_name="Ошибки", default=list, blank=True)
+    dry_run = models.BooleanField(
+        verbose_name="Проверка без сохранения", default=False
+    )
+    created_by = models.ForeignKey(
+        to=GazpromUser,
+        verbose_name="Автор",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="employee_imports",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания", auto_now_add=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name="Дата завершения", null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = "импорт сотрудников"
+        verbose_name_plural = "Импорты сотрудников"
+
+    def __str__(self):
+        return f"{self.file.name} ({self.get_status_display()})"
@@ -0,0 +1,281 @@
+"""
+Email-уведомления сотрудников об изменениях в командах и департаментах.
+
+События группируются по получателям: каждый сотрудник получает одно
+письмо со всеми своими событиями (адреса других получателей в письмо не
+попадают). Письма отправляются через соединение почтового бэкенда,
+которое переиспользуется задачами процесса воркера, пачками не более
+NOTIFICATION_EMAIL_BATCH_SIZE писем на одно соединение. При ошибке
+отправки соединение открывается заново, письмо отправляется повторно с
+экспоненциально растущей паузой.
+
+В режиме сводки (NOTIFICATION_DIGEST_ENABLED) события накапливаются
+в Redis и отправляются одним письмом получателю за период
+NOTIFICATION_DIGEST_INTERVAL, см. NotificationDigest.
+
+Событие – словарь {"event": <тип>, "emails": [<адреса>], <параметры
+текста>}, например {"event": "add_to_team", "team_name": "Команда",
+"emails": ["employee@example.com"]}.
+"""
+import contextlib
+import json
+import logging
+import smtplib
+import time
+from collections import defaultdict
+
+import redis
+from celery import signals
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+ADD_TO_TEAM = "add_to_team"
+REMOVE_FROM_TEAM = "remove_from_team"
+CHANGE_TEAM_ROLE = "change_team_role"
+MOVE_TO_DEPARTMENT = "move_to_department"
+REMOVE_FROM_DEPARTMENT = "remove_from_department"
+
+# Текст уведомления по типу события
+EVENTS = {
+    ADD_TO_TEAM: "Вас добавили в команду {team_name}",
+    REMOVE_FROM_TEAM: "Вас исключили из команды {team_name}",
+    CHANGE_TEAM_ROLE: "Ваша роль в команде {team_name} изменена: {role}",
+    MOVE_TO_DEPARTMENT: "Вас перевели в департамент {department_name}",
+    REMOVE_FROM_DEPARTMENT: (
+        "Вас исключили из департамента {department_name}"
+    ),
+}
+
+DIGEST_SUBJECT = "Изменения в структуре компании"
+
+
+class NotificationDeliveryError(Exception):
+    """
+    Ошибка отправки уведомлений. Содержит события неотправленных писем
+    (в формате задачи send_team_notifications).
+    """
+
+    def __init__(self, message, events):
+        super().__init__(message)
+        self.events = events
+
+
+class ConnectionPool:
+    """
+    Соединение почтового бэкенда, общее для отправок процесса.
+
+    Соединение открывается при первой отправке и закрывается после
+    batch_size писем (почтовые серверы ограничивают число писем за
+    сессию), при ошибке отправки и при завершении процесса воркера.
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.sent = 0
+
+    def acquire(self, batch_size):
+        if self.connection is not None and self.sent >= batch_size:
+            self.release()
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+            self.sent = 0
+        return self.connection
+
+    def release(self):
+        if self.connection is None:
+            return
+        with contextlib.suppress(smtplib.SMTPException, OSError):
+            self.connection.close()
+        self.connection = None
+
+
+pool = ConnectionPool()
+
+
+@signals.worker_process_shutdown.connect
+def close_pooled_connection(**kwargs):
+    pool.release()
+
+
+class NotificationDispatcher:
+    """
+    Отправка уведомлений о событиях.
+
+    События добавляются методом add_event, повторяющиеся события
+    получателя отбрасываются. Метод send отправляет по одному письму
+    каждому получателю.
+    """
+
+    def __init__(self, connection_pool=None, batch_size=None, retries=None,
+                 retry_delay=None):
+        self.pool = connection_pool or pool
+        self.batch_size = batch_size or settings.NOTIFICATION_EMAIL_BATCH_SIZE
+        self.retries = (
+            settings.NOTIFICATION_EMAIL_RETRIES if retries is None
+            else retries
+        )
+        self.retry_delay = (
+            settings.NOTIFICATION_EMAIL_RETRY_DELAY if retry_delay is None
+            else retry_delay
+        )
+        self.events = defaultdict(list)
+
+    def add_event(self, event, emails, **params):
+        """
+        Добавление события для сотрудников с адресами emails; params –
+        параметры текста события.
+        """
+        if event not in EVENTS:
+            raise ValueError(f"Unknown notification event: {event}.")
+        item = (event, tuple(sorted(params.items())))
+        for email in emails:
+            if item not in self.events[email]:
+                self.events[email].append(item)
+
+    def get_message(self, email, events):
+        """Письмо получателю со всеми его событиями."""
+        lines = [
+            EVENTS[event].format(**dict(params)) for event, params in events
+        ]
+        subject = lines[0] if len(lines) == 1 else DIGEST_SUBJECT
+        return EmailMessage(
+            subject=subject,
+            body="\n".join(lines),
+            from_email=settings.EMAIL_HOST_USER,
+            to=[email],
+        )
+
+    def send(self):
+        """
+        Отправка писем. Возвращает число отправленных писем.
+
+        Если письмо не удалось отправить за retries повторов, выбрасывается
+        NotificationDeliveryError с событиями неотправленных писем.
+        """
+        recipients = list(self.events.items())
+        self.events = defaultdict(list)
+        for number, (email, events) in enumerate(recipients):
+            try:
+                self.send_message(self.get_message(email, events))
+            except (smtplib.SMTPException, OSError) as error:
+                raise NotificationDeliveryError(
+                    f"Не удалось отправить уведомление: {error}",
+                    [
+                        {"event": event, **dict(params), "emails": [email]}
+                        for email, events in recipients[number:]
+                        for event, params in events
+                    ],
+                ) from error
+        return len(recipients)
+
+    def send_message(self, message):
+        for attempt in range(self.retries + 1):
+            try:
+                connection = self.pool.acquire(self.batch_size)
+                connection.send_messages([message])
+                self.pool.sent += 1
+                return
+            except (smtplib.SMTPException, OSError) as error:
+                # Соединение могло быть закрыто сервером, открываем новое
+                self.pool.release()
+                if attempt == self.retries:
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning(
+                    "Email delivery failed (%s), retrying in %.1f s.",
+                    error,
+                    delay,
+                )
+                time.sleep(delay)
+
+
+class NotificationDigest:
+    """
+    События, накопленные для отправки сводкой (режим
+    NOTIFICATION_DIGEST_ENABLED).
+
+    События получателя хранятся в Redis в списке <prefix>:<email>, адреса
+    получателей с накопленными событиями – во множестве <prefix>.
+    Добавление событий и извлечение событий получателя выполняются
+    в транзакциях Redis, поэтому события, добавленные во время отправки
+    сводки, попадают в следующую сводку.
+    """
+
+    prefix = "notifications:digest"
+
+    def __init__(self, client=None):
+        self.client = client or get_digest_client()
+
+    def get_key(self, email):
+        return f"{self.prefix}:{email}"
+
+    def add(self, events):
+        """Добавление событий (в формате задачи send_team_notifications)."""
+        pipeline = self.client.pipeline()
+        for event in events:
+            params = {
+                name: value
+                for name, value in event.items()
+                if name != "emails"
+            }
+            data = json.dumps(params, ensure_ascii=False)
+            for email in event["emails"]:
+                pipeline.rpush(self.get_key(email), data)
+                pipeline.sadd(self.prefix, email)
+        pipeline.execute()
+
+    def pop(self, count):
+        """
+        Извлечение событий не более чем count получателей:
+        {адрес: [событие без адресов, ...]}.
+        """
+        emails = [
+            email.decode() for email in self.client.spop(self.prefix, count)
+        ]
+        pipeline = self.client.pipeline()
+        for email in emails:
+            pipeline.lrange(self.get_key(email), 0, -1)
+            pipeline.delete(self.get_key(email))
+        results = pipeline.execute()
+        return {
+            email: [json.loads(item) for item in items]
+            for email, items in zip(emails, results[::2])
+            if items
+        }
+
+    def flush(self, batch_size=None):
+        """
+        Отправка накопленных событий: по одному письму каждому получателю.
+        Возвращает число отправленных писем.
+
+        События неотправленных писем возвращаются в сводку.
+        """
+        batch_size = batch_size or settings.NOTIFICATION_EMAIL_BATCH_SIZE
+        sent = 0
+        while recipients := self.pop(batch_size):
+            dispatcher = NotificationDispatcher()
+            for email, events in recipients.items():
+                for event in events:
+                    dispatcher.add_event(emails=[email], **event)
+            try:
+                sent += dispatcher.send()
+            except NotificationDeliveryError as error:
+                self.add(error.events)
+                raise
+        return sent
+
+
+_digest_client = None
+
+
+def get_digest_client():
+    """Клиент Redis для накопления сводки (общий для процесса)."""
+    global _digest_client
+    if _digest_client is None:
+        _digest_client = redis.Redis.from_url(
+            settings.NOTIFICATION_DIGEST_REDIS_URL
+        )
+    return _digest_client
@@ -3,7 +3,9 @@ from drf_spectacular.utils import (OpenApiExample, OpenApiParameter,
                                    OpenApiResponse, PolymorphicProxySerializer,
                                    extend_schema, extend_schema_view)
 
+from users.constants import EXPORT_FORMATS
 from users.serializers import (AvatarUploadSerializer, EmployeeGetSerializer,
+                               EmployeeImportSerializer,
                                EmployeePatchUserSerializer,
                                EmployeeWriteSuperuserSerializer,
                                PasswordResetSerializer)
@@ -174,3 +176,50 @@ DELETE_AVATAR_SCHEMA = extend_schema(
     description="Удаление аватара сотрудника.",
     summary="Удаление аватара сотрудника.",
 )
+
+IMPORT_EMPLOYEES_SCHEMA = extend_schema(
+    request={"multipart/form-data": EmployeeImportSerializer},
+    responses={202: EmployeeImportSerializer},
+    description="Массовый импорт сотрудников из файла CSV или XLSX. "
+                "Первая строка файла – заголовок с колонками: email, "
+                "employee_fio, employee_position, employee_date_of_birth, "
+                "employee_date_of_hire, employee_telegram, "
+                "employee_telephone, employee_type_job, employee_status, "
+                "employee_location, employee_grade, employee_description, "
+                "is_employee_outsource, department (название), skills "
+                "(через точку с запятой), password. Сотрудники "
+                "сопоставляются по email: существующие обновляются, "
+                "новые создаются. Импорт выполняется в фоне, статус "
+                "можно получить по идентификатору импорта. С dry_run=true "
+                "файл только проверяется: сотрудники не сохраняются, "
+                "в статусе выводятся ошибки и число сотрудников, которые "
+                "были бы созданы и обновлены.",
+    summary="Массовый импорт сотрудников.",
+)
+
+IMPORT_STATUS_SCHEMA = extend_schema(
+    responses={200: EmployeeImportSerializer},
+    description="Получение статуса и ошибок импорта сотрудников.",
+    summary="Статус импорта сотрудников.",
+)
+
+EXPORT_EMPLOYEES_SCHEMA = extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name="file_format",
+            description="Формат выгрузки: csv (по умолчанию) или ndjson",
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=[file_format for file_format, _ in EXPORT_FORMATS],
+        ),
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.STR,
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+    },
+    description="Потоковая выгрузка справочника сотрудников в формате CSV "
+                "или NDJSON. Поддерживает те же параметры фильтрации и "
+                "поиска, что и получение списка сотрудников. Колонки "
+                "выгрузки совпадают с колонками импорта сотрудников.",
+    summary="Выгрузка сотрудников.",
+)
@@ -0,0 +1,79 @@
+import threading
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.db import connection, transaction
+from django.db.models import F, Q
+from rest_framework import filters
+
+from users.models import EmployeeSearchDocument
+
+_pending = threading.local()
+
+
+def schedule_search_refresh(employee_ids):
+    """
+    Планирование обновления поисковых документов после фиксации
+    транзакции.
+
+    Идентификаторы накапливаются, поэтому массовые изменения внутри
+    одной транзакции приводят к одному пакетному обновлению.
+    """
+    pending = _pending.__dict__.setdefault("employee_ids", set())
+    pending.update(employee_ids)
+    transaction.on_commit(flush_search_refresh)
+
+
+def flush_search_refresh():
+    """Обновление накопленных поисковых документов."""
+    employee_ids = _pending.__dict__.pop("employee_ids", None)
+    if employee_ids:
+        EmployeeSearchDocument.objects.refresh(employee_ids)
+
+
+class EmployeeSearchFilter(filters.SearchFilter):
+    """
+    Поиск сотрудников по поисковому документу.
+
+    В PostgreSQL используется полнотекстовый поиск (конфигурации russian
+    и simple) и триграммное сходство с ранжированием результатов.
+    В остальных СУБД – поиск подстроки по денормализованному документу.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        if connection.vendor == "postgresql":
+            return self.filter_postgresql(queryset, " ".join(terms))
+        return self.filter_fallback(queryset, terms)
+
+    def filter_postgresql(self, queryset, text):
+        query = SearchQuery(
+            text, config="russian", search_type="websearch"
+        ) | SearchQuery(text, config="simple", search_type="websearch")
+        condition = Q(search_document__search_vector=query) | Q(
+            search_document__document__trigram_word_similar=text.lower()
+        )
+        if text.isdigit():
+            condition |= Q(id=int(text))
+        return (
+            queryset.filter(condition)
+            .annotate(
+                search_rank=SearchRank(
+                    F("search_document__search_vector"), query
+                )
+                + TrigramWordSimilarity(
+                    text.lower(), "search_document__document"
+                )
+            )
+            .order_by("-search_rank", "id")
+        )
+
+    def filter_fallback(self, queryset, terms):
+        for term in terms:
+            condition = Q(search_document__document__contains=term.lower())
+            if term.isdigit():
+                condition |= Q(id=int(term))
+            queryset = queryset.filter(condition)
+        return queryset
@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from users.avatars import get_avatar_storage
 from users.constants import EMPLOYEE_STATUS, GRADES, JOB_TYPES
-from users.models import Skill
+from users.models import EmployeeImport, Skill
 
 User = get_user_model()
 
@@ -32,10 +34,53 @@ class SkillSerializer(serializers.ModelSerializer):
         fields = ["name"]
 
 
+@extend_schema_field(
+    {
+        "type": "object",
+        "nullable": True,
+        "additionalProperties": {
+            "type": "object",
+            "additionalProperties": {"type": "string", "format": "uri"},
+        },
+        "example": {
+            "48": {
+                "webp": "http://example.com/media/avatars/variants/a_48.webp",
+                "jpeg": "http://example.com/media/avatars/variants/a_48.jpeg",
+            },
+        },
+    }
+)
+class AvatarVariantsField(serializers.Field):
+    """
+    URL уменьшенных копий аватара {размер: {формат: URL}}. None, если
+    аватара нет или копии еще не созданы.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        storage = get_avatar_storage()
+        request = self.context.get("request")
+        urls = {}
+        for size, files in value.items():
+            urls[size] = {}
+            for extension, name in files.items():
+                url = storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[size][extension] = url
+        return urls
+
+
 class EmployeeGetSerializer(serializers.ModelSerializer):
     """Сериализатор для получения профиля пользователя."""
 
     skills = serializers.StringRelatedField(many=True)
+    employee_avatar_variants = AvatarVariantsField()
 
     class Meta:
         model = User
@@ -47,6 +92,7 @@ class EmployeeGetSerializer(serializers.ModelSerializer):
             "employee_date_of_birth",
             "employee_date_of_hire",
             "employee_avatar",
+            "employee_avatar_variants",
             "employee_telegram",
             "employee_telephone",
             "employee_type_job",
@@ -157,6 +203,7 @@ class EmployeeListSerializer(serializers.ModelSerializer):
     """Сериализатор для получения списка сотрудников."""
 
     id = serializers.ReadOnlyField()
+    employee_avatar_variants = AvatarVariantsField()
 
     class Meta:
         model = User
@@ -164,6 +211,7 @@ class EmployeeListSerializer(serializers.ModelSerializer):
             "id",
             "employee_fio",
             "employee_avatar",
+            "employee_avatar_variants",
             "employee_position",
             "employee_departament",
             "employee_telegram",
@@ -181,6 +229,7 @@ class EmployeeShortGetSerializer(serializers.ModelSerializer):
     """
 
     id = serializers.ReadOnlyField()
+    employee_avatar_variants = AvatarVariantsField()
 
     class Meta:
         model = User
@@ -188,6 +237,7 @@ class EmployeeShortGetSerializer(serializers.ModelSerializer):
             "id",
             "employee_fio",
             "employee_avatar",
+            "employee_avatar_variants",
             "employee_position",
             "employee_grade",
         ]
@@ -215,3 +265,43 @@ class AvatarUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["employee_avatar"]
+
+
+class EmployeeImportSerializer(serializers.ModelSerializer):
+    """Сериализатор для импорта сотрудников из файла."""
+
+    file = serializers.FileField(allow_empty_file=False, write_only=True)
+
+    class Meta:
+        model = EmployeeImport
+        fields = [
+            "id",
+            "file",
+            "status",
+            "processed_rows",
+            "created_count",
+            "updated_count",
+            "error_count",
+            "errors",
+            "dry_run",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = [
+            "status",
+            "processed_rows",
+            "created_count",
+            "updated_count",
+            "error_count",
+            "errors",
+            "created_at",
+            "finished_at",
+        ]
+
+    def validate_file(self, value):
+        """Проверка расширения файла."""
+        if not value.name.lower().endswith((".csv", ".xlsx")):
+            raise serializers.ValidationError(
+                "Поддерживаются только файлы CSV и XLSX."
+            )
+        return value
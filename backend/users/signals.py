@@ -0,0 +1,176 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+
+from company.outbox import enqueue
+from products.models import Product
+from teams.models import GazpromUserTeam, Team
+from users.avatars import get_avatar_storage
+from users.models import Skill
+from users.search import schedule_search_refresh
+from users.tasks import create_avatar_variants, delete_avatar_variants
+
+User = get_user_model()
+
+# Поля сотрудника, входящие в поисковый документ
+SEARCH_FIELDS = {
+    "employee_fio",
+    "employee_position",
+    "employee_location",
+    "employee_grade",
+    "employee_telegram",
+    "employee_telephone",
+    "email",
+}
+
+# Поля сотрудника, выводимые в ответах департаментов, команд, продуктов и
+# компонентов
+CACHED_FIELDS = {
+    "employee_fio",
+    "employee_avatar",
+    "employee_avatar_variants",
+    "employee_position",
+    "employee_grade",
+}
+
+# Изменение данных сотрудников, выводимых в ответах других сущностей.
+# Отправляется и при массовых операциях, которые не вызывают post_save.
+# Аргументы: employee_ids.
+employees_changed = Signal()
+
+
+@receiver(post_save, sender=User)
+def notify_employees_changed(sender, instance, created, update_fields=None,
+                             **kwargs):
+    """
+    Оповещаем об изменении сотрудника. Сохранения, не затрагивающие
+    выводимые поля (например, last_login при входе), пропускаются.
+    """
+    if created:
+        return
+    if update_fields is None or CACHED_FIELDS & set(update_fields):
+        employees_changed.send(sender=User, employee_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=User)
+def notify_employee_deleted(sender, instance, **kwargs):
+    """Оповещаем об удалении сотрудника."""
+    employees_changed.send(sender=User, employee_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=User)
+def remember_employee_avatar(sender, instance, update_fields=None,
+                             **kwargs):
+    """Запоминаем аватар и его варианты до сохранения."""
+    instance._avatar_state = None
+    if instance._state.adding or not (
+        update_fields is None or "employee_avatar" in update_fields
+    ):
+        return
+    instance._avatar_state = (
+        User.objects.filter(pk=instance.pk)
+        .values_list("employee_avatar", "employee_avatar_variants")
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def update_employee_avatar(sender, instance, created, **kwargs):
+    """
+    После изменения аватара переносим ссылку в хранилище на новый файл,
+    удаляем варианты прежнего аватара и планируем создание вариантов
+    нового.
+    """
+    name = instance.employee_avatar.name or ""
+    if created:
+        previous, variants = "", {}
+    elif getattr(instance, "_avatar_state", None) is not None:
+        previous, variants = instance._avatar_state
+        previous = previous or ""
+    else:
+        return
+    if name == previous:
+        return
+    storage = get_avatar_storage()
+    if name:
+        storage.acquire([name])
+    if previous:
+        storage.release([previous])
+    if variants:
+        User.objects.filter(pk=instance.pk).update(
+            employee_avatar_variants={}
+        )
+        instance.employee_avatar_variants = {}
+        enqueue(delete_avatar_variants, variants=variants)
+    if name:
+        enqueue(create_avatar_variants, employee_id=instance.pk, name=name)
+
+
+@receiver(post_delete, sender=User)
+def release_employee_avatar(sender, instance, **kwargs):
+    """Удаляем ссылки на аватар и варианты удаленного сотрудника."""
+    if instance.employee_avatar:
+        get_avatar_storage().release([instance.employee_avatar.name])
+    if instance.employee_avatar_variants:
+        enqueue(
+            delete_avatar_variants,
+            variants=instance.employee_avatar_variants,
+        )
+
+
+@receiver(post_save, sender=User)
+def refresh_employee_search(sender, instance, update_fields=None, **kwargs):
+    """Обновляем поисковый документ после изменения сотрудника."""
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        schedule_search_refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.skills.through)
+def refresh_skills_search(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Обновляем поисковые документы после изменения навыков."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        schedule_search_refresh([instance.pk])
+    elif pk_set:
+        schedule_search_refresh(pk_set)
+
+
+@receiver(post_save, sender=GazpromUserTeam)
+@receiver(post_delete, sender=GazpromUserTeam)
+def refresh_team_member_search(sender, instance, **kwargs):
+    """Обновляем поисковый документ после изменения состава команды."""
+    schedule_search_refresh([instance.employee_id])
+
+
+@receiver(post_save, sender=Team)
+def refresh_team_search(sender, instance, created, **kwargs):
+    """Обновляем поисковые документы участников команды."""
+    if not created:
+        schedule_search_refresh(
+            GazpromUserTeam.objects.filter(team=instance).values_list(
+                "employee_id", flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search(sender, instance, created, **kwargs):
+    """Обновляем поисковые документы участников команд продукта."""
+    if not created:
+        schedule_search_refresh(
+            GazpromUserTeam.objects.filter(team__product=instance)
+            .values_list("employee_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Skill)
+@receiver(pre_delete, sender=Skill)
+def refresh_skill_search(sender, instance, **kwargs):
+    """Обновляем поисковые документы сотрудников с навыком."""
+    if not kwargs.get("created", False):
+        schedule_search_refresh(
+            instance.users.values_list("id", flat=True)
+        )
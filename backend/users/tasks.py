@@ -1,9 +1,23 @@
 from celery import shared_task
 from celery_singleton import Singleton
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
 
+from users.avatars import (create_variants, get_avatar_storage,
+                           get_variant_names, release_variants)
+from users.notifications import (ADD_TO_TEAM, REMOVE_FROM_TEAM,
+                                 NotificationDeliveryError,
+                                 NotificationDigest, NotificationDispatcher)
 
+User = get_user_model()
+
+
+# Отправка пароля выполняется задачей reset_password; задача оставлена для
+# сообщений, поставленных в очередь до ее появления
 @shared_task(base=Singleton)
 def send_reset_password_email(new_password, email):
     """Отправка email для восстановления пароля."""
@@ -17,24 +31,141 @@ def send_reset_password_email(new_password, email):
 
 
 @shared_task(base=Singleton)
+def reset_password(email):
+    """
+    Восстановление пароля: установка нового пароля сотрудника и отправка
+    его на email. Если письмо не отправлено, пароль не меняется.
+    """
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        return
+    new_password = get_random_string(length=8)
+    with transaction.atomic():
+        user.set_password(new_password)
+        user.save(update_fields=["password"])
+        send_reset_password_email(new_password, email)
+
+
+@shared_task(bind=True, max_retries=5, outbox_merge="events")
+def send_team_notifications(self, events):
+    """
+    Отправка уведомлений об изменениях в командах и департаментах.
+
+    events – список событий (см. users.notifications); каждый сотрудник
+    получает одно письмо со всеми своими событиями (события сообщений
+    outbox одной пачки объединяются, см. company.outbox). Письма, которые
+    не удалось отправить, отправляются повторной задачей. В режиме сводки
+    события накапливаются для задачи flush_notification_digest.
+    """
+    if settings.NOTIFICATION_DIGEST_ENABLED:
+        NotificationDigest().add(events)
+        return
+    dispatcher = NotificationDispatcher()
+    for event in events:
+        dispatcher.add_event(**event)
+    try:
+        dispatcher.send()
+    except NotificationDeliveryError as error:
+        # Пауза продолжает последовательность повторов отправки письма
+        delay = settings.NOTIFICATION_EMAIL_RETRY_DELAY * 2 ** (
+            settings.NOTIFICATION_EMAIL_RETRIES + self.request.retries
+        )
+        raise self.retry(
+            args=(),
+            kwargs={"events": error.events},
+            countdown=delay,
+            exc=error,
+        )
+
+
+@shared_task(ignore_result=True)
+def flush_notification_digest():
+    """Отправка накопленных уведомлений сводкой."""
+    return NotificationDigest().flush()
+
+
+# Задачи для сообщений, поставленных в очередь до появления
+# send_team_notifications
+@shared_task
 def send_add_to_team_mail(team_name, emails):
-    """Отправка email с уведомлением об удалении сотрудника из команды."""
-    send_mail(
-        subject=f"Вас добавили в команду {team_name}",
-        message=f"Вас добавили в команду {team_name}",
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=emails,
-        fail_silently=False,
+    """Отправка email с уведомлением о добавлении сотрудника в команду."""
+    send_team_notifications.delay(
+        [{"event": ADD_TO_TEAM, "team_name": team_name, "emails": emails}]
     )
 
 
-@shared_task(base=Singleton)
+@shared_task
 def send_remove_from_team_mail(team_name, emails):
     """Отправка email с уведомлением об удалении сотрудника из команды."""
-    send_mail(
-        subject=f"Вас исключили из команды {team_name}",
-        message=f"Вас исключили из команды {team_name}",
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=emails,
-        fail_silently=False,
+    send_team_notifications.delay(
+        [
+            {
+                "event": REMOVE_FROM_TEAM,
+                "team_name": team_name,
+                "emails": emails,
+            }
+        ]
     )
+
+
+@shared_task
+def import_employees(import_id):
+    """Массовый импорт сотрудников из загруженного файла."""
+    from users.imports import EmployeeImporter
+    from users.models import EmployeeImport
+
+    employee_import = EmployeeImport.objects.get(id=import_id)
+    employee_import.status = "processing"
+    employee_import.save(update_fields=["status"])
+    try:
+        EmployeeImporter(employee_import).run()
+        employee_import.status = "done"
+    except Exception as error:
+        employee_import.status = "failed"
+        employee_import.errors.append({"row": None, "errors": [str(error)]})
+        raise
+    finally:
+        employee_import.finished_at = timezone.now()
+        employee_import.save()
+
+
+@shared_task
+def create_avatar_variants(employee_id, name):
+    """
+    Создание вариантов аватара name сотрудника.
+
+    Если аватар уже заменен или удален, а также если варианты уже
+    созданы другой задачей, ссылки на созданные файлы не добавляются
+    (файлы удалит сборка мусора хранилища).
+    """
+    from users.signals import employees_changed
+
+    employee = (
+        User.objects.filter(id=employee_id, employee_avatar=name)
+        .only("employee_avatar", "employee_avatar_variants")
+        .first()
+    )
+    if employee is None or employee.employee_avatar_variants:
+        return
+    variants = create_variants(employee.employee_avatar)
+    with transaction.atomic():
+        employee = (
+            User.objects.select_for_update()
+            .filter(id=employee_id, employee_avatar=name)
+            .only("employee_avatar_variants")
+            .first()
+        )
+        if employee is None or employee.employee_avatar_variants:
+            return
+        # update не отправляет post_save
+        User.objects.filter(id=employee_id).update(
+            employee_avatar_variants=variants
+        )
+        get_avatar_storage().acquire(get_variant_names(variants))
+        employees_changed.send(sender=User, employee_ids=[employee_id])
+
+
+@shared_task
+def delete_avatar_variants(variants):
+    """Удаление ссылок на файлы вариантов прежнего аватара."""
+    release_variants(variants)
@@ -1 +1,806 @@
-# Create your tests here.
+import csv
+import datetime
+import io
+import json
+import smtplib
+import tempfile
+from unittest import mock, skipIf, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from company.models import MediaBlob, OutboxMessage
+from company.tests import query_counts
+from departments.models import Department
+from teams.models import GazpromUserTeam, Team
+from users import notifications
+from users.avatars import get_variant_names
+from users.constants import AVATAR_VARIANT_SIZES
+from users.imports import EmployeeImporter
+from users.models import EmployeeImport, EmployeeSkill, Skill
+from users.notifications import (ADD_TO_TEAM, CHANGE_TEAM_ROLE,
+                                 DIGEST_SUBJECT, MOVE_TO_DEPARTMENT,
+                                 REMOVE_FROM_TEAM, ConnectionPool,
+                                 NotificationDeliveryError,
+                                 NotificationDigest, NotificationDispatcher)
+from users.serializers import EmployeeShortGetSerializer
+from users.tasks import (create_avatar_variants, delete_avatar_variants,
+                         reset_password)
+from users.views import UserViewSet
+
+User = get_user_model()
+
+
+class UserViewSetQueryCountTest(query_counts.QueryCountTestCase):
+    viewset = UserViewSet
+
+    def setUp(self):
+        super().setUp()
+        self.department = Department.objects.create(
+            departament_name="Департамент", departament_description="Описание"
+        )
+        self.employee_import = EmployeeImport.objects.create(
+            file="imports/employees.csv", created_by=self.user
+        )
+
+    def create_objects(self, count):
+        """
+        Сотрудники с навыками и командами; навыки и команды текущего
+        пользователя (для retrieve и me).
+        """
+        for _ in range(count):
+            employee = self.create_employee(
+                employee_departament=self.department
+            )
+            skill = Skill.objects.create(name=self.get_name("Навык"))
+            EmployeeSkill.objects.create(employee=employee, skill=skill)
+            EmployeeSkill.objects.create(employee=self.user, skill=skill)
+            team = Team.objects.create(
+                team_name=self.get_name("Команда"), team_manager=employee
+            )
+            GazpromUserTeam.objects.create(
+                team=team, employee=self.user, role="Разработчик"
+            )
+
+    def get_object(self):
+        return self.user
+
+    def get_url_kwargs(self, action, kwargs):
+        if action == "import_status":
+            return {"import_id": self.employee_import.pk}
+        return super().get_url_kwargs(action, kwargs)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """Почтовый бэкенд, отказывающий в отправке failures раз."""
+
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyEmailBackend.failures:
+            FlakyEmailBackend.failures -= 1
+            raise smtplib.SMTPServerDisconnected("Connection closed")
+        return super().send_messages(messages)
+
+
+class NotificationDispatcherTest(SimpleTestCase):
+    def get_dispatcher(self, **kwargs):
+        return NotificationDispatcher(
+            connection_pool=ConnectionPool(), retry_delay=0, **kwargs
+        )
+
+    def test_one_message_per_recipient(self):
+        dispatcher = self.get_dispatcher()
+        dispatcher.add_event(
+            ADD_TO_TEAM, ["a@a.ru", "b@b.ru"], team_name="Альфа"
+        )
+        dispatcher.add_event(ADD_TO_TEAM, ["a@a.ru"], team_name="Бета")
+        dispatcher.add_event(ADD_TO_TEAM, ["a@a.ru"], team_name="Альфа")
+        dispatcher.add_event(REMOVE_FROM_TEAM, ["b@b.ru"], team_name="Гамма")
+        self.assertEqual(dispatcher.send(), 2)
+        self.assertEqual(
+            [message.to for message in mail.outbox], [["a@a.ru"], ["b@b.ru"]]
+        )
+        self.assertEqual(mail.outbox[0].subject, DIGEST_SUBJECT)
+        self.assertEqual(
+            mail.outbox[0].body,
+            "Вас добавили в команду Альфа\nВас добавили в команду Бета",
+        )
+        dispatcher.add_event(REMOVE_FROM_TEAM, ["c@c.ru"], team_name="Гамма")
+        dispatcher.send()
+        self.assertEqual(
+            mail.outbox[-1].subject, "Вас исключили из команды Гамма"
+        )
+
+    def test_connection_reused_within_batch(self):
+        dispatcher = self.get_dispatcher(batch_size=2)
+        emails = [f"user{number}@example.com" for number in range(5)]
+        dispatcher.add_event(ADD_TO_TEAM, emails, team_name="Альфа")
+        with mock.patch.object(
+            notifications,
+            "get_connection",
+            side_effect=notifications.get_connection,
+        ) as get_connection:
+            self.assertEqual(dispatcher.send(), 5)
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_BACKEND="users.tests.FlakyEmailBackend")
+    def test_failed_message_is_retried(self):
+        FlakyEmailBackend.failures = 2
+        dispatcher = self.get_dispatcher(retries=2)
+        dispatcher.add_event(
+            ADD_TO_TEAM, ["a@a.ru", "b@b.ru"], team_name="Альфа"
+        )
+        with self.assertLogs(notifications.logger, "WARNING"):
+            self.assertEqual(dispatcher.send(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_BACKEND="users.tests.FlakyEmailBackend")
+    def test_undelivered_events_are_returned(self):
+        dispatcher = self.get_dispatcher(retries=1)
+        dispatcher.add_event(
+            ADD_TO_TEAM, ["a@a.ru", "b@b.ru"], team_name="Альфа"
+        )
+        dispatcher.add_event(ADD_TO_TEAM, ["b@b.ru"], team_name="Бета")
+        with mock.patch.object(
+            FlakyEmailBackend, "failures", 2
+        ), self.assertLogs(notifications.logger, "WARNING"), self.assertRaises(
+            NotificationDeliveryError
+        ) as context:
+            dispatcher.send()
+        self.assertEqual(
+            context.exception.events,
+            [
+                {"event": ADD_TO_TEAM, "team_name": "Альфа",
+                 "emails": ["a@a.ru"]},
+                {"event": ADD_TO_TEAM, "team_name": "Альфа",
+                 "emails": ["b@b.ru"]},
+                {"event": ADD_TO_TEAM, "team_name": "Бета",
+                 "emails": ["b@b.ru"]},
+            ],
+        )
+        self.assertEqual(mail.outbox, [])
+
+
+class FakeRedis:
+    """Хранилище в памяти с командами Redis, которые использует сводка."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value.encode())
+
+    def sadd(self, key, value):
+        self.data.setdefault(key, set()).add(value.encode())
+
+    def spop(self, key, count):
+        members = self.data.get(key, set())
+        return [members.pop() for _ in range(min(count, len(members)))]
+
+    def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class FakePipeline:
+    """Транзакция FakeRedis: команды выполняются при вызове execute."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args):
+            self.commands.append((getattr(self.client, name), args))
+
+        return command
+
+    def execute(self):
+        return [command(*args) for command, args in self.commands]
+
+
+class NotificationDigestTest(SimpleTestCase):
+    def setUp(self):
+        self.digest = NotificationDigest(FakeRedis())
+        # Сводка отправляется через общее соединение процесса
+        notifications.pool.release()
+        self.addCleanup(notifications.pool.release)
+
+    def test_events_are_sent_as_one_message_per_recipient(self):
+        self.digest.add(
+            [
+                {
+                    "event": ADD_TO_TEAM,
+                    "team_name": "Альфа",
+                    "emails": ["a@a.ru", "b@b.ru"],
+                },
+                {
+                    "event": CHANGE_TEAM_ROLE,
+                    "team_name": "Альфа",
+                    "role": "Аналитик",
+                    "emails": ["a@a.ru"],
+                },
+            ]
+        )
+        self.digest.add(
+            [
+                {
+                    "event": MOVE_TO_DEPARTMENT,
+                    "department_name": "Департамент",
+                    "emails": ["a@a.ru"],
+                }
+            ]
+        )
+        self.assertEqual(self.digest.flush(), 2)
+        messages = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(messages["a@a.ru"].subject, DIGEST_SUBJECT)
+        self.assertEqual(
+            messages["a@a.ru"].body,
+            "Вас добавили в команду Альфа\n"
+            "Ваша роль в команде Альфа изменена: Аналитик\n"
+            "Вас перевели в департамент Департамент",
+        )
+        self.assertEqual(
+            messages["b@b.ru"].subject, "Вас добавили в команду Альфа"
+        )
+        self.assertEqual(self.digest.flush(), 0)
+
+    @override_settings(
+        EMAIL_BACKEND="users.tests.FlakyEmailBackend",
+        NOTIFICATION_EMAIL_RETRIES=0,
+    )
+    def test_undelivered_events_are_kept(self):
+        self.digest.add(
+            [
+                {
+                    "event": ADD_TO_TEAM,
+                    "team_name": "Альфа",
+                    "emails": ["a@a.ru"],
+                }
+            ]
+        )
+        with mock.patch.object(
+            FlakyEmailBackend, "failures", 1
+        ), self.assertRaises(NotificationDeliveryError):
+            self.digest.flush()
+        self.assertEqual(
+            self.digest.pop(10),
+            {"a@a.ru": [{"event": ADD_TO_TEAM, "team_name": "Альфа"}]},
+        )
+
+
+class AvatarVariantsTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(
+            email="employee@example.com", employee_fio="Сотрудник"
+        )
+
+    def upload_avatar(self, color="red"):
+        """Загрузка снимка 600x400 с EXIF-поворотом на 90° и геотегом."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x8825] = {1: "N"}
+        buffer = io.BytesIO()
+        Image.new("RGB", (600, 400), color).save(
+            buffer, "JPEG", exif=exif.tobytes()
+        )
+        self.user.employee_avatar.save(
+            "avatar.jpg", ContentFile(buffer.getvalue())
+        )
+
+    def run_outbox(self, task):
+        """Выполнение задач task, записанных в outbox."""
+        for message in OutboxMessage.objects.filter(task=task.name):
+            task(**message.kwargs)
+            message.delete()
+
+    def test_variants_are_created(self):
+        self.upload_avatar()
+        self.assertIsNone(
+            EmployeeShortGetSerializer(self.user).data[
+                "employee_avatar_variants"
+            ]
+        )
+        self.run_outbox(create_avatar_variants)
+        self.user.refresh_from_db()
+        variants = self.user.employee_avatar_variants
+        self.assertEqual(list(variants), ["48", "128", "512"])
+        storage = self.user.employee_avatar.storage
+        for size in AVATAR_VARIANT_SIZES:
+            for extension, image_format in ("webp", "WEBP"), ("jpeg", "JPEG"):
+                with storage.open(variants[str(size)][extension]) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.format, image_format)
+                    # Меньшая сторона исходного снимка – 400 px
+                    side = min(size, 400)
+                    self.assertEqual(image.size, (side, side))
+                    self.assertEqual(len(image.getexif()), 0)
+        data = EmployeeShortGetSerializer(self.user).data
+        self.assertEqual(
+            data["employee_avatar_variants"]["48"]["webp"],
+            storage.url(variants["48"]["webp"]),
+        )
+
+    def test_command_creates_missing_variants(self):
+        self.upload_avatar()
+        self.run_outbox(create_avatar_variants)
+        other = User.objects.create_user(
+            email="other@example.com", employee_fio="Другой сотрудник"
+        )
+        # Аватар, загруженный до появления вариантов
+        User.objects.filter(pk=self.user.pk).update(
+            employee_avatar_variants={}
+        )
+        call_command("create_avatar_variants", stdout=io.StringIO())
+        self.assertEqual(
+            list(
+                OutboxMessage.objects.filter(
+                    task=create_avatar_variants.name
+                ).values_list("kwargs", flat=True)
+            ),
+            [
+                {
+                    "employee_id": self.user.pk,
+                    "name": self.user.employee_avatar.name,
+                }
+            ],
+        )
+        self.run_outbox(create_avatar_variants)
+        self.user.refresh_from_db()
+        self.assertEqual(
+            list(self.user.employee_avatar_variants), ["48", "128", "512"]
+        )
+        other.refresh_from_db()
+        self.assertEqual(other.employee_avatar_variants, {})
+
+    def get_ref_counts(self, names):
+        return dict(
+            MediaBlob.objects.filter(name__in=names).values_list(
+                "name", "ref_count"
+            )
+        )
+
+    def test_avatar_references(self):
+        self.upload_avatar()
+        self.run_outbox(create_avatar_variants)
+        self.user.refresh_from_db()
+        avatar = self.user.employee_avatar.name
+        variants = get_variant_names(self.user.employee_avatar_variants)
+        self.assertEqual(
+            self.get_ref_counts([avatar, *variants]),
+            dict.fromkeys([avatar, *variants], 1),
+        )
+
+        # Тот же снимок другого сотрудника хранится в тех же файлах
+        other = User.objects.create_user(
+            email="other@example.com", employee_fio="Другой сотрудник"
+        )
+        other.employee_avatar = avatar
+        other.save()
+        self.run_outbox(create_avatar_variants)
+        other.refresh_from_db()
+        self.assertEqual(
+            get_variant_names(other.employee_avatar_variants), variants
+        )
+        self.assertEqual(self.get_ref_counts([avatar])[avatar], 2)
+
+        self.upload_avatar("blue")
+        self.assertEqual(self.user.employee_avatar_variants, {})
+        self.run_outbox(delete_avatar_variants)
+        self.assertEqual(self.get_ref_counts([avatar])[avatar], 1)
+        self.assertEqual(
+            set(self.get_ref_counts(variants).values()), {1}
+        )
+
+        other.delete()
+        self.run_outbox(delete_avatar_variants)
+        storage = self.user.employee_avatar.storage
+        storage.collect_garbage(min_age=0)
+        for name in [avatar, *variants]:
+            self.assertFalse(storage.exists(name))
+        self.assertTrue(storage.exists(self.user.employee_avatar.name))
+
+    def test_outdated_task_is_ignored(self):
+        self.upload_avatar()
+        name = self.user.employee_avatar.name
+        self.upload_avatar("blue")
+        create_avatar_variants(employee_id=self.user.id, name=name)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.employee_avatar_variants, {})
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+)
+class PasswordResetTest(TestCase):
+    def test_password_is_not_stored_in_outbox(self):
+        user = User.objects.create_user(
+            email="employee@example.com",
+            employee_fio="Сотрудник",
+            password="old-password",
+        )
+        response = APIClient().post(
+            "/api/users/password-reset/",
+            {"email": user.email},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, reset_password.name)
+        self.assertEqual(message.kwargs, {"email": user.email})
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("old-password"))
+
+        reset_password.run(**message.kwargs)
+        new_password = mail.outbox[0].body.rsplit(" ", 1)[1]
+        user.refresh_from_db()
+        self.assertTrue(user.check_password(new_password))
+
+    def test_password_is_kept_if_email_fails(self):
+        user = User.objects.create_user(
+            email="employee@example.com",
+            employee_fio="Сотрудник",
+            password="old-password",
+        )
+        with override_settings(
+            EMAIL_BACKEND="users.tests.FlakyEmailBackend"
+        ), mock.patch.object(FlakyEmailBackend, "failures", 1):
+            with self.assertRaises(smtplib.SMTPException):
+                reset_password.run(email=user.email)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("old-password"))
+
+
+class EmployeeImportTest(TestCase):
+    header = "email,employee_fio,employee_grade,department,skills\n"
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.department = Department.objects.create(
+            departament_name="Департамент", departament_description="Описание"
+        )
+        self.employee = User.objects.create_user(
+            email="old@example.com", employee_fio="Старое ФИО"
+        )
+
+    def run_import(self, rows, chunk_size=100, **fields):
+        """Импорт файла CSV со строками rows."""
+        employee_import = EmployeeImport.objects.create(
+            file=ContentFile(
+                (self.header + "".join(rows)).encode(), "employees.csv"
+            ),
+            **fields,
+        )
+        EmployeeImporter(employee_import, chunk_size=chunk_size).run()
+        return employee_import
+
+    def test_import(self):
+        employee_import = self.run_import(
+            [
+                "new@example.com,Новый,1,Департамент,Python;SQL\n",
+                "OLD@example.com,Новое ФИО,,,\n",
+                "bad,Ошибка,,Нет такого,\n",
+            ]
+        )
+        self.assertEqual(employee_import.created_count, 1)
+        self.assertEqual(employee_import.updated_count, 1)
+        self.assertEqual(employee_import.error_count, 1)
+        self.assertEqual(employee_import.errors[0]["row"], 4)
+        employee = User.objects.get(email="new@example.com")
+        self.assertEqual(employee.employee_departament, self.department)
+        self.assertEqual(
+            set(employee.skills.values_list("name", flat=True)),
+            {"Python", "SQL"},
+        )
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.employee_fio, "Новое ФИО")
+        self.department.refresh_from_db()
+        self.assertEqual(self.department.employee_count, 1)
+
+    def test_dry_run(self):
+        employee_import = self.run_import(
+            [
+                "new@example.com,Новый,1,Департамент,Python\n",
+                "old@example.com,Новое ФИО,,,\n",
+                "other@example.com,Другой,1,,Python\n",
+                "bad,Ошибка,,,\n",
+            ],
+            chunk_size=2,
+            dry_run=True,
+        )
+        self.assertEqual(employee_import.processed_rows, 4)
+        self.assertEqual(employee_import.created_count, 2)
+        self.assertEqual(employee_import.updated_count, 1)
+        self.assertEqual(employee_import.error_count, 1)
+        self.assertEqual(
+            list(User.objects.values_list("email", flat=True)),
+            ["old@example.com"],
+        )
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.employee_fio, "Старое ФИО")
+        self.assertFalse(Skill.objects.exists())
+        self.department.refresh_from_db()
+        self.assertEqual(self.department.employee_count, 0)
+
+    def test_passwords(self):
+        self.header = "email,employee_fio,password\n"
+        rows = [
+            "new@example.com,Новый,new-password\n",
+            "old@example.com,,old-password\n",
+            "empty@example.com,Без пароля,\n",
+        ]
+        with mock.patch(
+            "users.imports.make_password", wraps=make_password
+        ) as hasher:
+            self.run_import(rows, dry_run=True)
+        self.assertEqual(hasher.call_args_list, [mock.call(None)] * 3)
+
+        employee_import = self.run_import(rows)
+        self.assertEqual(employee_import.error_count, 0)
+        self.assertTrue(
+            User.objects.get(email="new@example.com").check_password(
+                "new-password"
+            )
+        )
+        self.employee.refresh_from_db()
+        self.assertTrue(self.employee.check_password("old-password"))
+        self.assertFalse(
+            User.objects.get(email="empty@example.com").has_usable_password()
+        )
+
+    def test_duplicate_email(self):
+        employee_import = self.run_import(
+            [
+                "new@example.com,Первая строка,,,\n",
+                "NEW@example.com,Последняя строка,,,\n",
+            ]
+        )
+        self.assertEqual(employee_import.created_count, 1)
+        self.assertEqual(employee_import.error_count, 1)
+        self.assertEqual(employee_import.errors[0]["row"], 2)
+        self.assertEqual(
+            User.objects.get(email="new@example.com").employee_fio,
+            "Последняя строка",
+        )
+
+    def test_failed_chunk_is_rolled_back(self):
+        with mock.patch(
+            "users.imports.EmployeeSearchDocument.objects.refresh",
+            side_effect=[None, DatabaseError("Ошибка БД")],
+        ), self.assertRaises(DatabaseError):
+            self.run_import(
+                [
+                    f"employee{number}@example.com,Сотрудник,,Департамент,"
+                    f"Навык {number}\n"
+                    for number in range(4)
+                ],
+                chunk_size=2,
+            )
+        employee_import = EmployeeImport.objects.get()
+        self.assertEqual(employee_import.processed_rows, 2)
+        self.assertEqual(employee_import.created_count, 2)
+        self.assertEqual(
+            set(
+                User.objects.filter(
+                    email__startswith="employee"
+                ).values_list("email", flat=True)
+            ),
+            {"employee0@example.com", "employee1@example.com"},
+        )
+        self.assertEqual(
+            set(Skill.objects.values_list("name", flat=True)),
+            {"Навык 0", "Навык 1"},
+        )
+        self.department.refresh_from_db()
+        self.assertEqual(self.department.employee_count, 2)
+
+
+class EmployeeExportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(
+            departament_name="Департамент", departament_description="Описание"
+        )
+        cls.employee = User.objects.create_user(
+            email="first@example.com",
+            employee_fio="Первый Сотрудник",
+            employee_position="Аналитик",
+            employee_date_of_birth=datetime.date(1990, 5, 17),
+            employee_telegram="@first",
+            employee_type_job="part_time",
+            employee_grade="3",
+            employee_description="Описание, с запятой\nи переносом",
+            is_employee_outsource=True,
+            employee_departament=cls.department,
+        )
+        for name in ("Python", "SQL"):
+            EmployeeSkill.objects.create(
+                employee=cls.employee,
+                skill=Skill.objects.create(name=name),
+            )
+        cls.other = User.objects.create_user(
+            email="second@example.com", employee_fio="Второй Сотрудник"
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.employee)
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def export(self, **params):
+        response = self.client.get("/api/users/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def read_csv(self, content):
+        return list(csv.DictReader(io.StringIO(content.lstrip("\ufeff"))))
+
+    def test_csv_round_trip(self):
+        content = self.export(department="Департамент")
+        rows = self.read_csv(content)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["employee_date_of_birth"], "17-05-1990")
+        self.assertEqual(rows[0]["skills"], "Python; SQL")
+
+        # Импорт выгрузки восстанавливает измененные данные сотрудника
+        User.objects.filter(pk=self.employee.pk).update(
+            employee_fio="Другое ФИО",
+            employee_description="",
+            is_employee_outsource=False,
+        )
+        employee_import = EmployeeImport.objects.create(
+            file=ContentFile(content.encode(), "employees.csv")
+        )
+        EmployeeImporter(employee_import).run()
+        self.assertEqual(employee_import.updated_count, 1)
+        self.assertEqual(employee_import.error_count, 0)
+        self.assertEqual(
+            self.read_csv(self.export(department="Департамент")), rows
+        )
+
+    def test_ndjson_matches_csv(self):
+        rows = [
+            json.loads(line)
+            for line in self.export(file_format="ndjson").splitlines()
+        ]
+        self.assertEqual(
+            [row["email"] for row in rows],
+            ["first@example.com", "second@example.com"],
+        )
+        self.assertIs(rows[0]["is_employee_outsource"], True)
+        self.assertIsNone(rows[1]["department"])
+        self.assertEqual(
+            [
+                {
+                    name: "" if value is None else str(value)
+                    for name, value in row.items()
+                }
+                for row in rows
+            ],
+            self.read_csv(self.export()),
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(
+            "/api/users/export/", {"file_format": "xml"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+)
+class EmployeeSearchTest(APITestCase):
+    def setUp(self):
+        # Поисковые документы обновляются после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_superuser(
+                email="admin@example.com",
+                password="password",
+                employee_fio="Администратор",
+            )
+            self.ivanov = User.objects.create_user(
+                email="ivanov@example.com",
+                employee_fio="Иванов Иван",
+                employee_position="Разработчик",
+                employee_location="Москва",
+            )
+            self.ivanova = User.objects.create_user(
+                email="ivanova@example.com",
+                employee_fio="Иванова Анна",
+                employee_position="Аналитик",
+                employee_location="Санкт-Петербург",
+            )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        response = self.client.get("/api/users/", {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    @skipIf(connection.vendor == "postgresql", "Поиск без PostgreSQL")
+    def test_fallback_substring(self):
+        self.assertEqual(
+            set(self.search("ИВАНОВ")), {self.ivanov.pk, self.ivanova.pk}
+        )
+        self.assertEqual(self.search("ova@exam"), [self.ivanova.pk])
+
+    @skipIf(connection.vendor == "postgresql", "Поиск без PostgreSQL")
+    def test_fallback_id(self):
+        self.assertEqual(self.search(str(self.ivanova.pk)), [self.ivanova.pk])
+
+    @skipIf(connection.vendor == "postgresql", "Поиск без PostgreSQL")
+    def test_fallback_all_terms(self):
+        self.assertEqual(self.search("иванов москва"), [self.ivanov.pk])
+        self.assertEqual(self.search("иванов казань"), [])
+
+    @skipUnless(connection.vendor == "postgresql", "Только PostgreSQL")
+    def test_ranking(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            body_match = User.objects.create_user(
+                email="body@example.com",
+                employee_fio="Борис Петров",
+                employee_position="Тестов",
+            )
+            title_match = User.objects.create_user(
+                email="title@example.com",
+                employee_fio="Андрей Тестов",
+                employee_position="Инженер",
+            )
+        self.assertEqual(
+            self.search("тестов"), [title_match.pk, body_match.pk]
+        )
+
+    def test_refresh_after_update(self):
+        self.assertEqual(self.search("архитектор"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ivanov.employee_position = "Архитектор"
+            self.ivanov.save()
+        self.assertEqual(self.search("архитектор"), [self.ivanov.pk])
+
+    def test_refresh_after_skill_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            skill = Skill.objects.create(name="Kubernetes")
+            self.ivanova.skills.add(skill)
+        self.assertEqual(self.search("kubernetes"), [self.ivanova.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.name = "Helm"
+            skill.save()
+        self.assertEqual(self.search("kubernetes"), [])
+        self.assertEqual(self.search("helm"), [self.ivanova.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ivanova.skills.remove(skill)
+        self.assertEqual(self.search("helm"), [])
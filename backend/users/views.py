@@ -1,24 +1,34 @@
 from django.contrib.auth import get_user_model
-from django.utils.crypto import get_random_string
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
-from rest_framework import filters, parsers, status
+from rest_framework import parsers, status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from company.mixins import BaseViewSet
+from company.outbox import enqueue
+from users.constants import EXPORT_FORMATS
+from users.exports import export_rows, stream_csv, stream_ndjson
 from users.filters import GazpromUserFilter
+from users.models import EmployeeImport
 from users.permissions import IsSuperuser, IsSuperuserOrProfileOwner
-from users.schemas import (DELETE_AVATAR_SCHEMA, GAZPROMUSER_SCHEMA, ME_SCHEMA,
+from users.schemas import (DELETE_AVATAR_SCHEMA, EXPORT_EMPLOYEES_SCHEMA,
+                           GAZPROMUSER_SCHEMA, IMPORT_EMPLOYEES_SCHEMA,
+                           IMPORT_STATUS_SCHEMA, ME_SCHEMA,
                            PASSWORD_RESET_VIEW_SCHEMA, UPLOAD_AVATAR_SCHEMA)
+from users.search import EmployeeSearchFilter
 from users.serializers import (AvatarUploadSerializer, EmployeeGetSerializer,
+                               EmployeeImportSerializer,
                                EmployeeListSerializer,
                                EmployeePatchUserSerializer,
                                EmployeeWriteSuperuserSerializer,
                                PasswordResetSerializer)
-from users.tasks import send_reset_password_email
+from users.tasks import import_employees, reset_password
 
 User = get_user_model()
 
@@ -32,16 +42,8 @@ class PasswordResetView(APIView):
     def post(self, request):
         serializer = PasswordResetSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        email = serializer.validated_data["email"]
-        user = User.objects.get(email=email)
-
-        # Генерация нового пароля
-        new_password = get_random_string(length=8)
-        user.set_password(new_password)
-        user.save()
-
-        # Отправка нового пароля по email
-        send_reset_password_email.delay(new_password, email)
+        # Новый пароль создается задачей, чтобы он не сохранялся в outbox
+        enqueue(reset_password, email=serializer.validated_data["email"])
 
         return Response(
             {"message": "Новый пароль отправлен на email"},
@@ -58,27 +60,17 @@ class UserViewSet(BaseViewSet):
     http_method_names = ("get", "post", "patch", "delete")
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
-    )
-    search_fields = (
-        "id",
-        "employee_fio",
-        "employee_telegram",
-        "employee_telephone",
-        "email",
-        "gazpromuserteam__team__product__product_name",
-        "employee_position",
-        "employee_grade",
-        "employee_location",
-        "gazpromuserteam__team__team_name",
-        "skills__name",
+        EmployeeSearchFilter,
     )
     filterset_class = GazpromUserFilter
+    fast_serialization = ("list", "retrieve")
 
     def get_permissions(self):
         # Доступ к созданию и удалению пользователя
         # разрешаем только суперпользователю
-        if self.action in ("create", "destroy"):
+        if self.action in (
+                "create", "destroy", "import_employees", "import_status"
+        ):
             return (IsSuperuser(),)
         # Доступ к редактированию профиля, загрузке и удалению аватара
         # разрешаем только суперпользователю и владельцу профиля
@@ -103,6 +95,8 @@ class UserViewSet(BaseViewSet):
                 return AvatarUploadSerializer
             case "list":
                 return EmployeeListSerializer
+            case "import_employees" | "import_status":
+                return EmployeeImportSerializer
             case _:
                 return super().get_serializer_class()
 
@@ -132,9 +126,64 @@ class UserViewSet(BaseViewSet):
     def delete_avatar(self, request, pk=None):
         """Удаление аватара сотрудника."""
         user = self.get_object()
-        user.employee_avatar.delete()
+        # Файл может использоваться другими сотрудниками: ссылку на него
+        # удаляет обработчик сохранения, а сам файл – сборка мусора
+        user.employee_avatar = None
+        user.save(update_fields=["employee_avatar"])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @EXPORT_EMPLOYEES_SCHEMA
+    @action(["get"], detail=False)
+    def export(self, request):
+        """Потоковая выгрузка сотрудников с учетом фильтров и поиска."""
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in dict(EXPORT_FORMATS):
+            return Response(
+                {"file_format": "Поддерживаются форматы csv и ndjson."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rows = export_rows(self.filter_queryset(self.get_queryset()))
+        if file_format == "ndjson":
+            response = StreamingHttpResponse(
+                stream_ndjson(rows), content_type="application/x-ndjson"
+            )
+        else:
+            response = StreamingHttpResponse(
+                stream_csv(rows), content_type="text/csv; charset=utf-8"
+            )
+        response["Content-Disposition"] = (
+            f'attachment; filename="employees.{file_format}"'
+        )
+        return response
+
+    @IMPORT_EMPLOYEES_SCHEMA
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[parsers.MultiPartParser],
+    )
+    def import_employees(self, request):
+        """Загрузка файла для массового импорта сотрудников."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            employee_import = serializer.save(created_by=request.user)
+            enqueue(import_employees, import_id=employee_import.id)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @IMPORT_STATUS_SCHEMA
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"import/(?P<import_id>\d+)",
+    )
+    def import_status(self, request, import_id=None):
+        """Получение статуса импорта сотрудников."""
+        employee_import = get_object_or_404(EmployeeImport, id=import_id)
+        serializer = self.get_serializer(employee_import)
+        return Response(serializer.data)
+
     def perform_destroy(self, instance):
         """Вместо удаления изменяем сотруднику статус на 'уволен'"""
         instance.employee_status = "fired"